@@ -3,8 +3,19 @@
 # 미국 증시 급등주 예측 앱 - 분석 및 예측 모듈
 
 from datetime import datetime
+import os
 import re
 
+# 학습형 점수 모델 (선택적 백엔드) 및 계측 유틸리티
+try:
+    from app.ex_app.scoring_model import get_scoring_model
+    from app.ex_app.profiling import StageTimer, NULL_TIMER, profile_run
+    from app.ex_app.records import Prediction
+except ImportError:
+    from scoring_model import get_scoring_model
+    from profiling import StageTimer, NULL_TIMER, profile_run
+    from records import Prediction
+
 # 뉴스 촉매 키워드 및 가중치
 CATALYST_KEYWORDS = {
     # FDA 관련 (최고 가중치)
@@ -67,11 +78,37 @@ NEGATIVE_KEYWORDS = {
 class NewsAnalyzer:
     """뉴스 분석 및 점수화"""
     
+    def __init__(self):
+        # 동일 헤드라인 반복 분석 방지용 캐시
+        self._cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def cache_stats(self):
+        """캐시 적중률"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': round(self.cache_hits / lookups, 4) if lookups else 0.0
+        }
+    
     def analyze_headline(self, headline):
         """헤드라인 분석하여 점수와 촉매 유형 반환"""
         if not headline:
             return {'score': 0, 'catalyst_type': 'other', 'sentiment': 0}
         
+        cached = self._cache.get(headline)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        self.cache_misses += 1
+        
+        result = self._analyze(headline)
+        self._cache[headline] = result
+        return result
+    
+    def _analyze(self, headline):
         headline_lower = headline.lower()
         total_score = 0
         catalyst_type = 'other'
@@ -111,27 +148,28 @@ class NewsAnalyzer:
             'sentiment': sentiment
         }
     
+    def annotate(self, item):
+        """뉴스 항목에 분석 결과를 복사 없이 기록하고 분석 결과 반환"""
+        analysis = self.analyze_headline(item.get('headline', ''))
+        item['importance_score'] = analysis['score']
+        item['catalyst_type'] = analysis['catalyst_type']
+        item['sentiment_score'] = analysis['sentiment']
+        return analysis
+    
     def analyze_news_batch(self, news_items):
-        """뉴스 배치 분석"""
-        analyzed = []
+        """뉴스 배치 분석 (항목에 직접 기록)"""
         for item in news_items:
-            analysis = self.analyze_headline(item.get('headline', ''))
-            analyzed.append({
-                **item,
-                'importance_score': analysis['score'],
-                'catalyst_type': analysis['catalyst_type'],
-                'sentiment_score': analysis['sentiment']
-            })
+            self.annotate(item)
         
         # 점수순 정렬
-        return sorted(analyzed, key=lambda x: x['importance_score'], reverse=True)
+        return sorted(news_items, key=lambda x: x['importance_score'], reverse=True)
 
 
 class StockScorer:
     """종목 종합 점수 계산"""
     
-    def __init__(self):
-        self.news_analyzer = NewsAnalyzer()
+    def __init__(self, news_analyzer=None):
+        self.news_analyzer = news_analyzer or NewsAnalyzer()
     
     def calculate_news_score(self, news_items):
         """뉴스 기반 점수 (0-100)"""
@@ -172,21 +210,43 @@ class StockScorer:
         
         return min(100, score)
     
-    def calculate_social_score(self, reddit_mentions=0, stocktwits_mentions=0):
-        """소셜 미디어 점수 (0-100)"""
+    def calculate_social_score(self, reddit_mentions=0, stocktwits_mentions=0, velocity=None):
+        """
+        소셜 미디어 점수 (0-100)
+        
+        velocity: 최근 1시간 멘션 / 직전 평균 기대치 (social_velocity.MentionVelocityStore)
+                  지정 시 멘션 총량보다 급증 여부를 우선 반영
+                  직전 구간 기준이 없으면 None -> 가감점 없이 멘션 총량만 반영
+        """
         total_mentions = reddit_mentions + stocktwits_mentions
         
         if total_mentions >= 50:
-            return 100
+            score = 100
         elif total_mentions >= 30:
-            return 75
+            score = 75
         elif total_mentions >= 15:
-            return 50
+            score = 50
         elif total_mentions >= 5:
-            return 25
+            score = 25
         elif total_mentions >= 1:
-            return 10
-        return 0
+            score = 10
+        else:
+            score = 0
+        
+        if velocity is None:
+            return score
+        
+        # 급증 가산점
+        if velocity >= 5:
+            score += 50
+        elif velocity >= 3:
+            score += 35
+        elif velocity >= 2:
+            score += 20
+        elif velocity < 1:
+            score = score // 2  # 평소보다 줄어드는 중이면 감점
+        
+        return min(100, score)
     
     def calculate_total_score(self, news_score, momentum_score, social_score):
         """종합 점수 계산 (가중 평균)"""
@@ -198,53 +258,127 @@ class StockScorer:
 class PredictionEngine:
     """최종 예측 생성 엔진"""
     
-    def __init__(self):
-        self.scorer = StockScorer()
+    def __init__(self, scoring_backend=None):
         self.news_analyzer = NewsAnalyzer()
+        self.scorer = StockScorer(self.news_analyzer)
+        
+        # 점수 백엔드 선택: 'rules' (고정 임계값, 기본) 또는 'model' (학습 모델)
+        self.scoring_backend = (
+            scoring_backend or os.environ.get('EX_APP_SCORING_BACKEND', 'rules')
+        ).lower()
+        self.model = None
+        if self.scoring_backend == 'model':
+            try:
+                self.model = get_scoring_model()
+            except Exception as e:
+                print(f"[EX_APP] Scoring model unavailable, falling back to rules: {e}")
+                self.scoring_backend = 'rules'
     
-    def generate_predictions(self, collected_data, top_n=5):
+    def _score_all(self, symbol_scores):
+        """전체 후보 종목의 종합 점수 계산 (모델 백엔드는 한 번의 행렬 곱)"""
+        symbols = list(symbol_scores.keys())
+        
+        if self.model is not None and symbols:
+            features = [
+                [symbol_scores[s]['news'], symbol_scores[s]['momentum'], symbol_scores[s]['social']]
+                for s in symbols
+            ]
+            totals = self.model.score_batch(features)
+            return {s: float(t) for s, t in zip(symbols, totals)}
+        
+        return {
+            s: self.scorer.calculate_total_score(
+                symbol_scores[s]['news'],
+                symbol_scores[s]['momentum'],
+                symbol_scores[s]['social']
+            )
+            for s in symbols
+        }
+    
+    def generate_predictions(self, collected_data, top_n=5, timer=None):
         """
         수집된 데이터를 기반으로 Top N 예측 생성
         
         Args:
             collected_data: collectors.collect_all_data()의 결과
             top_n: 반환할 상위 종목 수
+            timer: 단계별 계측용 StageTimer (선택)
         
         Returns:
             list: 예측 종목 리스트
         """
+        timer = timer or NULL_TIMER
         symbol_scores = {}
         symbol_data = {}
         
         # 1. 뉴스 데이터 처리
+        with timer.stage('news'):
+            self._process_news(collected_data, symbol_scores, symbol_data, timer)
+        
+        # 2. 탑 게이너 데이터 처리
+        with timer.stage('gainers'):
+            self._process_gainers(collected_data, symbol_scores, symbol_data, timer)
+        
+        # 3. Reddit 멘션 처리
+        with timer.stage('reddit'):
+            self._process_mentions(collected_data, symbol_scores, symbol_data, timer)
+        
+        # 4. 종합 점수 계산
+        with timer.stage('scoring'):
+            total_scores = self._score_all(symbol_scores)
+        timer.count('symbols_scored', len(total_scores))
+        
+        predictions = []
+        with timer.stage('build'):
+            for symbol, scores in symbol_scores.items():
+                predictions.append(
+                    self._build_prediction(symbol, scores, total_scores[symbol], symbol_data[symbol], timer)
+                )
+        
+        # 5. 점수순 정렬 후 상위 N개 반환
+        with timer.stage('sorting'):
+            predictions.sort(key=lambda x: x['confidence_score'], reverse=True)
+        
+        # 순위 부여
+        for i, pred in enumerate(predictions[:top_n]):
+            pred['pick_rank'] = i + 1
+        
+        return predictions[:top_n]
+    
+    def _ensure_symbol(self, symbol, symbol_scores, symbol_data):
+        if symbol not in symbol_scores:
+            symbol_scores[symbol] = {'news': 0, 'momentum': 0, 'social': 0}
+            symbol_data[symbol] = {'news': [], 'mentions': 0}
+    
+    def _process_news(self, collected_data, symbol_scores, symbol_data, timer):
+        """뉴스 데이터 처리"""
         for news in collected_data.get('finviz_news', []):
-            symbol = news.get('symbol', '').upper()
-            if not symbol:
+            # 클러스터링된 뉴스는 관련 종목 모두에 귀속
+            symbols = news.get('symbols') or [news.get('symbol', '')]
+            symbols = [s.upper() for s in symbols if s]
+            if not symbols:
                 continue
             
-            if symbol not in symbol_scores:
-                symbol_scores[symbol] = {'news': 0, 'momentum': 0, 'social': 0}
-                symbol_data[symbol] = {'news': [], 'mentions': 0}
+            timer.count('news_items')
+            analysis = self.news_analyzer.annotate(news)
             
-            analysis = self.news_analyzer.analyze_headline(news.get('headline', ''))
-            symbol_data[symbol]['news'].append({
-                **news,
-                **analysis
-            })
-            symbol_scores[symbol]['news'] = max(
-                symbol_scores[symbol]['news'],
-                analysis['score']
-            )
-        
-        # 2. 탑 게이너 데이터 처리
+            for symbol in symbols:
+                self._ensure_symbol(symbol, symbol_scores, symbol_data)
+                symbol_data[symbol]['news'].append(news)
+                symbol_scores[symbol]['news'] = max(
+                    symbol_scores[symbol]['news'],
+                    analysis['score']
+                )
+    
+    def _process_gainers(self, collected_data, symbol_scores, symbol_data, timer):
+        """탑 게이너 데이터 처리"""
         for gainer in collected_data.get('top_gainers', []):
             symbol = gainer.get('symbol', '').upper()
             if not symbol:
                 continue
             
-            if symbol not in symbol_scores:
-                symbol_scores[symbol] = {'news': 0, 'momentum': 0, 'social': 0}
-                symbol_data[symbol] = {'news': [], 'mentions': 0}
+            self._ensure_symbol(symbol, symbol_scores, symbol_data)
+            timer.count('gainer_items')
             
             # 변동률 파싱 (예: "15.32%")
             change_str = gainer.get('change_pct', '0%')
@@ -254,73 +388,59 @@ class PredictionEngine:
                 change = 0
             
             symbol_scores[symbol]['momentum'] = self.scorer.calculate_momentum_score(change)
-        
-        # 3. Reddit 멘션 처리
+    
+    def _process_mentions(self, collected_data, symbol_scores, symbol_data, timer):
+        """Reddit 멘션 처리"""
+        velocity_stats = collected_data.get('mention_velocity') or {}
         for mention in collected_data.get('reddit_mentions', []):
             symbol = mention.get('symbol', '').upper()
             if not symbol:
                 continue
             
-            if symbol not in symbol_scores:
-                symbol_scores[symbol] = {'news': 0, 'momentum': 0, 'social': 0}
-                symbol_data[symbol] = {'news': [], 'mentions': 0}
+            self._ensure_symbol(symbol, symbol_scores, symbol_data)
+            timer.count('reddit_items')
             
             mentions = mention.get('mentions', 1)
+            stats = velocity_stats.get(symbol)
             symbol_data[symbol]['mentions'] = mentions
-            symbol_scores[symbol]['social'] = self.scorer.calculate_social_score(mentions)
-        
-        # 4. 종합 점수 계산
-        predictions = []
-        for symbol, scores in symbol_scores.items():
-            total_score = self.scorer.calculate_total_score(
-                scores['news'],
-                scores['momentum'],
-                scores['social']
+            symbol_scores[symbol]['social'] = self.scorer.calculate_social_score(
+                mentions,
+                velocity=stats['velocity_1h'] if stats else None
             )
-            
-            # 가장 높은 점수의 뉴스 찾기
-            best_news = None
-            catalyst_type = 'other'
-            if symbol_data[symbol]['news']:
-                sorted_news = sorted(
-                    symbol_data[symbol]['news'],
-                    key=lambda x: x.get('score', 0),
-                    reverse=True
-                )
-                if sorted_news:
-                    best_news = sorted_news[0]
-                    catalyst_type = best_news.get('catalyst_type', 'other')
-            
-            # 카테고리 결정
-            if scores['news'] >= 50:
-                category = 'news_catalyst'
-            elif scores['momentum'] >= 50:
-                category = 'premarket_gainer'
-            elif scores['social'] >= 50:
-                category = 'penny_runner'
-            else:
-                category = 'volume_explosion'
-            
-            predictions.append({
-                'symbol': symbol,
-                'confidence_score': total_score,
-                'category': category,
-                'catalyst_type': catalyst_type,
-                'news_score': scores['news'],
-                'momentum_score': scores['momentum'],
-                'social_score': scores['social'],
-                'reasoning': self._generate_reasoning(symbol, scores, best_news),
-                'top_news': best_news.get('headline') if best_news else None
-            })
+    
+    def _build_prediction(self, symbol, scores, total_score, data, timer):
+        """종목별 예측 레코드 생성"""
+        # 가장 높은 점수의 뉴스 찾기
+        best_news = None
+        catalyst_type = 'other'
+        if data['news']:
+            best_news = max(data['news'], key=lambda x: x.get('importance_score', 0))
+            catalyst_type = best_news.get('catalyst_type', 'other')
         
-        # 5. 점수순 정렬 후 상위 N개 반환
-        predictions.sort(key=lambda x: x['confidence_score'], reverse=True)
+        # 카테고리 결정
+        if scores['news'] >= 50:
+            category = 'news_catalyst'
+        elif scores['momentum'] >= 50:
+            category = 'premarket_gainer'
+        elif scores['social'] >= 50:
+            category = 'penny_runner'
+        else:
+            category = 'volume_explosion'
         
-        # 순위 부여
-        for i, pred in enumerate(predictions[:top_n]):
-            pred['pick_rank'] = i + 1
+        with timer.stage('reasoning'):
+            reasoning = self._generate_reasoning(symbol, scores, best_news)
         
-        return predictions[:top_n]
+        return Prediction(
+            symbol=symbol,
+            confidence_score=total_score,
+            category=category,
+            catalyst_type=catalyst_type,
+            news_score=scores['news'],
+            momentum_score=scores['momentum'],
+            social_score=scores['social'],
+            reasoning=reasoning,
+            top_news=best_news.get('headline') if best_news else None
+        )
     
     def _generate_reasoning(self, symbol, scores, best_news):
         """예측 근거 생성"""
@@ -343,16 +463,32 @@ class PredictionEngine:
         return " | ".join(reasons) if reasons else "종합적 분석 기반"
 
 
-def run_analysis(collected_data):
-    """분석 실행 메인 함수"""
-    engine = PredictionEngine()
-    predictions = engine.generate_predictions(collected_data, top_n=5)
+def run_analysis(collected_data, profile=None):
+    """
+    분석 실행 메인 함수
+    
+    Args:
+        collected_data: collectors.collect_all_data()의 결과
+        profile: 'cprofile' 또는 'pyinstrument' 지정 시 실행별 프로파일 파일 저장
+                 (기본값: EX_APP_PROFILE 환경 변수)
+    """
+    timer = StageTimer()
+    
+    with profile_run('analysis', mode=profile) as profile_info:
+        engine = PredictionEngine()
+        predictions = engine.generate_predictions(collected_data, top_n=5, timer=timer)
+    
+    metrics = timer.to_dict()
+    metrics['headline_cache'] = engine.news_analyzer.cache_stats()
+    metrics['profile_path'] = profile_info['path']
     
     return {
         'predictions': predictions,
         'analyzed_at': datetime.now().isoformat(),
+        'metrics': metrics,
+        'scoring_backend': engine.scoring_backend,
         'total_symbols_analyzed': len(set(
-            [n.get('symbol') for n in collected_data.get('finviz_news', [])] +
+            [s for n in collected_data.get('finviz_news', []) for s in (n.get('symbols') or [n.get('symbol')])] +
             [g.get('symbol') for g in collected_data.get('top_gainers', [])] +
             [m.get('symbol') for m in collected_data.get('reddit_mentions', [])]
         ))
@@ -0,0 +1,336 @@
+# file name : archive.py
+# pwd : /dal9/app/ex_app/archive.py
+# 미국 증시 급등주 예측 앱 - news_events 월별 파티션 관리 및 압축 아카이브
+#
+# news_events 는 collected_at 기준 월별 RANGE 파티션으로 나뉜다 (migrations 005).
+#   PostgreSQL: 선언적 파티션 news_events_pYYYY_MM (+ news_events_default)
+#   MySQL:      PARTITION BY RANGE (TO_DAYS(collected_at)) pYYYY_MM (+ pmax)
+#
+# 보존 기간(NEWS_RETENTION_MONTHS, 기본 3개월)이 지난 파티션은 압축 JSONL
+# (zstandard 설치 시 .jsonl.zst, 없으면 .jsonl.gz)로 내보낸 뒤 분리/삭제하여
+# 핫 테이블은 최근 몇 개월만 유지한다. 아카이브는 iter_archive() 또는
+# /api/export/news?archive=1 로 계속 조회할 수 있다.
+#
+#   python archive.py run                      파티션 생성 + 보존 기간 지난 파티션 아카이브
+#   python archive.py partitions               파티션 목록
+#   python archive.py query [since] [until]    아카이브를 NDJSON 으로 출력
+#
+# 보존 기간이 지난 change_log(델타 API 변경 로그)도 함께 정리한다.
+# cron/GitHub Actions 에서 run_collection.py 와 함께 하루 한 번 실행한다.
+
+import os
+import io
+import re
+import sys
+import json
+import gzip
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    from app.ex_app import cache
+    from app.ex_app import changes
+except ImportError:
+    import cache
+    import changes
+
+# zstd 압축 (선택, 없으면 gzip)
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+TABLE = 'news_events'
+ARCHIVE_DIR = os.environ.get('EX_APP_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive'))
+RETENTION_MONTHS = int(os.environ.get('NEWS_RETENTION_MONTHS', 3))
+MONTHS_AHEAD = 2
+ZSTD_LEVEL = 10
+
+_PARTITION_PATTERN = re.compile(r'p(\d{4})_(\d{2})$')
+_ARCHIVE_PATTERN = re.compile(r'^(\d{4})-(\d{2})\.jsonl\.(zst|gz)$')
+
+
+def _get_database():
+    """DB 모듈 import (PostgreSQL/MySQL 자동 선택)"""
+    if os.environ.get('DATABASE_URL'):
+        from module.dbModule_ex_pg import Database
+    else:
+        try:
+            from app.module.dbModule_ex import Database
+        except ImportError:
+            from module.dbModule_ex_pg import Database
+    return Database(use_primary=True)
+
+
+# ============================================
+# 월 계산
+# ============================================
+
+def month_start(value=None):
+    value = value or date.today()
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(db, month):
+    suffix = f'p{month.year:04d}_{month.month:02d}'
+    return f'{TABLE}_{suffix}' if db.db_type == 'postgresql' else suffix
+
+
+def _partition_month(name):
+    match = _PARTITION_PATTERN.search(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+# ============================================
+# 파티션 관리
+# ============================================
+
+def list_partitions(db):
+    """
+    news_events 파티션 목록 (월 순서)
+
+    Returns:
+        list: {'name', 'month'} (month 가 None 이면 default/pmax 파티션)
+    """
+    if db.db_type == 'postgresql':
+        rows = db.executeAll("""
+            SELECT c.relname AS name
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = %s AND p.relnamespace = current_schema()::regnamespace
+        """, (TABLE,))
+    else:
+        rows = db.executeAll("""
+            SELECT partition_name AS name
+            FROM information_schema.partitions
+            WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        """, (TABLE,))
+
+    partitions = [{'name': row['name'], 'month': _partition_month(row['name'])} for row in rows]
+    partitions.sort(key=lambda p: (p['month'] is None, p['month'] or date.min))
+    return partitions
+
+
+def mysql_partition_clause(months):
+    """MySQL PARTITION BY 절의 월별 파티션 정의 (+ pmax)"""
+    parts = [
+        f"PARTITION p{m.year:04d}_{m.month:02d} VALUES LESS THAN (TO_DAYS('{add_months(m, 1).isoformat()}'))"
+        for m in months
+    ]
+    parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return ', '.join(parts)
+
+
+def ensure_partitions(db, months_ahead=MONTHS_AHEAD, first_month=None):
+    """
+    first_month(기본 이번 달)부터 months_ahead 개월 뒤까지 월 파티션 생성 (커밋은 호출자)
+
+    Returns:
+        list: 새로 만든 파티션 이름
+    """
+    existing = {p['month'] for p in list_partitions(db) if p['month']}
+    last = add_months(month_start(), months_ahead)
+    month = month_start(first_month)
+    wanted = []
+    while month <= last:
+        if month not in existing:
+            wanted.append(month)
+        month = add_months(month, 1)
+
+    created = []
+    if db.db_type == 'postgresql':
+        for month in wanted:
+            name = partition_name(db, month)
+            try:
+                db.execute("SAVEPOINT ex_app_partition")
+                db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                )
+                db.execute("RELEASE SAVEPOINT ex_app_partition")
+                created.append(name)
+            except Exception as e:
+                # default 파티션에 해당 월 행이 이미 있으면 생성 불가 (해당 월은 default 에 남음)
+                db.execute("ROLLBACK TO SAVEPOINT ex_app_partition")
+                print(f"[EX_APP ARCHIVE] Partition {name} not created: {e}")
+        return created
+
+    # MySQL은 마지막(pmax) 파티션을 쪼개는 방식으로만 뒤에 추가 가능
+    latest = max(existing) if existing else None
+    wanted = [m for m in wanted if latest is None or m > latest]
+    if wanted:
+        db.execute(
+            f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO ({mysql_partition_clause(wanted)})"
+        )
+        created = [partition_name(db, m) for m in wanted]
+    return created
+
+
+# ============================================
+# 압축 아카이브
+# ============================================
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _archive_path(month, archive_dir=None):
+    extension = 'zst' if HAS_ZSTD else 'gz'
+    return os.path.join(archive_dir or ARCHIVE_DIR, TABLE, f'{month.year:04d}-{month.month:02d}.jsonl.{extension}')
+
+
+def _open_writer(path):
+    if path.endswith('.zst'):
+        raw = open(path, 'wb')
+        stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return gzip.open(path, 'wt', encoding='utf-8')
+
+
+def _open_reader(path):
+    if path.endswith('.zst'):
+        if not HAS_ZSTD:
+            raise ImportError(f"zstandard is required to read {path}")
+        raw = open(path, 'rb')
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return gzip.open(path, 'rt', encoding='utf-8')
+
+
+def _partition_query(db, name):
+    if db.db_type == 'postgresql':
+        return f"SELECT * FROM {name} ORDER BY collected_at, id"
+    return f"SELECT * FROM {TABLE} PARTITION ({name}) ORDER BY collected_at, id"
+
+
+def archive_partition(db, partition, archive_dir=None):
+    """
+    파티션 하나를 압축 JSONL로 내보낸 뒤 분리/삭제하고 커밋
+
+    Returns:
+        dict: {'partition', 'path', 'rows'}
+    """
+    name, month = partition['name'], partition['month']
+    path = _archive_path(month, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = f'{path}.tmp'
+    rows = 0
+    with _open_writer(tmp_path) as f:
+        for row in db.iterate(_partition_query(db, name)):
+            f.write(json.dumps(row, default=_json_default, ensure_ascii=False))
+            f.write('\n')
+            rows += 1
+    os.replace(tmp_path, path)
+
+    if db.db_type == 'postgresql':
+        db.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+        db.execute(f"DROP TABLE {name}")
+    else:
+        db.execute(f"ALTER TABLE {TABLE} DROP PARTITION {name}")
+    db.commit()
+    cache.invalidate()
+
+    print(f"[EX_APP ARCHIVE] {name}: {rows} rows -> {path}")
+    return {'partition': name, 'path': path, 'rows': rows}
+
+
+def archive_partitions(db, keep_months=RETENTION_MONTHS, archive_dir=None):
+    """보존 기간(이번 달 포함 keep_months 개월)이 지난 월 파티션을 모두 아카이브"""
+    cutoff = add_months(month_start(), -(keep_months - 1))
+    return [
+        archive_partition(db, partition, archive_dir)
+        for partition in list_partitions(db)
+        if partition['month'] and partition['month'] < cutoff
+    ]
+
+
+def run(db=None, keep_months=RETENTION_MONTHS, archive_dir=None):
+    """앞으로 쓸 파티션 생성 + 오래된 파티션 아카이브"""
+    own = db is None
+    db = db or _get_database()
+    try:
+        created = ensure_partitions(db)
+        db.commit()
+        archived = archive_partitions(db, keep_months, archive_dir)
+        pruned = changes.prune(db)
+        db.commit()
+        return {'created': created, 'archived': archived, 'pruned_changes': pruned}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own:
+            db.close()
+
+
+def iter_archive(since=None, until=None, symbol=None, archive_dir=None):
+    """
+    아카이브된 news_events 행을 collected_at 순으로 반환 (제너레이터)
+
+    Args:
+        since/until: 'YYYY-MM-DD' (until 포함)
+        symbol: 종목 필터 (대표 종목 또는 related_symbols 포함)
+    """
+    directory = os.path.join(archive_dir or ARCHIVE_DIR, TABLE)
+    if not os.path.isdir(directory):
+        return
+
+    since_month = since[:7] if since else None
+    until_month = until[:7] if until else None
+    symbol = symbol.upper() if symbol else None
+
+    for filename in sorted(os.listdir(directory)):
+        match = _ARCHIVE_PATTERN.match(filename)
+        if not match:
+            continue
+        month = f'{match.group(1)}-{match.group(2)}'
+        if (since_month and month < since_month) or (until_month and month > until_month):
+            continue
+
+        with _open_reader(os.path.join(directory, filename)) as f:
+            for line in f:
+                row = json.loads(line)
+                day = (row.get('collected_at') or '')[:10]
+                if (since and day < since) or (until and day > until):
+                    continue
+                if symbol and row.get('symbol') != symbol and symbol not in (row.get('related_symbols') or '').split(','):
+                    continue
+                yield row
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'run'
+
+    if command == 'run':
+        result = run()
+        print(f"Created partitions: {result['created'] or 'none'}")
+        print(f"Archived: {sum(a['rows'] for a in result['archived'])} rows "
+              f"from {len(result['archived'])} partitions")
+        print(f"Pruned change log: {result['pruned_changes']} rows")
+    elif command == 'partitions':
+        db = _get_database()
+        try:
+            for partition in list_partitions(db):
+                print(partition['name'])
+        finally:
+            db.close()
+    elif command == 'query':
+        since = sys.argv[2] if len(sys.argv) > 2 else None
+        until = sys.argv[3] if len(sys.argv) > 3 else None
+        for row in iter_archive(since, until):
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        print("Usage: python archive.py [run|partitions|query [since] [until]]")
+        sys.exit(1)
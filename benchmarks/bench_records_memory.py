@@ -0,0 +1,82 @@
+# file name : bench_records_memory.py
+# pwd : /dal9/app/ex_app/benchmarks/bench_records_memory.py
+# 100k 헤드라인 분석 실행의 메모리 사용량 비교 (dict 복사 방식 vs __slots__ 레코드)
+#
+#   python benchmarks/bench_records_memory.py [건수]
+
+import os
+import sys
+import gc
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import NewsAnalyzer, PredictionEngine
+from records import NewsItem
+
+WORDS = ['fda', 'approval', 'contract', 'merger', 'beats', 'surges', 'drops', 'partnership',
+         'short', 'squeeze', 'guidance', 'record', 'revenue', 'lawsuit', 'shares', 'stock',
+         'announces', 'phase', 'trial', 'results', 'quarter', 'deal', 'government', 'jumps']
+
+
+def make_rows(count, seed=7):
+    rng = random.Random(seed)
+    symbols = [f'S{i:04d}' for i in range(2000)]
+    return [
+        (rng.choice(symbols), ' '.join(rng.choice(WORDS) for _ in range(10)) + f' #{i}',
+         f'https://finviz.com/news/{i}')
+        for i in range(count)
+    ]
+
+
+def legacy_pipeline(rows):
+    """기존 방식: 수집 dict -> {**item, ...} 복사 -> {**news, **analysis} 복사"""
+    items = [
+        {'symbol': s, 'headline': h, 'url': u, 'source': 'finviz', 'published_at': None}
+        for s, h, u in rows
+    ]
+    analyzer = NewsAnalyzer()
+    analyzed = []
+    for item in items:
+        analysis = analyzer.analyze_headline(item.get('headline', ''))
+        analyzed.append({
+            **item,
+            'importance_score': analysis['score'],
+            'catalyst_type': analysis['catalyst_type'],
+            'sentiment_score': analysis['sentiment']
+        })
+    symbol_news = {}
+    for news in items:
+        analysis = analyzer.analyze_headline(news.get('headline', ''))
+        symbol_news.setdefault(news['symbol'], []).append({**news, **analysis})
+    return items, analyzed, symbol_news
+
+
+def record_pipeline(rows):
+    """레코드 방식: NewsItem -> 제자리 분석 -> PredictionEngine"""
+    items = [NewsItem(symbol=s, headline=h, url=u) for s, h, u in rows]
+    analyzed = NewsAnalyzer().analyze_news_batch(items)
+    predictions = PredictionEngine().generate_predictions({'finviz_news': items}, top_n=5)
+    return items, analyzed, predictions
+
+
+def measure(label, func, rows):
+    gc.collect()
+    tracemalloc.start()
+    result = func(rows)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f'{label:<28} retained {current / 2**20:8.1f} MiB   peak {peak / 2**20:8.1f} MiB')
+    return current, peak
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+    print(f'=== {count:,} headlines ===')
+    before = measure('before (dict copies)', legacy_pipeline, rows)
+    after = measure('after (__slots__ records)', record_pipeline, rows)
+    print(f'retained reduction: {(1 - after[0] / before[0]) * 100:.1f}%   '
+          f'peak reduction: {(1 - after[1] / before[1]) * 100:.1f}%')
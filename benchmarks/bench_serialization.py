@@ -0,0 +1,141 @@
+# file name : bench_serialization.py
+# pwd : /dal9/app/ex_app/benchmarks/bench_serialization.py
+# API 응답 직렬화 시간과 전송 바이트 비교 (Flask 기본 json vs orjson, 무압축 vs gzip/br)
+#
+# RealDictCursor 행과 같은 모양(Decimal, datetime, 긴 본문)의 합성 데이터로
+# /api/ai/dashboard, /api/news?limit=500, /api/ai/analysis 응답 본문을 만든다.
+#
+#   python benchmarks/bench_serialization.py [반복 횟수]
+
+import os
+import sys
+import json
+import time
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+from serialization import HAS_ORJSON, HAS_BROTLI, compress, dumps_bytes
+from flask.json.provider import _default as flask_default
+
+WORDS = ['fda', 'approval', 'contract', 'merger', 'beats', 'surges', 'drops', 'partnership',
+         'short', 'squeeze', 'guidance', 'record', 'revenue', 'lawsuit', 'shares', 'stock',
+         'announces', 'phase', 'trial', 'results', 'quarter', 'deal', 'government', 'jumps']
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def news_row(rng, i, now):
+    return {
+        'id': 100000 + i,
+        'symbol': f'S{rng.randrange(2000):04d}',
+        'headline': _text(rng, 14),
+        'source': rng.choice(['finviz', 'reddit', 'yahoo']),
+        'url': f'https://finviz.com/news/{i}',
+        'sentiment_score': Decimal(f'{rng.uniform(-1, 1):.2f}'),
+        'catalyst_type': rng.choice(['fda', 'earnings', 'contract', 'other']),
+        'importance_score': rng.randrange(100),
+        'related_symbols': None,
+        'published_at': now - timedelta(minutes=i),
+        'collected_at': now - timedelta(minutes=i)
+    }
+
+
+def pick_row(rng, i, now):
+    return {
+        'id': 5000 + i,
+        'session_id': 42,
+        'symbol': f'S{rng.randrange(2000):04d}',
+        'pick_rank': i + 1,
+        'category': 'news_catalyst',
+        'confidence_score': Decimal(f'{rng.uniform(40, 95):.2f}'),
+        'entry_price': Decimal(f'{rng.uniform(1, 20):.4f}'),
+        'predicted_target': Decimal(f'{rng.uniform(1, 30):.4f}'),
+        'reasoning': _text(rng, 60),
+        'news_score': rng.randrange(100),
+        'momentum_score': rng.randrange(100),
+        'social_score': rng.randrange(100),
+        'created_at': now,
+        'stock_name': f'Company {i} Inc.',
+        'sector': 'Healthcare',
+        'market_cap': rng.randrange(10**7, 10**9)
+    }
+
+
+def analysis_row(rng, i, now):
+    return {
+        'id': 900 + i,
+        'session_id': 42,
+        'analysis_type': 'daily_summary',
+        'symbol': None,
+        'title': f'분석 {i}',
+        'content': '## 요약\n' + _text(rng, 1500),
+        'confidence_score': Decimal('72.50'),
+        'recommendation': 'watch',
+        'created_at': now - timedelta(hours=i)
+    }
+
+
+def payloads(seed=7):
+    rng = random.Random(seed)
+    now = datetime(2024, 5, 1, 9, 30)
+    dashboard = {
+        'status': 'success',
+        'date': date(2024, 5, 1).isoformat(),
+        'session': {'id': 42, 'session_date': date(2024, 5, 1), 'status': 'completed', 'created_at': now},
+        'picks': [pick_row(rng, i, now) for i in range(10)],
+        'high_impact_news': [news_row(rng, i, now) for i in range(20)],
+        'recent_performance': [
+            {'pick_date': date(2024, 4, 30 - d), 'total_picks': 10, 'successful': rng.randrange(10),
+             'avg_gain': Decimal(f'{rng.uniform(-5, 15):.2f}')}
+            for d in range(7)
+        ],
+        'snapshot_generated_at': now,
+        'full': True,
+        'version': 123456,
+        'message': 'AI 분석용 데이터 조회 완료'
+    }
+    news = {'status': 'success', 'data': [news_row(rng, i, now) for i in range(500)], 'next_cursor': 'x' * 40}
+    analysis = {'status': 'success', 'data': [analysis_row(rng, i, now) for i in range(20)]}
+    return [
+        ('/api/ai/dashboard', dashboard),
+        ('/api/news?limit=500', news),
+        ('/api/ai/analysis', analysis),
+    ]
+
+
+def flask_default_dumps(obj):
+    """Flask DefaultJSONProvider 와 같은 설정의 표준 json (변경 전 jsonify)"""
+    return json.dumps(obj, default=flask_default, ensure_ascii=True, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def timed(func, obj, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = func(obj)
+    return (time.perf_counter() - start) / repeat * 1000, body
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f'orjson: {HAS_ORJSON}   brotli: {HAS_BROTLI}   repeat: {repeat}')
+
+    for route, obj in payloads():
+        print(f'\n=== {route} ===')
+        before_ms, before = timed(flask_default_dumps, obj, repeat)
+        after_ms, after = timed(dumps_bytes, obj, repeat)
+        assert json.loads(before) == json.loads(after), 'serializer output differs'
+        print(f'{"json (Flask default)":<24} {before_ms:8.3f} ms   {len(before):>9,} bytes')
+        print(f'{"orjson" if serialization.USE_ORJSON else "json (fallback)":<24} {after_ms:8.3f} ms   '
+              f'{len(after):>9,} bytes   x{before_ms / after_ms:.1f}')
+
+        for encoding in ['gzip'] + (['br'] if HAS_BROTLI else []):
+            ms, body = timed(lambda data: compress(data, encoding), after, max(1, repeat // 10))
+            print(f'{"+ " + encoding:<24} {ms:8.3f} ms   {len(body):>9,} bytes   '
+                  f'{(1 - len(body) / len(after)) * 100:.1f}% smaller')
@@ -0,0 +1,249 @@
+# file name : cache.py
+# pwd : /dal9/app/ex_app/cache.py
+# 미국 증시 급등주 예측 앱 - 읽기 API 응답 캐시 (세대 카운터 + ETag)
+#
+# /api/picks, /api/news 등 읽기 API 의 응답 본문을 (라우트 + 쿼리 인자) 키로 저장한다.
+# 데이터가 바뀌면(쓰기 API, 수집 파이프라인) 세대(generation) 번호를 올리고, 저장된
+# 응답은 만들어질 때의 세대와 현재 세대가 같을 때만 사용한다. 응답에는 본문 해시로
+# 만든 strong ETag 를 붙여, 폴링하는 클라이언트는 DB 조회 없이 304 를 받는다.
+#
+# 다른 호스트의 작업 워커/cron 이 쓴 변경은 이 호스트의 세대 번호를 올리지 못하므로,
+# version_source(웹 프로세스가 설정, change_log 최신 id)를 RESPONSE_CACHE_VERSION_CHECK
+# 초마다 읽어 값이 바뀌었으면 세대를 올린다. 모든 쓰기 지점이 같은 트랜잭션에서
+# change_log 를 남기므로 어느 호스트에서 쓴 변경이든 이 주기 안에 반영된다.
+#
+#   1단계: 프로세스 내 LRU (OrderedDict)
+#   2단계: 같은 호스트의 gunicorn 워커/작업 워커가 공유하는 SQLite 파일 (선택)
+#
+#   RESPONSE_CACHE                 0 이면 캐시 사용 안 함 (기본 1)
+#   RESPONSE_CACHE_SIZE            프로세스 내 LRU 항목 수 (기본 256)
+#   RESPONSE_CACHE_TTL             항목 최대 유지 시간(초, 기본 60). change_log 를 남기지 않는
+#                                  변경이나 늦게 커밋된 낮은 id 의 변경도 이 시간 안에 반영된다.
+#   RESPONSE_CACHE_VERSION_CHECK   version_source 확인 주기(초, 기본 2)
+#   RESPONSE_CACHE_PATH            공유 SQLite 파일 경로 (기본 임시 디렉터리, 'off' 면 프로세스 내만)
+
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+CACHE_ENABLED = os.environ.get('RESPONSE_CACHE', '1') != '0'
+CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 60))
+VERSION_CHECK_SECONDS = float(os.environ.get('RESPONSE_CACHE_VERSION_CHECK', 2))
+CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'ex_app_response_cache.sqlite3'))
+
+# 공유 파일에 남겨 둘 최대 항목 수 (초과분은 오래된 순으로 삭제)
+SHARED_MAX_ENTRIES = CACHE_SIZE * 4
+
+
+def make_etag(body):
+    """응답 본문 바이트의 해시 (strong ETag 값, 따옴표 제외)"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class _SharedStore:
+    """여러 프로세스가 공유하는 SQLite 저장소 (세대 번호 + 응답 항목)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (1, 0)")
+            conn.execute("CREATE TABLE IF NOT EXISTS source_version (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO source_version (id, value) VALUES (1, NULL)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL,
+                    etag TEXT NOT NULL,
+                    mimetype TEXT,
+                    body BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def generation(self):
+        return self._conn().execute("SELECT value FROM generation WHERE id = 1").fetchone()[0]
+
+    def bump(self):
+        conn = self._conn()
+        conn.execute("UPDATE generation SET value = value + 1 WHERE id = 1")
+        return self.generation()
+
+    def observe(self, version):
+        """DB 변경 버전이 기록된 값과 다르면 기록하고 세대 증가 (먼저 본 프로세스만 True)"""
+        conn = self._conn()
+        cursor = conn.execute("UPDATE source_version SET value = ? WHERE id = 1 AND value IS NOT ?", (version, version))
+        if cursor.rowcount == 0:
+            return False
+        conn.execute("UPDATE generation SET value = value + 1 WHERE id = 1")
+        return True
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT generation, etag, mimetype, body, created_at FROM entries WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if not row:
+            return None
+        return {'generation': row[0], 'etag': row[1], 'mimetype': row[2], 'body': bytes(row[3]), 'created_at': row[4]}
+
+    def put(self, key, entry):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, generation, etag, mimetype, body, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, entry['generation'], entry['etag'], entry['mimetype'], entry['body'], entry['created_at'])
+        )
+        conn.execute(
+            "DELETE FROM entries WHERE key NOT IN (SELECT key FROM entries ORDER BY created_at DESC LIMIT ?)",
+            (SHARED_MAX_ENTRIES,)
+        )
+
+
+class ResponseCache:
+    """프로세스 내 LRU + 공유 저장소(선택)로 구성된 응답 캐시"""
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL, path=CACHE_PATH):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._shared = _SharedStore(path) if path and path != 'off' else None
+        # DB 변경 버전을 돌려주는 함수 (웹 프로세스가 설정, 없으면 세대 번호만 사용)
+        self.version_source = None
+        self._source_version = None
+        self._source_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+
+    def _shared_call(self, method, *args):
+        """공유 저장소 오류(잠금 대기 초과 등)는 캐시 미스로 처리"""
+        if self._shared is None:
+            return None
+        try:
+            return getattr(self._shared, method)(*args)
+        except sqlite3.Error as e:
+            self.shared_errors += 1
+            print(f"[EX_APP] Response cache store error: {e}")
+            return None
+
+    def _check_source(self):
+        """VERSION_CHECK_SECONDS 마다 version_source 를 읽어 바뀌었으면 세대 증가"""
+        if self.version_source is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._source_checked < VERSION_CHECK_SECONDS:
+                return
+            self._source_checked = now
+        try:
+            version = self.version_source()
+        except Exception as e:
+            print(f"[EX_APP] Response cache version check failed: {e}")
+            return
+
+        with self._lock:
+            changed = self._source_version is not None and version != self._source_version
+            self._source_version = version
+        # 공유 저장소가 있으면 같은 호스트의 프로세스 중 처음 본 쪽만 세대를 올린다
+        if self._shared_call('observe', version) is None and changed:
+            with self._lock:
+                self._generation += 1
+                self._entries.clear()
+
+    def generation(self):
+        """현재 세대 번호 (공유 저장소가 있으면 그 값)"""
+        self._check_source()
+        shared = self._shared_call('generation')
+        return shared if shared is not None else self._generation
+
+    def invalidate(self):
+        """세대 번호를 올려 저장된 모든 응답을 무효화"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+        shared = self._shared_call('bump')
+        return shared if shared is not None else self._generation
+
+    def _fresh(self, entry, generation):
+        return entry['generation'] == generation and time.time() - entry['created_at'] < self.ttl
+
+    def get(self, key, generation):
+        """현재 세대의 유효한 항목 (없으면 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry, generation):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._shared_call('get', key)
+        if entry and self._fresh(entry, generation):
+            self._remember(key, entry)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def put(self, key, generation, body, mimetype):
+        entry = {
+            'generation': generation,
+            'etag': make_etag(body),
+            'mimetype': mimetype,
+            'body': body,
+            'created_at': time.time()
+        }
+        self._remember(key, entry)
+        self._shared_call('put', key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            'enabled': CACHE_ENABLED,
+            'generation': self.generation(),
+            'entries': size,
+            'max_entries': self.size,
+            'ttl': self.ttl,
+            'source_version': self._source_version,
+            'shared_path': self._shared.path if self._shared else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else None,
+            'shared_errors': self.shared_errors
+        }
+
+
+response_cache = ResponseCache()
+
+
+def invalidate():
+    """데이터 변경 후 호출 (쓰기 API, 수집 파이프라인, 롤업/아카이브)"""
+    if not CACHE_ENABLED:
+        return None
+    return response_cache.invalidate()
@@ -0,0 +1,138 @@
+# file name : changes.py
+# pwd : /dal9/app/ex_app/changes.py
+# 미국 증시 급등주 예측 앱 - 변경 로그 (change_log) 와 델타 조회
+#
+# 폴링 클라이언트(AI 에이전트, 대시보드)가 /api/ai/dashboard, /api/ai/analysis 에
+# since=<버전|ISO 시각> 을 주면 그 이후 생성/수정/삭제된 행만 돌려준다.
+# 쓰기 지점(수집 파이프라인, 쓰기 API, 롤업)이 같은 트랜잭션에서 change_log 에
+# (entity, entity_id, op) 를 남기고, change_log.id 가 버전(커서) 역할을 한다.
+#
+# 동시에 진행 중인 트랜잭션은 id 를 먼저 받고 나중에 커밋할 수 있으므로, 응답의
+# 새 버전은 SETTLE_SECONDS 보다 오래된 항목까지만 올린다. 그보다 최근 변경은 다음
+# 폴링에서 한 번 더 올 수 있다 (upsert 이므로 중복 적용해도 같은 결과).
+#
+#   CHANGE_LOG_RETENTION_DAYS   변경 로그 보존 기간(일, 기본 7). 더 오래된 버전으로
+#                               요청하면 전체 데이터를 다시 받는다 (reset). 정리할 때
+#                               마지막 항목 하나는 남겨 두어, 조용한 기간이 지나도 어디까지
+#                               지웠는지(MIN(id)) 알 수 있게 한다.
+#   CHANGE_LOG_SETTLE_SECONDS   버전 확정 지연(초, 기본 30)
+
+import os
+from datetime import datetime, timedelta
+
+CHANGE_COLUMNS = ['entity', 'entity_id', 'op', 'changed_at']
+RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 7))
+SETTLE_SECONDS = float(os.environ.get('CHANGE_LOG_SETTLE_SECONDS', 30))
+
+# PostgreSQL 이면 변경 기록 시 NOTIFY (커밋될 때 전달, /api/stream 브로드캐스터가 LISTEN)
+NOTIFY_CHANNEL = 'ex_app_changes'
+
+# 한 번에 돌려줄 최대 변경 수 (초과하면 전체 데이터를 다시 받도록 reset)
+MAX_CHANGES = 5000
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+
+def record_changes(db, entity, keys, op=UPSERT):
+    """
+    변경 기록 (커밋은 호출자)
+
+    Args:
+        entity: 테이블명 (daily_picks, news_events, ...)
+        keys: 행 키 목록 (id, performance_stats 는 stat_date)
+    """
+    now = datetime.now()
+    rows = [(entity, str(key), op, now) for key in keys if key is not None]
+    if not rows:
+        return 0
+    inserted = db.bulkInsert('change_log', CHANGE_COLUMNS, rows)['inserted']
+    if db.db_type == 'postgresql':
+        db.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, entity))
+    return inserted
+
+
+def log_entries(db, after, limit=MAX_CHANGES):
+    """버전 after 이후 변경 로그 원본 (id 순)"""
+    return db.executeAll(
+        "SELECT id, entity, entity_id, op, changed_at FROM change_log WHERE id > %s ORDER BY id LIMIT %s",
+        (after, limit)
+    )
+
+
+def current_version(db):
+    """확정된(SETTLE_SECONDS 이전) 최신 버전"""
+    cutoff = datetime.now() - timedelta(seconds=SETTLE_SECONDS)
+    row = db.executeOne("SELECT MAX(id) AS version FROM change_log WHERE changed_at <= %s", (cutoff,))
+    return (row and row['version']) or 0
+
+
+def latest_version(db):
+    """커밋된 마지막 change_log id (확정 지연 없음, 응답 캐시 무효화 판단용)"""
+    row = db.executeOne("SELECT MAX(id) AS version FROM change_log")
+    return (row and row['version']) or 0
+
+
+def parse_since(db, value):
+    """
+    since 파라미터 -> 버전 번호
+
+    숫자면 버전 그대로, 아니면 ISO 시각으로 보고 그 시각까지 기록된 마지막 버전
+    (형식이 틀리면 ValueError)
+    """
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    row = db.executeOne("SELECT MAX(id) AS version FROM change_log WHERE changed_at <= %s", (ts,))
+    return (row and row['version']) or 0
+
+
+def changes_since(db, since, entities=None):
+    """
+    since 버전 이후의 변경 (행별 마지막 op 기준)
+
+    Returns:
+        dict: {
+            'since', 'version': 다음 요청에 쓸 버전,
+            'reset': True 면 변경 로그가 부족하므로 전체 데이터를 다시 받아야 함,
+            'upserts': {entity: [key]}, 'deletes': {entity: [key]}
+        }
+    """
+    # 버전을 먼저 읽어야 이후 조회한 데이터보다 앞선 버전을 돌려준다
+    version = max(current_version(db), since)
+    delta = {'since': since, 'version': version, 'reset': False, 'upserts': {}, 'deletes': {}}
+
+    oldest = db.executeOne("SELECT MIN(id) AS oldest FROM change_log")
+    oldest = oldest and oldest['oldest']
+    # 로그가 비어 있는데 since 가 있으면 그 사이 변경이 모두 정리된 것 (prune 은 마지막 항목을
+    # 남기므로 보통은 없지만, 수동 정리 등에 대비)
+    if (oldest and since < oldest - 1) or (not oldest and since > 0):
+        delta['reset'] = True
+        return delta
+
+    rows = log_entries(db, since, MAX_CHANGES + 1)
+    if len(rows) > MAX_CHANGES:
+        delta['reset'] = True
+        return delta
+
+    latest = {}
+    for row in rows:
+        if entities is None or row['entity'] in entities:
+            latest[(row['entity'], row['entity_id'])] = row['op']
+    for (entity, key), op in latest.items():
+        target = delta['deletes'] if op == DELETE else delta['upserts']
+        target.setdefault(entity, []).append(key)
+    return delta
+
+
+def prune(db, days=RETENTION_DAYS):
+    """보존 기간이 지난 변경 로그 삭제, 마지막 항목은 정리 지점 표시로 남김 (커밋은 호출자)"""
+    latest = latest_version(db)
+    if not latest:
+        return 0
+    db.execute(
+        "DELETE FROM change_log WHERE changed_at < %s AND id < %s",
+        (datetime.now() - timedelta(days=days), latest)
+    )
+    return max(db.cursor.rowcount, 0)
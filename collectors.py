@@ -8,6 +8,14 @@ from datetime import datetime, timedelta
 import time
 import re
 
+# 소셜 멘션 슬라이딩 윈도우 저장소 및 레코드 타입
+try:
+    from app.ex_app.social_velocity import get_mention_store
+    from app.ex_app.records import NewsItem, Gainer, Mention, Filing
+except ImportError:
+    from social_velocity import get_mention_store
+    from records import NewsItem, Gainer, Mention, Filing
+
 # yfinance는 선택적 (설치되어 있으면 사용)
 try:
     import yfinance as yf
@@ -58,13 +66,13 @@ class FinvizCollector:
                         if len(date_cell) > 10:
                             current_date = date_cell.split()[0]
                         
-                        news_items.append({
-                            'symbol': symbol,
-                            'headline': link.text.strip(),
-                            'url': link.get('href', ''),
-                            'source': 'finviz',
-                            'published_at': current_date
-                        })
+                        news_items.append(NewsItem(
+                            symbol=symbol,
+                            headline=link.text.strip(),
+                            url=link.get('href', ''),
+                            source='finviz',
+                            published_at=current_date
+                        ))
             
             return news_items
         except Exception as e:
@@ -96,11 +104,11 @@ class FinvizCollector:
                     symbol = cols[1].text.strip()
                     change = cols[9].text.strip()
                     
-                    gainers.append({
-                        'symbol': symbol,
-                        'change_pct': change,
-                        'source': 'finviz'
-                    })
+                    gainers.append(Gainer(
+                        symbol=symbol,
+                        change_pct=change,
+                        source='finviz'
+                    ))
             
             return gainers
         except Exception as e:
@@ -264,6 +272,7 @@ class RedditCollector:
             for item in data.get('data', {}).get('children', []):
                 post = item.get('data', {})
                 posts.append({
+                    'id': post.get('id', ''),
                     'title': post.get('title', ''),
                     'score': post.get('score', 0),
                     'num_comments': post.get('num_comments', 0),
@@ -277,31 +286,46 @@ class RedditCollector:
             print(f"[Reddit] Error fetching from r/{subreddit}: {e}")
             return []
     
-    def extract_symbols_from_posts(self, posts):
-        """포스트에서 티커 심볼 추출"""
+    # 일반 영어 단어 필터링
+    STOPWORDS = {'THE', 'AND', 'FOR', 'BUT', 'NOT', 'YOU', 'ALL', 
+                 'CAN', 'HER', 'WAS', 'ONE', 'OUR', 'OUT', 'ARE',
+                 'HAS', 'HIS', 'HOW', 'ITS', 'LET', 'MAY', 'NEW',
+                 'NOW', 'OLD', 'SEE', 'WAY', 'WHO', 'BOY', 'DID',
+                 'GET', 'PUT', 'SAY', 'SHE', 'TOO', 'USE', 'BUY',
+                 'SELL', 'HOLD', 'CALL', 'PUTS', 'YOLO', 'DD', 'WSB'}
+    
+    def _extract_symbols(self, title):
+        """제목 하나에서 티커 심볼 추출"""
         # 일반적인 티커 패턴: $TSLA, TSLA, $tsla
         ticker_pattern = r'\$?[A-Z]{1,5}\b'
-        
+        matches = re.findall(ticker_pattern, title.upper())
+        symbols = [match.replace('$', '') for match in matches]
+        return [s for s in symbols if s not in self.STOPWORDS]
+    
+    def extract_symbols_from_posts(self, posts):
+        """포스트에서 티커 심볼 추출"""
         symbol_counts = {}
         
         for post in posts:
-            title = post.get('title', '').upper()
-            matches = re.findall(ticker_pattern, title)
-            
-            for match in matches:
-                symbol = match.replace('$', '')
-                # 일반 영어 단어 필터링
-                if symbol not in ['THE', 'AND', 'FOR', 'BUT', 'NOT', 'YOU', 'ALL', 
-                                  'CAN', 'HER', 'WAS', 'ONE', 'OUR', 'OUT', 'ARE',
-                                  'HAS', 'HIS', 'HOW', 'ITS', 'LET', 'MAY', 'NEW',
-                                  'NOW', 'OLD', 'SEE', 'WAY', 'WHO', 'BOY', 'DID',
-                                  'GET', 'PUT', 'SAY', 'SHE', 'TOO', 'USE', 'BUY',
-                                  'SELL', 'HOLD', 'CALL', 'PUTS', 'YOLO', 'DD', 'WSB']:
-                    symbol_counts[symbol] = symbol_counts.get(symbol, 0) + 1
+            for symbol in self._extract_symbols(post.get('title', '')):
+                symbol_counts[symbol] = symbol_counts.get(symbol, 0) + 1
         
         # 언급 횟수로 정렬
         sorted_symbols = sorted(symbol_counts.items(), key=lambda x: x[1], reverse=True)
-        return [{'symbol': s, 'mentions': c, 'source': 'reddit'} for s, c in sorted_symbols[:20]]
+        return [Mention(symbol=s, mentions=c, source='reddit') for s, c in sorted_symbols[:20]]
+    
+    def record_mentions(self, posts, store=None):
+        """포스트 작성 시각 기준으로 멘션을 슬라이딩 윈도우 저장소에 기록 (새 포스트만)"""
+        store = store or get_mention_store()
+        recorded = 0
+        for post in posts:
+            if not store.mark_seen(post.get('id')):
+                continue
+            timestamp = post.get('created_utc') or None
+            for symbol in self._extract_symbols(post.get('title', '')):
+                store.record(symbol, 1, timestamp)
+                recorded += 1
+        return recorded
 
 
 class SECEdgarCollector:
@@ -332,13 +356,13 @@ class SECEdgarCollector:
                     title_text = title.text
                     # "8-K - COMPANY NAME (0001234567) (Filer)" 형식
                     
-                    filings.append({
-                        'headline': title_text,
-                        'url': link.get('href') if link else '',
-                        'published_at': updated.text[:10] if updated else None,
-                        'source': 'sec',
-                        'catalyst_type': '8k_filing'
-                    })
+                    filings.append(Filing(
+                        headline=title_text,
+                        url=link.get('href') if link else '',
+                        published_at=updated.text[:10] if updated else None,
+                        source='sec',
+                        catalyst_type='8k_filing'
+                    ))
             
             return filings
         except Exception as e:
@@ -354,6 +378,7 @@ def collect_all_data(session_id=None):
         'top_gainers': [],
         'reddit_mentions': [],
         'sec_filings': [],
+        'mention_velocity': {},
         'errors': []
     }
     
@@ -372,6 +397,14 @@ def collect_all_data(session_id=None):
         penny_posts = reddit.get_hot_posts('pennystocks')
         all_posts = wsb_posts + penny_posts
         results['reddit_mentions'] = reddit.extract_symbols_from_posts(all_posts)
+        
+        # 멘션 급증률 (15m/1h/24h 윈도우)
+        store = get_mention_store()
+        reddit.record_mentions(all_posts, store)
+        results['mention_velocity'] = {
+            m['symbol']: store.stats(m['symbol']) for m in results['reddit_mentions']
+        }
+        store.save()
     except Exception as e:
         results['errors'].append(f"Reddit: {e}")
     
@@ -0,0 +1,398 @@
+# file name : dedup.py
+# pwd : /dal9/app/ex_app/dedup.py
+# 미국 증시 급등주 예측 앱 - 유사 헤드라인 클러스터링 (MinHash + LSH)
+#
+# 같은 기사가 여러 종목/소스(Finviz 종목별 뉴스, SEC 공시 제목)에 조금씩 다른
+# 헤드라인으로 반복 수집되므로, 분석/저장 전에 유사 헤드라인을 하나의
+# 대표 항목 + 관련 종목 리스트로 묶는다. 후보 탐색은 LSH 밴드 버킷으로
+# 하므로 전체 비교 없이 거의 선형 시간에 동작한다.
+#
+# "FDA Approves AAA ..." / "FDA Approves BBB ..." 처럼 같은 템플릿의 다른 종목 기사는
+# 헤드라인이 거의 같아도 묶지 않는다. 헤드라인이 직접 언급한 배치 내 종목이 상대
+# 클러스터의 종목(수집 종목 + 언급 종목)과 하나도 겹치지 않을 때만 충돌로 본다.
+# 수집 종목만 다른 같은 기사(AAA, BBB 종목 뉴스에 모두 실린 합병 기사 등)는 묶는다.
+#
+#   python dedup.py check   위 두 경우의 회귀 예제 실행 (실패 시 exit 1)
+
+import re
+import sys
+import zlib
+import random
+
+# MinHash 파라미터: 64개 해시 = 16 밴드 x 4 행 (유사도 임계값 약 0.5)
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 고정 시드로 해시 계수 생성 (실행 간 결과 동일)
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+_TICKER_PATTERN = re.compile(r'\b[A-Z][A-Z.]{0,9}\b')
+
+
+def _shingles(headline):
+    """헤드라인 -> 단어 단위 shingle 집합 (단어 + 인접 단어쌍)"""
+    tokens = _TOKEN_PATTERN.findall(headline.lower())
+    shingles = set(tokens)
+    shingles.update(f'{a} {b}' for a, b in zip(tokens, tokens[1:]))
+    return shingles
+
+
+def minhash_signature(headline):
+    """헤드라인의 MinHash 시그니처 (길이 NUM_PERM 튜플)"""
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in _shingles(headline)]
+    if not hashes:
+        return None
+
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def _estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _mentioned(item, known):
+    """헤드라인에 나온 배치 내 종목"""
+    return {t for t in _TICKER_PATTERN.findall(item.get('headline') or '') if t in known}
+
+
+def _conflicts(mentioned_a, tickers_a, mentioned_b, tickers_b):
+    """한쪽 헤드라인이 언급한 종목이 상대 클러스터 종목과 전혀 겹치지 않으면 다른 기사"""
+    return bool(
+        (mentioned_a and not (mentioned_a & tickers_b))
+        or (mentioned_b and not (mentioned_b & tickers_a))
+    )
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_headlines(items, threshold=SIMILARITY_THRESHOLD):
+    """
+    유사 헤드라인 항목을 클러스터로 묶어 대표 항목 리스트 반환
+
+    Args:
+        items: 'headline', 'symbol' 키를 가진 뉴스 레코드(records.NewsItem) 또는 dict 리스트
+        threshold: 같은 기사로 볼 추정 Jaccard 유사도
+
+    Returns:
+        list: 클러스터별 대표 항목. 원본 순서상 첫 항목을 대표로 쓰고
+              'symbols'(관련 종목), 'sources', 'duplicate_count' 를 추가한다.
+    """
+    signatures = [minhash_signature(item.get('headline') or '') for item in items]
+    parent = list(range(len(items)))
+
+    # 클러스터(루트)별 언급 종목과 전체 종목(수집 종목 + 언급 종목)
+    known = {(item.get('symbol') or '').upper() for item in items} - {''}
+    mentioned = [_mentioned(item, known) for item in items]
+    tickers = [
+        mentioned[i] | ({(item.get('symbol') or '').upper()} - {''})
+        for i, item in enumerate(items)
+    ]
+
+    # LSH: 밴드별 버킷에 같이 들어간 항목만 후보로, 버킷의 모든 기존 항목과 비교
+    for band in range(BANDS):
+        start = band * ROWS
+        buckets = {}
+        for i, sig in enumerate(signatures):
+            if sig is None:
+                continue
+            bucket = buckets.setdefault(sig[start:start + ROWS], [])
+            for j in bucket:
+                root_a, root_b = _find(parent, j), _find(parent, i)
+                if root_a == root_b:
+                    continue
+                if _conflicts(mentioned[root_a], tickers[root_a], mentioned[root_b], tickers[root_b]):
+                    continue
+                if _estimated_similarity(signatures[j], sig) >= threshold:
+                    root, child = min(root_a, root_b), max(root_a, root_b)
+                    parent[child] = root
+                    mentioned[root] = mentioned[root] | mentioned[child]
+                    tickers[root] = tickers[root] | tickers[child]
+            bucket.append(i)
+
+    clusters = {}
+    for i in range(len(items)):
+        clusters.setdefault(_find(parent, i), []).append(i)
+
+    representatives = []
+    for root in sorted(clusters):
+        members = [items[i] for i in clusters[root]]
+        # 대표 항목은 복사하지 않고 그대로 주석을 단다 (dict/records 레코드 모두 지원)
+        representative = members[0]
+
+        symbols = []
+        sources = []
+        for member in members:
+            symbol = (member.get('symbol') or '').upper()
+            if symbol and symbol not in symbols:
+                symbols.append(symbol)
+            source = member.get('source')
+            if source and source not in sources:
+                sources.append(source)
+
+        if not representative.get('symbol') and symbols:
+            representative['symbol'] = symbols[0]
+        representative['symbols'] = symbols
+        representative['sources'] = sources
+        representative['duplicate_count'] = len(members)
+        representatives.append(representative)
+
+    return representatives
+
+
+def dedupe_collected_data(collected_data):
+    """
+    collect_all_data() 결과의 뉴스/공시를 클러스터링하여 대체 (in-place)
+
+    Returns:
+        dict: 소스별 (원본 건수, 클러스터 건수)
+    """
+    summary = {}
+    for key in ('finviz_news', 'sec_filings'):
+        items = collected_data.get(key) or []
+        clustered = cluster_headlines(items)
+        collected_data[key] = clustered
+        summary[key] = (len(items), len(clustered))
+    return summary
+# file name : dedup.py
+# pwd : /dal9/app/ex_app/dedup.py
+# 미국 증시 급등주 예측 앱 - 유사 헤드라인 클러스터링 (MinHash + LSH)
+#
+# 같은 기사가 여러 종목/소스(Finviz 종목별 뉴스, SEC 공시 제목)에 조금씩 다른
+# 헤드라인으로 반복 수집되므로, 분석/저장 전에 유사 헤드라인을 하나의
+# 대표 항목 + 관련 종목 리스트로 묶는다. 후보 탐색은 LSH 밴드 버킷으로
+# 하므로 전체 비교 없이 거의 선형 시간에 동작한다.
+#
+# "FDA Approves AAA ..." / "FDA Approves BBB ..." 처럼 같은 템플릿의 다른 종목 기사는
+# 헤드라인이 거의 같아도 묶지 않는다. 헤드라인이 직접 언급한 배치 내 종목이 상대
+# 클러스터의 종목(수집 종목 + 언급 종목)과 하나도 겹치지 않을 때만 충돌로 본다.
+# 수집 종목만 다른 같은 기사(AAA, BBB 종목 뉴스에 모두 실린 합병 기사 등)는 묶는다.
+#
+#   python dedup.py check   위 두 경우의 회귀 예제 실행 (실패 시 exit 1)
+
+import re
+import sys
+import zlib
+import random
+
+# MinHash 파라미터: 64개 해시 = 16 밴드 x 4 행 (유사도 임계값 약 0.5)
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 고정 시드로 해시 계수 생성 (실행 간 결과 동일)
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+_TICKER_PATTERN = re.compile(r'\b[A-Z][A-Z.]{0,9}\b')
+
+
+def _shingles(headline):
+    """헤드라인 -> 단어 단위 shingle 집합 (단어 + 인접 단어쌍)"""
+    tokens = _TOKEN_PATTERN.findall(headline.lower())
+    shingles = set(tokens)
+    shingles.update(f'{a} {b}' for a, b in zip(tokens, tokens[1:]))
+    return shingles
+
+
+def minhash_signature(headline):
+    """헤드라인의 MinHash 시그니처 (길이 NUM_PERM 튜플)"""
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in _shingles(headline)]
+    if not hashes:
+        return None
+
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def _estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _mentioned(item, known):
+    """헤드라인에 나온 배치 내 종목"""
+    return {t for t in _TICKER_PATTERN.findall(item.get('headline') or '') if t in known}
+
+
+def _conflicts(mentioned_a, tickers_a, mentioned_b, tickers_b):
+    """한쪽 헤드라인이 언급한 종목이 상대 클러스터 종목과 전혀 겹치지 않으면 다른 기사"""
+    return bool(
+        (mentioned_a and not (mentioned_a & tickers_b))
+        or (mentioned_b and not (mentioned_b & tickers_a))
+    )
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_headlines(items, threshold=SIMILARITY_THRESHOLD):
+    """
+    유사 헤드라인 항목을 클러스터로 묶어 대표 항목 리스트 반환
+
+    Args:
+        items: 'headline', 'symbol' 키를 가진 뉴스 레코드(records.NewsItem) 또는 dict 리스트
+        threshold: 같은 기사로 볼 추정 Jaccard 유사도
+
+    Returns:
+        list: 클러스터별 대표 항목. 원본 순서상 첫 항목을 대표로 쓰고
+              'symbols'(관련 종목), 'sources', 'duplicate_count' 를 추가한다.
+    """
+    signatures = [minhash_signature(item.get('headline') or '') for item in items]
+    parent = list(range(len(items)))
+
+    # 클러스터(루트)별 언급 종목과 전체 종목(수집 종목 + 언급 종목)
+    known = {(item.get('symbol') or '').upper() for item in items} - {''}
+    mentioned = [_mentioned(item, known) for item in items]
+    tickers = [
+        mentioned[i] | ({(item.get('symbol') or '').upper()} - {''})
+        for i, item in enumerate(items)
+    ]
+
+    # LSH: 밴드별 버킷에 같이 들어간 항목만 후보로, 버킷의 모든 기존 항목과 비교
+    for band in range(BANDS):
+        start = band * ROWS
+        buckets = {}
+        for i, sig in enumerate(signatures):
+            if sig is None:
+                continue
+            bucket = buckets.setdefault(sig[start:start + ROWS], [])
+            for j in bucket:
+                root_a, root_b = _find(parent, j), _find(parent, i)
+                if root_a == root_b:
+                    continue
+                if _conflicts(mentioned[root_a], tickers[root_a], mentioned[root_b], tickers[root_b]):
+                    continue
+                if _estimated_similarity(signatures[j], sig) >= threshold:
+                    root, child = min(root_a, root_b), max(root_a, root_b)
+                    parent[child] = root
+                    mentioned[root] = mentioned[root] | mentioned[child]
+                    tickers[root] = tickers[root] | tickers[child]
+            bucket.append(i)
+
+    clusters = {}
+    for i in range(len(items)):
+        clusters.setdefault(_find(parent, i), []).append(i)
+
+    representatives = []
+    for root in sorted(clusters):
+        members = [items[i] for i in clusters[root]]
+        # 대표 항목은 복사하지 않고 그대로 주석을 단다 (dict/records 레코드 모두 지원)
+        representative = members[0]
+
+        symbols = []
+        sources = []
+        for member in members:
+            symbol = (member.get('symbol') or '').upper()
+            if symbol and symbol not in symbols:
+                symbols.append(symbol)
+            source = member.get('source')
+            if source and source not in sources:
+                sources.append(source)
+
+        if not representative.get('symbol') and symbols:
+            representative['symbol'] = symbols[0]
+        representative['symbols'] = symbols
+        representative['sources'] = sources
+        representative['duplicate_count'] = len(members)
+        representatives.append(representative)
+
+    return representatives
+
+
+def dedupe_collected_data(collected_data):
+    """
+    collect_all_data() 결과의 뉴스/공시를 클러스터링하여 대체 (in-place)
+
+    Returns:
+        dict: 소스별 (원본 건수, 클러스터 건수)
+    """
+    summary = {}
+    for key in ('finviz_news', 'sec_filings'):
+        items = collected_data.get(key) or []
+        clustered = cluster_headlines(items)
+        collected_data[key] = clustered
+        summary[key] = (len(items), len(clustered))
+    return summary
+
+
+# ============================================
+# 회귀 예제
+# ============================================
+
+# (이름, 입력 항목, 기대하는 클러스터별 종목)
+EXAMPLES = [
+    (
+        'same template, different tickers',
+        [
+            {'symbol': 'AAA', 'headline': 'FDA Approves AAA Cancer Drug After Phase 3 Trial Success'},
+            {'symbol': 'BBB', 'headline': 'FDA Approves BBB Cancer Drug After Phase 3 Trial Success'},
+        ],
+        [['AAA'], ['BBB']],
+    ),
+    (
+        'syndicated headline collected under two symbols',
+        [
+            {'symbol': 'AAA', 'headline': 'Acme Corp and Beta Inc announce merger agreement worth 2 billion'},
+            {'symbol': 'BBB', 'headline': 'Acme Corp and Beta Inc announce merger agreement worth 2 billion'},
+        ],
+        [['AAA', 'BBB']],
+    ),
+    (
+        'merger headline naming both tickers',
+        [
+            {'symbol': 'AAA', 'headline': 'AAA and BBB announce merger agreement worth 2 billion'},
+            {'symbol': 'BBB', 'headline': 'AAA and BBB announce merger agreement worth 2 billion dollars'},
+        ],
+        [['AAA', 'BBB']],
+    ),
+]
+
+
+def check_examples():
+    """EXAMPLES 실행, 실패한 예제 이름 리스트 반환"""
+    failures = []
+    for name, items, expected in EXAMPLES:
+        clusters = [item['symbols'] for item in cluster_headlines([dict(item) for item in items])]
+        ok = clusters == expected
+        print(f"[{'ok' if ok else 'FAIL'}] {name}: {clusters}")
+        if not ok:
+            failures.append(name)
+    return failures
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'check':
+        print("Usage: python dedup.py check")
+        sys.exit(1)
+    sys.exit(1 if check_examples() else 0)
@@ -2,9 +2,16 @@
 # pwd : /dal9/app/ex_app/index.py
 # 미국 증시 급등주 예측 앱 - 메인 라우트
 
-from flask import Blueprint, request, jsonify, render_template, make_response
-from datetime import datetime, timedelta
+from flask import Blueprint, Response, request, jsonify, render_template, make_response
+from datetime import datetime, date, timedelta
+from decimal import Decimal
 import json
+import base64
+import csv
+import io
+import itertools
+import functools
+from urllib.parse import urlencode
 
 # DB 모듈 import (PostgreSQL/MySQL 자동 선택)
 import os
@@ -22,8 +29,50 @@ else:
     except ImportError:
         from module import dbModule_ex_pg as dbModule_ex
 
+try:
+    from app.ex_app.rollup import refresh_for_picks
+    from app.ex_app.archive import iter_archive
+    from app.ex_app.jobs import enqueue, get_job
+    from app.ex_app.pipeline import ensure_session
+    from app.ex_app import cache
+    from app.ex_app.snapshot import get_snapshot, refresh_snapshot, build_delta, DELTA_ENTITIES
+    from app.ex_app.changes import record_changes, current_version, latest_version, parse_since, changes_since
+    from app.ex_app.stream import ChangeBroadcaster
+    from app.ex_app import serialization
+    from app.ex_app.projections import (NEWS_LIST_COLUMNS, ANALYSIS_LIST_COLUMNS, ANALYSIS_DETAIL_COLUMNS,
+                                        ANALYSIS_COLUMNS, analysis_values, decode_content)
+    from app.ex_app.ingest import KINDS as INGEST_KINDS, ingest, iter_ndjson
+except ImportError:
+    from rollup import refresh_for_picks
+    from archive import iter_archive
+    from jobs import enqueue, get_job
+    from pipeline import ensure_session
+    import cache
+    from snapshot import get_snapshot, refresh_snapshot, build_delta, DELTA_ENTITIES
+    from changes import record_changes, current_version, latest_version, parse_since, changes_since
+    from stream import ChangeBroadcaster
+    import serialization
+    from projections import (NEWS_LIST_COLUMNS, ANALYSIS_LIST_COLUMNS, ANALYSIS_DETAIL_COLUMNS,
+                             ANALYSIS_COLUMNS, analysis_values, decode_content)
+    from ingest import KINDS as INGEST_KINDS, ingest, iter_ndjson
+
 ex_app = Blueprint('ex_app', __name__, url_prefix='/ex_app')
 
+# /api/stream 뷰어들이 공유하는 change_log 구독 (프로세스당 하나)
+stream_broadcaster = ChangeBroadcaster(dbModule_ex)
+
+
+def _change_log_version():
+    """응답 캐시 무효화 기준 (다른 호스트의 작업 워커/cron 이 쓴 변경도 change_log 로 감지)"""
+    db = dbModule_ex.Database()
+    try:
+        return latest_version(db)
+    finally:
+        db.close()
+
+
+cache.response_cache.version_source = _change_log_version
+
 @ex_app.before_request
 def handle_preflight():
     """CORS preflight 처리"""
@@ -35,52 +84,162 @@ def handle_preflight():
         return response, 200
 
 
+@ex_app.record_once
+def install_json_provider(state):
+    """jsonify() 를 orjson 기반 공급자로 교체 (serialization.py, 출력 형식은 Flask 기본과 동일)"""
+    if serialization.HAS_FLASK_PROVIDER:
+        state.app.json = serialization.FastJSONProvider(state.app)
+
+
+@ex_app.after_request
+def invalidate_response_cache(response):
+    """쓰기 요청이 성공하면 응답 캐시 세대 증가"""
+    if request.method in ('POST', 'PATCH', 'PUT', 'DELETE') and response.status_code < 400:
+        cache.invalidate()
+    return response
+
+
+@ex_app.after_request
+def compress_response(response):
+    """Accept-Encoding 협상 후 큰 응답을 br/gzip 으로 압축 (cached_json 응답은 이미 압축됨)"""
+    return serialization.compress_response(response, request.accept_encodings)
+
+
+def cached_json(view):
+    """
+    읽기 API 응답 캐시 + ETag (cache.py)
+    키: 라우트 + 정렬된 쿼리 인자 + 오늘 날짜, 200 응답만 저장
+    If-None-Match 가 일치하면 DB 조회 없이 304
+    압축 본문은 인코딩별로 프로세스 내 항목에 보관해 요청마다 다시 압축하지 않음
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not cache.CACHE_ENABLED:
+            return view(*args, **kwargs)
+
+        query = urlencode(sorted(request.args.items(multi=True)))
+        key = f"{request.path}?{query}#{date.today().isoformat()}"
+        generation = cache.response_cache.generation()
+        entry = cache.response_cache.get(key, generation)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = cache.response_cache.put(key, generation, response.get_data(), response.mimetype)
+
+        response = make_response(entry['body'])
+        response.mimetype = entry['mimetype']
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        serialization.compress_response(response, request.accept_encodings, entry.setdefault('encoded', {}))
+        return response.make_conditional(request)
+    return wrapper
+
+
+# ============================================
+# 키셋 페이지네이션
+# ============================================
+
+PAGE_SIZE_MAX = 200
+
+
+def _encode_cursor(row, ts_field):
+    """다음 페이지 토큰 (마지막 행의 (시각, id) 를 base64url 로 감싼 불투명 문자열)"""
+    ts = row[ts_field]
+    raw = json.dumps([ts.isoformat() if isinstance(ts, (datetime, date)) else ts, row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(token):
+    """토큰 -> (datetime, id), 형식이 틀리면 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        ts, row_id = json.loads(raw)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid cursor: {token}") from e
+
+
+def _page_args(default_limit=50):
+    """limit/cursor 쿼리 인자 (limit 은 1~PAGE_SIZE_MAX, cursor 가 잘못되면 ValueError)"""
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), PAGE_SIZE_MAX))
+    cursor = request.args.get('cursor')
+    return limit, (_decode_cursor(cursor) if cursor else None)
+
+
+def _page(rows, limit, ts_field):
+    """limit + 1 행 조회 결과 -> (페이지 행, 다음 페이지 토큰 또는 None)"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, _encode_cursor(rows[-1], ts_field)
+    return rows, None
+
+
+def _changes_since(db, entities):
+    """
+    since 쿼리 인자가 있으면 그 이후 변경 조회 (changes.py)
+
+    Returns:
+        dict 또는 None: since 가 없거나 변경 로그가 부족하면(reset) None -> 전체 응답
+    """
+    since = request.args.get('since')
+    if not since:
+        return None
+    delta = changes_since(db, parse_since(db, since), entities)
+    return None if delta['reset'] else delta
+
+
+def _picks_history(db, limit, cursor):
+    """전체 예측 이력 (최신순, 결과 포함) 한 페이지"""
+    where, args = '', ()
+    if cursor:
+        where = f"WHERE {db.keysetCondition('dp.created_at', 'dp.id')}"
+        args = db.keysetArgs(*cursor)
+    rows = db.executeAll(f"""
+        SELECT 
+            dp.*,
+            s.name as stock_name,
+            s.market_cap,
+            s.sector,
+            pr.price_at_open,
+            pr.gain_pct_eod,
+            pr.is_successful
+        FROM daily_picks dp
+        LEFT JOIN stocks s ON dp.symbol = s.symbol
+        LEFT JOIN prediction_results pr ON dp.id = pr.pick_id
+        {where}
+        ORDER BY dp.created_at DESC, dp.id DESC
+        LIMIT %s
+    """, (*args, limit + 1))
+    return _page(rows, limit, 'created_at')
+
+
+def _insert_analysis(db, values):
+    """ai_analysis 한 행 저장 (projections.analysis_values() 결과) 후 새 id 반환 (커밋은 호출자)"""
+    db.execute(f"""
+        INSERT INTO ai_analysis ({', '.join(ANALYSIS_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(ANALYSIS_COLUMNS))})
+    """, values)
+    analysis_id = db.lid()
+    record_changes(db, 'ai_analysis', [analysis_id])
+    return analysis_id
+
+
 # ============================================
 # 페이지 라우트
 # ============================================
 
 @ex_app.route('/')
 def dashboard():
-    """메인 대시보드"""
+    """메인 대시보드 (수집/결과 저장 시 갱신되는 스냅샷 한 행으로 렌더링)"""
     db = dbModule_ex.Database()
     try:
-        # 오늘의 세션 확인
-        today = datetime.now().strftime('%Y-%m-%d')
-        session = db.executeOne(
-            "SELECT * FROM collection_sessions WHERE session_date = %s ORDER BY id DESC LIMIT 1",
-            (today,)
-        )
-        
-        # 최근 Picks
-        recent_picks = db.executeAll("""
-            SELECT dp.*, s.name as stock_name 
-            FROM daily_picks dp
-            LEFT JOIN stocks s ON dp.symbol = s.symbol
-            ORDER BY dp.created_at DESC LIMIT 10
-        """)
-        
-        # 성과 통계
-        stats = db.executeOne("""
-            SELECT 
-                COUNT(*) as total_picks,
-                SUM(CASE WHEN pr.is_successful = 1 THEN 1 ELSE 0 END) as successful,
-                AVG(pr.gain_pct_eod) as avg_gain
-            FROM daily_picks dp
-            LEFT JOIN prediction_results pr ON dp.id = pr.pick_id
-            WHERE dp.created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        """)
-        
-        # 최근 뉴스
-        recent_news = db.executeAll("""
-            SELECT * FROM news_events 
-            ORDER BY collected_at DESC LIMIT 20
-        """)
-        
+        snapshot = get_snapshot(db)
         return render_template('ex_app/dashboard.html', 
-                             session=session,
-                             recent_picks=recent_picks,
-                             stats=stats,
-                             recent_news=recent_news)
+                             session=snapshot['session'],
+                             recent_picks=snapshot['recent_picks'],
+                             stats=snapshot['stats'],
+                             recent_news=snapshot['recent_news'])
     except Exception as e:
         print(f"[EX_APP] Dashboard Error: {e}")
         return render_template('ex_app/dashboard.html', 
@@ -91,27 +250,20 @@ def dashboard():
 
 @ex_app.route('/predictions')
 def predictions():
-    """예측 목록 페이지"""
+    """예측 목록 페이지 (?cursor= 로 이전 기록 페이지 이동)"""
     db = dbModule_ex.Database()
     try:
-        picks = db.executeAll("""
-            SELECT 
-                dp.*,
-                s.name as stock_name,
-                s.market_cap,
-                pr.price_at_open,
-                pr.gain_pct_eod,
-                pr.is_successful
-            FROM daily_picks dp
-            LEFT JOIN stocks s ON dp.symbol = s.symbol
-            LEFT JOIN prediction_results pr ON dp.id = pr.pick_id
-            ORDER BY dp.created_at DESC
-            LIMIT 50
-        """)
-        return render_template('ex_app/predictions.html', picks=picks)
+        try:
+            cursor = _decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            cursor = None
+        picks, next_cursor = _picks_history(db, 50, cursor)
+        return render_template('ex_app/predictions.html', picks=picks,
+                             next_cursor=next_cursor, is_first_page=cursor is None)
     except Exception as e:
         print(f"[EX_APP] Predictions Error: {e}")
-        return render_template('ex_app/predictions.html', picks=[])
+        return render_template('ex_app/predictions.html', picks=[],
+                             next_cursor=None, is_first_page=True)
     finally:
         db.close()
 
@@ -142,34 +294,24 @@ def history():
 @ex_app.route('/api/session/start', methods=['POST'])
 def start_session():
     """새 수집 세션 시작"""
-    db = dbModule_ex.Database()
+    db = dbModule_ex.Database(use_primary=True)
     try:
         today = datetime.now().strftime('%Y-%m-%d')
         
-        # 기존 세션 확인
-        existing = db.executeOne(
-            "SELECT * FROM collection_sessions WHERE session_date = %s",
-            (today,)
-        )
+        # 기존 세션 확인 또는 생성 (session_date UNIQUE 로 동시 요청에도 하나만 생성)
+        session, created = ensure_session(db, today)
+        db.commit()
         
-        if existing:
+        if not created:
             return jsonify({
                 "status": "exists",
-                "session_id": existing['id'],
+                "session_id": session['id'],
                 "message": "오늘 세션이 이미 존재합니다."
             })
         
-        # 새 세션 생성
-        db.execute("""
-            INSERT INTO collection_sessions (session_date, status)
-            VALUES (%s, 'collecting')
-        """, (today,))
-        db.commit()
-        session_id = db.lid()
-        
         return jsonify({
             "status": "created",
-            "session_id": session_id,
+            "session_id": session['id'],
             "message": "새 수집 세션이 시작되었습니다."
         })
     except Exception as e:
@@ -180,25 +322,52 @@ def start_session():
 
 
 @ex_app.route('/api/news', methods=['GET'])
+@cached_json
 def get_news():
-    """수집된 뉴스 목록 조회"""
+    """
+    수집된 뉴스 목록 조회 (최신순)
+    Query: limit (최대 200), symbol, cursor (이전 응답의 next_cursor)
+    """
     db = dbModule_ex.Database()
     try:
-        limit = request.args.get('limit', 50, type=int)
+        try:
+            limit, cursor = _page_args()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
         symbol = request.args.get('symbol', None)
         
+        conditions, args = [], []
         if symbol:
-            news = db.executeAll("""
-                SELECT * FROM news_events 
-                WHERE symbol = %s
-                ORDER BY collected_at DESC LIMIT %s
-            """, (symbol, limit))
-        else:
-            news = db.executeAll("""
-                SELECT * FROM news_events 
-                ORDER BY collected_at DESC LIMIT %s
-            """, (limit,))
+            conditions.append("symbol = %s")
+            args.append(symbol)
+        if cursor:
+            conditions.append(db.keysetCondition('collected_at', 'id'))
+            args.extend(db.keysetArgs(*cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
         
+        rows = db.executeAll(f"""
+            SELECT {NEWS_LIST_COLUMNS} FROM news_events 
+            {where}
+            ORDER BY collected_at DESC, id DESC LIMIT %s
+        """, (*args, limit + 1))
+        news, next_cursor = _page(rows, limit, 'collected_at')
+        
+        return jsonify({"status": "success", "news": news, "next_cursor": next_cursor})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        db.close()
+
+
+@ex_app.route('/api/news/<int:news_id>', methods=['GET'])
+@cached_json
+def get_news_detail(news_id):
+    """뉴스 상세 (전체 컬럼)"""
+    db = dbModule_ex.Database()
+    try:
+        news = db.executeOne("SELECT * FROM news_events WHERE id = %s", (news_id,))
+        if not news:
+            return jsonify({"status": "error", "message": "news not found"}), 404
         return jsonify({"status": "success", "news": news})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -227,9 +396,12 @@ def add_news():
             data.get('importance_score', 0),
             data.get('published_at')
         ))
+        news_id = db.lid()
+        record_changes(db, 'news_events', [news_id])
+        refresh_snapshot(db)
         db.commit()
         
-        return jsonify({"status": "success", "id": db.lid()})
+        return jsonify({"status": "success", "id": news_id})
     except Exception as e:
         db.rollback()
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -237,11 +409,29 @@ def add_news():
         db.close()
 
 
+@ex_app.route('/api/news/batch', methods=['POST'])
+def add_news_batch():
+    """뉴스 대량 추가 (NDJSON, 줄별 결과 반환)"""
+    return _ingest_response('news')
+
+
 @ex_app.route('/api/picks', methods=['GET'])
+@cached_json
 def get_picks():
-    """오늘의 예측 목록"""
+    """
+    오늘의 예측 목록
+    scope=all 또는 cursor 를 주면 전체 이력을 최신순으로 페이지 조회 (limit 최대 200)
+    """
     db = dbModule_ex.Database()
     try:
+        if request.args.get('scope') == 'all' or request.args.get('cursor'):
+            try:
+                limit, cursor = _page_args()
+            except ValueError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+            picks, next_cursor = _picks_history(db, limit, cursor)
+            return jsonify({"status": "success", "picks": picks, "next_cursor": next_cursor})
+        
         today = datetime.now().strftime('%Y-%m-%d')
         
         picks = db.executeAll("""
@@ -285,9 +475,13 @@ def add_pick():
             data.get('predicted_target'),
             data.get('reasoning')
         ))
+        pick_id = db.lid()
+        record_changes(db, 'daily_picks', [pick_id])
+        refresh_for_picks(db, [pick_id])
+        refresh_snapshot(db)
         db.commit()
         
-        return jsonify({"status": "success", "id": db.lid()})
+        return jsonify({"status": "success", "id": pick_id})
     except Exception as e:
         db.rollback()
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -295,6 +489,12 @@ def add_pick():
         db.close()
 
 
+@ex_app.route('/api/picks/batch', methods=['POST'])
+def add_picks_batch():
+    """예측 대량 추가 (NDJSON, session_id 가 없으면 오늘 세션)"""
+    return _ingest_response('picks')
+
+
 @ex_app.route('/api/stocks', methods=['GET'])
 def get_stocks():
     """종목 목록 조회"""
@@ -308,51 +508,129 @@ def get_stocks():
         db.close()
 
 
+STOCK_COLUMNS = ['symbol', 'name', 'sector', 'market_cap', 'float_shares', 'is_smallcap', 'is_penny']
+
+RESULT_COLUMNS = [
+    'pick_id', 'price_at_open', 'price_1h', 'price_2h', 'price_eod', 'high_of_day',
+    'low_of_day', 'volume_day', 'gain_pct_1h', 'gain_pct_eod', 'is_successful'
+]
+
+
+def _stock_row(data):
+    """요청 데이터 -> stocks 행 튜플"""
+    return (
+        (data.get('symbol') or '').upper(),
+        data.get('name'),
+        data.get('sector'),
+        data.get('market_cap'),
+        data.get('float_shares'),
+        data.get('is_smallcap', False),
+        data.get('is_penny', False)
+    )
+
+
+def _result_row(pick_id, data):
+    """요청 데이터 -> prediction_results 행 튜플"""
+    return (pick_id,) + tuple(data.get(column) for column in RESULT_COLUMNS[1:])
+
+
+def _batch_records(data, key):
+    """배치 요청 본문: JSON 배열 또는 {key: [...]}"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and isinstance(data.get(key), list):
+        return data[key]
+    raise ValueError(f"JSON 배열 또는 {{\"{key}\": [...]}} 형식이어야 합니다.")
+
+
+def _ingest_response(kind):
+    """
+    NDJSON 대량 적재 공통 처리 (ingest.py)
+    본문은 스트림에서 한 줄씩 읽음 (Content-Type 이 application/json 이면 JSON 배열도 허용)
+    """
+    db = dbModule_ex.Database()
+    try:
+        if request.mimetype == 'application/json':
+            records = enumerate(_batch_records(request.json, INGEST_KINDS[kind]['key']), 1)
+        else:
+            records = iter_ndjson(request.stream)
+        
+        session_id = None
+        if kind != 'news':
+            session = db.executeOne(
+                "SELECT id FROM collection_sessions WHERE session_date = %s",
+                (datetime.now().strftime('%Y-%m-%d'),)
+            )
+            session_id = session['id'] if session else None
+        
+        results = ingest(db, records, kind, session_id)
+        inserted = sum(1 for result in results if 'id' in result)
+        if inserted and kind in ('news', 'picks'):
+            if kind == 'picks':
+                # 레코드의 session_id 가 다른 날짜의 세션일 수 있으므로 적재된 예측 기준으로 갱신
+                refresh_for_picks(db, [result['id'] for result in results if 'id' in result])
+            refresh_snapshot(db)
+            db.commit()
+        
+        return jsonify({
+            "status": "success",
+            "inserted": inserted,
+            "failed": len(results) - inserted,
+            "results": results
+        })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        db.close()
+
+
 @ex_app.route('/api/stocks', methods=['POST'])
 def add_stock():
     """종목 추가/업데이트"""
     db = dbModule_ex.Database()
     try:
         data = request.json
-        symbol = data.get('symbol', '').upper()
+        row = _stock_row(data)
         
-        # 기존 종목 확인
-        existing = db.executeOne("SELECT id FROM stocks WHERE symbol = %s", (symbol,))
+        db.upsertMany('stocks', STOCK_COLUMNS, [row], ['symbol'], returning=None)
+        db.commit()
+        return jsonify({"status": "success", "symbol": row[0]})
+    except Exception as e:
+        db.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        db.close()
+
+
+@ex_app.route('/api/stocks/batch', methods=['POST'])
+def add_stocks_batch():
+    """종목 일괄 추가/업데이트 (배열 요청, 배치당 UPSERT 한 문장)"""
+    db = dbModule_ex.Database()
+    try:
+        records = _batch_records(request.json, 'stocks')
         
-        if existing:
-            # 업데이트
-            db.execute("""
-                UPDATE stocks SET 
-                    name = %s, sector = %s, market_cap = %s, 
-                    float_shares = %s, is_smallcap = %s, is_penny = %s
-                WHERE symbol = %s
-            """, (
-                data.get('name'),
-                data.get('sector'),
-                data.get('market_cap'),
-                data.get('float_shares'),
-                data.get('is_smallcap', False),
-                data.get('is_penny', False),
-                symbol
-            ))
-        else:
-            # 삽입
-            db.execute("""
-                INSERT INTO stocks 
-                (symbol, name, sector, market_cap, float_shares, is_smallcap, is_penny)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                symbol,
-                data.get('name'),
-                data.get('sector'),
-                data.get('market_cap'),
-                data.get('float_shares'),
-                data.get('is_smallcap', False),
-                data.get('is_penny', False)
-            ))
+        rows = []
+        errors = []
+        for index, data in enumerate(records):
+            if not isinstance(data, dict) or not data.get('symbol'):
+                errors.append({"index": index, "error": "symbol is required"})
+                continue
+            rows.append(_stock_row(data))
         
+        returned = db.upsertMany('stocks', STOCK_COLUMNS, rows, ['symbol'])
         db.commit()
-        return jsonify({"status": "success", "symbol": symbol})
+        
+        return jsonify({
+            "status": "success",
+            "count": len(returned),
+            "ids": {row['symbol']: row['id'] for row in returned},
+            "errors": errors
+        })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         db.rollback()
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -361,59 +639,54 @@ def add_stock():
 
 
 @ex_app.route('/api/results/<int:pick_id>', methods=['POST'])
-def update_result():
+def update_result(pick_id):
     """예측 결과 업데이트"""
     db = dbModule_ex.Database()
     try:
         data = request.json
-        pick_id = request.view_args['pick_id']
         
-        # 기존 결과 확인
-        existing = db.executeOne("SELECT id FROM prediction_results WHERE pick_id = %s", (pick_id,))
+        db.upsertMany('prediction_results', RESULT_COLUMNS, [_result_row(pick_id, data)],
+                      ['pick_id'], returning=None)
+        refresh_for_picks(db, [pick_id])
+        refresh_snapshot(db)
+        db.commit()
+        return jsonify({"status": "success"})
+    except Exception as e:
+        db.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        db.close()
+
+
+@ex_app.route('/api/results/batch', methods=['POST'])
+def update_results_batch():
+    """예측 결과 일괄 업데이트 (배열 요청, 각 항목에 pick_id 필수)"""
+    db = dbModule_ex.Database()
+    try:
+        records = _batch_records(request.json, 'results')
         
-        if existing:
-            db.execute("""
-                UPDATE prediction_results SET
-                    price_at_open = %s, price_1h = %s, price_2h = %s,
-                    price_eod = %s, high_of_day = %s, low_of_day = %s,
-                    volume_day = %s, gain_pct_1h = %s, gain_pct_eod = %s,
-                    is_successful = %s
-                WHERE pick_id = %s
-            """, (
-                data.get('price_at_open'),
-                data.get('price_1h'),
-                data.get('price_2h'),
-                data.get('price_eod'),
-                data.get('high_of_day'),
-                data.get('low_of_day'),
-                data.get('volume_day'),
-                data.get('gain_pct_1h'),
-                data.get('gain_pct_eod'),
-                data.get('is_successful'),
-                pick_id
-            ))
-        else:
-            db.execute("""
-                INSERT INTO prediction_results 
-                (pick_id, price_at_open, price_1h, price_2h, price_eod, 
-                 high_of_day, low_of_day, volume_day, gain_pct_1h, gain_pct_eod, is_successful)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                pick_id,
-                data.get('price_at_open'),
-                data.get('price_1h'),
-                data.get('price_2h'),
-                data.get('price_eod'),
-                data.get('high_of_day'),
-                data.get('low_of_day'),
-                data.get('volume_day'),
-                data.get('gain_pct_1h'),
-                data.get('gain_pct_eod'),
-                data.get('is_successful')
-            ))
+        rows = []
+        errors = []
+        for index, data in enumerate(records):
+            pick_id = data.get('pick_id') if isinstance(data, dict) else None
+            if isinstance(pick_id, bool) or not isinstance(pick_id, int):
+                errors.append({"index": index, "error": "integer pick_id is required"})
+                continue
+            rows.append(_result_row(pick_id, data))
         
+        returned = db.upsertMany('prediction_results', RESULT_COLUMNS, rows, ['pick_id'])
+        refresh_for_picks(db, [row['pick_id'] for row in returned])
+        refresh_snapshot(db)
         db.commit()
-        return jsonify({"status": "success"})
+        
+        return jsonify({
+            "status": "success",
+            "count": len(returned),
+            "ids": {str(row['pick_id']): row['id'] for row in returned},
+            "errors": errors
+        })
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         db.rollback()
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -422,19 +695,19 @@ def update_result():
 
 
 @ex_app.route('/api/stats/summary', methods=['GET'])
+@cached_json
 def get_stats_summary():
-    """통계 요약"""
+    """통계 요약 (일별 롤업 합산)"""
     db = dbModule_ex.Database()
     try:
         stats = db.executeOne("""
             SELECT 
-                COUNT(DISTINCT dp.id) as total_picks,
-                SUM(CASE WHEN pr.is_successful = 1 THEN 1 ELSE 0 END) as successful_picks,
-                ROUND(AVG(pr.gain_pct_eod), 2) as avg_gain,
-                MAX(pr.gain_pct_eod) as best_gain,
-                MIN(pr.gain_pct_eod) as worst_gain
-            FROM daily_picks dp
-            LEFT JOIN prediction_results pr ON dp.id = pr.pick_id
+                SUM(total_picks) as total_picks,
+                SUM(successful_picks) as successful_picks,
+                ROUND(SUM(gain_sum) / NULLIF(SUM(gain_count), 0), 2) as avg_gain,
+                MAX(best_pick_gain) as best_gain,
+                MIN(worst_pick_gain) as worst_gain
+            FROM performance_stats
         """)
         
         return jsonify({"status": "success", "stats": stats})
@@ -444,6 +717,249 @@ def get_stats_summary():
         db.close()
 
 
+@ex_app.route('/api/stats/breakdown', methods=['GET'])
+def get_stats_breakdown():
+    """
+    카테고리/촉매 유형별 성과 (일별 롤업 합산)
+    Query: dimension = category | catalyst (기본 category), days (기본 30)
+    """
+    db = dbModule_ex.Database()
+    try:
+        dimension = request.args.get('dimension', 'category')
+        if dimension not in ('category', 'catalyst'):
+            return jsonify({"status": "error", "message": "dimension must be category or catalyst"}), 400
+        start, end = db.recentRange(request.args.get('days', 30, type=int))
+        
+        breakdown = db.executeAll(f"""
+            SELECT 
+                dim_value,
+                SUM(total_picks) as total_picks,
+                SUM(successful_picks) as successful_picks,
+                ROUND(SUM(gain_sum) / NULLIF(SUM(gain_count), 0), 2) as avg_gain
+            FROM performance_breakdown
+            WHERE dimension = %s AND {db.rangeCondition('stat_date')}
+            GROUP BY dim_value
+            ORDER BY total_picks DESC
+        """, (dimension, start.date(), end.date()))
+        
+        return jsonify({"status": "success", "dimension": dimension, "breakdown": breakdown})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        db.close()
+
+
+# ============================================
+# 데이터 내보내기 (오프라인 백테스트용)
+# ============================================
+# 서버 측 커서(Database.iterate)로 읽어 NDJSON/CSV 로 스트리밍하므로
+# 행 수와 무관하게 워커 메모리 사용량이 일정하다.
+#   GET /ex_app/api/export/news?format=csv&since=2024-01-01&until=2024-06-30
+
+EXPORTS = {
+    'news': {
+        'columns': [
+            'id', 'symbol', 'headline', 'source', 'url', 'importance_score',
+            'catalyst_type', 'sentiment_score', 'related_symbols', 'published_at', 'collected_at'
+        ],
+        'from': 'news_events',
+        'time_column': 'collected_at',
+    },
+    'picks': {
+        'columns': [
+            'id', 'session_id', 'symbol', 'pick_rank', 'category', 'confidence_score',
+            'entry_price', 'predicted_target', 'news_score', 'momentum_score', 'social_score',
+            'reasoning', 'created_at'
+        ],
+        'from': 'daily_picks',
+        'time_column': 'created_at',
+    },
+    'results': {
+        'columns': [
+            'pr.id', 'pr.pick_id', 'dp.symbol', 'dp.category', 'dp.confidence_score',
+            'dp.created_at AS picked_at', 'pr.price_at_open', 'pr.price_1h', 'pr.price_2h',
+            'pr.price_eod', 'pr.high_of_day', 'pr.low_of_day', 'pr.volume_day',
+            'pr.gain_pct_1h', 'pr.gain_pct_eod', 'pr.is_successful'
+        ],
+        'from': 'prediction_results pr JOIN daily_picks dp ON dp.id = pr.pick_id',
+        'time_column': 'dp.created_at',
+    },
+}
+
+EXPORT_BATCH_SIZE = 2000
+
+
+def _json_default(value):
+    """NDJSON 직렬화: datetime/date -> ISO 8601, Decimal -> float"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _export_query(export, since=None, until=None):
+    """내보내기 SQL과 인자 (until 은 해당 날짜 포함)"""
+    column = export['time_column']
+    conditions = []
+    args = []
+    if since:
+        conditions.append(f"{column} >= %s")
+        args.append(dbModule_ex.Database.dayRange(since)[0])
+    if until:
+        conditions.append(f"{column} < %s")
+        args.append(dbModule_ex.Database.dayRange(until)[1])
+    
+    query = f"SELECT {', '.join(export['columns'])} FROM {export['from']}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {column}"
+    return query, tuple(args)
+
+
+def _stream_rows(rows, fmt, columns):
+    """행을 EXPORT_BATCH_SIZE 단위로 묶어 전송 (연결 반납은 응답 close 시점, export_data 참고)"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    
+    count = 0
+    for row in rows:
+        if writer:
+            writer.writerow(['' if v is None else v for v in row.values()])
+        else:
+            buffer.write(json.dumps(row, default=_json_default, ensure_ascii=False))
+            buffer.write('\n')
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+    print(f"[EX_APP] Export finished: {count} rows")
+
+
+@ex_app.route('/api/export/<kind>', methods=['GET'])
+def export_data(kind):
+    """
+    뉴스/예측/결과 전체 이력 스트리밍 내보내기
+    Query: format=ndjson|csv, since=YYYY-MM-DD, until=YYYY-MM-DD,
+           archive=1 (news 전용, 보존 기간이 지나 아카이브된 월 포함)
+    """
+    export = EXPORTS.get(kind)
+    if export is None:
+        return jsonify({"status": "error", "message": f"unknown export: {kind}"}), 404
+    
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({"status": "error", "message": "format must be ndjson or csv"}), 400
+    
+    since = request.args.get('since')
+    until = request.args.get('until')
+    try:
+        query, args = _export_query(export, since, until)
+    except ValueError:
+        return jsonify({"status": "error", "message": "since/until must be YYYY-MM-DD"}), 400
+    
+    columns = [c.split(' AS ')[-1].split('.')[-1] for c in export['columns']]
+    db = dbModule_ex.Database()
+    rows = db.iterate(query, args, batch_size=EXPORT_BATCH_SIZE)
+    if kind == 'news' and request.args.get('archive') == '1':
+        # 아카이브(과거 월) -> 핫 테이블(최근 월) 순으로 이어 붙임
+        archived = ({c: row.get(c) for c in columns} for row in iter_archive(since, until))
+        rows = itertools.chain(archived, rows)
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(_stream_rows(rows, fmt, columns), mimetype=mimetype)
+    # 본문을 읽기 전에 끊긴 요청(HEAD, 클라이언트 종료)도 연결을 반납하도록 close 시점에 등록
+    response.call_on_close(db.close)
+    response.headers['Content-Disposition'] = f'attachment; filename=ex_app_{kind}.{fmt}'
+    return response
+
+
+# ============================================
+# 실시간 피드
+# ============================================
+
+@ex_app.route('/api/stream', methods=['GET'])
+def stream_changes():
+    """
+    실시간 피드 (Server-Sent Events)
+    새 예측(event: pick), 뉴스(event: news), 세션 상태(event: session)를 push
+    """
+    subscriber = stream_broadcaster.subscribe()
+    if subscriber is None:
+        return jsonify({"status": "error", "message": "too many stream connections"}), 503
+    
+    response = Response(subscriber.events(), mimetype='text/event-stream')
+    # 본문을 한 번도 읽지 않고 닫히는 응답도 해제되도록 close 시점에 등록
+    response.call_on_close(functools.partial(stream_broadcaster.unsubscribe, subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ============================================
+# 관리자 API
+# ============================================
+
+@ex_app.route('/api/admin/db/pool', methods=['GET'])
+def get_db_pool_stats():
+    """DB 커넥션 풀 대기 시간/사용률 통계와 복제본 라우팅 상태 (현재 워커 프로세스 기준)"""
+    try:
+        return jsonify({
+            "status": "success",
+            "pid": os.getpid(),
+            "pools": dbModule_ex.pool_stats(),
+            "replica": dbModule_ex.replica_stats()
+        })
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@ex_app.route('/api/admin/db/queries', methods=['GET'])
+def get_db_query_stats():
+    """
+    쿼리 지문별 호출 수/시간 히스토그램과 최근 슬로우 쿼리 (현재 워커 프로세스 기준)
+    Query: top (기본 50), order_by = total_ms | avg_ms | max_ms | calls | rows
+    """
+    try:
+        top = request.args.get('top', 50, type=int)
+        order_by = request.args.get('order_by', 'total_ms')
+        if order_by not in ('total_ms', 'avg_ms', 'max_ms', 'calls', 'rows', 'errors'):
+            return jsonify({"status": "error", "message": f"invalid order_by: {order_by}"}), 400
+        return jsonify({"status": "success", **dbModule_ex.query_stats(top, order_by)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@ex_app.route('/api/admin/db/queries', methods=['DELETE'])
+def reset_db_query_stats():
+    """쿼리 집계 초기화 (현재 워커 프로세스)"""
+    try:
+        dbModule_ex.reset_query_stats()
+        return jsonify({"status": "success", "pid": os.getpid()})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@ex_app.route('/api/admin/cache', methods=['GET'])
+def get_response_cache_stats():
+    """응답 캐시 적중률/세대 번호 (현재 워커 프로세스 기준)"""
+    try:
+        return jsonify({
+            "status": "success",
+            "pid": os.getpid(),
+            "cache": cache.response_cache.stats(),
+            "stream": stream_broadcaster.stats()
+        })
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 # ============================================
 # AI 분석 API (Claude가 사용)
 # ============================================
@@ -453,26 +969,26 @@ def ai_analysis_page():
     """AI 분석 결과 페이지"""
     db = dbModule_ex.Database()
     try:
-        # 최근 AI 분석 결과
-        analyses = db.executeAll("""
-            SELECT * FROM ai_analysis 
+        # 최근 AI 분석 결과 (목록은 미리보기만)
+        analyses = db.executeAll(f"""
+            SELECT {ANALYSIS_LIST_COLUMNS} FROM ai_analysis 
             ORDER BY created_at DESC LIMIT 20
         """)
         
-        # 오늘의 추천 종목
-        today_picks = db.executeAll("""
-            SELECT * FROM ai_analysis 
+        # 오늘의 추천 종목 (본문 표시)
+        today_picks = [decode_content(row) for row in db.executeAll(f"""
+            SELECT {ANALYSIS_DETAIL_COLUMNS} FROM ai_analysis 
             WHERE analysis_type = 'stock_pick' 
-            AND DATE(created_at) = CURDATE()
+            AND {db.rangeCondition('created_at')}
             ORDER BY confidence_score DESC
-        """)
+        """, db.dayRange())]
         
         # 일일 요약
-        daily_summary = db.executeOne("""
-            SELECT * FROM ai_analysis 
+        daily_summary = decode_content(db.executeOne(f"""
+            SELECT {ANALYSIS_DETAIL_COLUMNS} FROM ai_analysis 
             WHERE analysis_type = 'daily_summary' 
             ORDER BY created_at DESC LIMIT 1
-        """)
+        """))
         
         return render_template('ex_app/ai_analysis.html', 
                              analyses=analyses,
@@ -487,26 +1003,75 @@ def ai_analysis_page():
 
 
 @ex_app.route('/api/ai/analysis', methods=['GET'])
+@cached_json
 def get_ai_analysis():
-    """AI 분석 결과 조회"""
+    """
+    AI 분석 결과 조회
+    since=<버전|ISO 시각> 을 주면 그 이후 저장/수정된 분석과 삭제된 id 만 반환
+    (응답의 version 을 다음 요청의 since 로 사용)
+    목록에는 본문 대신 preview/content_length 만 포함 (본문은 /api/ai/analysis/<id>)
+    """
     db = dbModule_ex.Database()
     try:
         analysis_type = request.args.get('type', None)
         limit = request.args.get('limit', 20, type=int)
         
+        try:
+            delta = _changes_since(db, ('ai_analysis',))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": f"invalid since: {e}"}), 400
+        if delta:
+            ids = [int(key) for key in delta['upserts'].get('ai_analysis', [])]
+            analyses = []
+            if ids:
+                type_condition = "AND analysis_type = %s" if analysis_type else ""
+                analyses = db.executeAll(f"""
+                    SELECT {ANALYSIS_LIST_COLUMNS} FROM ai_analysis 
+                    WHERE id IN ({', '.join(['%s'] * len(ids))}) {type_condition}
+                    ORDER BY created_at DESC
+                """, (*ids, *([analysis_type] if analysis_type else [])))
+            return jsonify({
+                "status": "success",
+                "full": False,
+                "since": delta['since'],
+                "version": delta['version'],
+                "analyses": analyses,
+                "deleted": delta['deletes'].get('ai_analysis', [])
+            })
+        
+        version = current_version(db)
         if analysis_type:
-            analyses = db.executeAll("""
-                SELECT * FROM ai_analysis 
+            analyses = db.executeAll(f"""
+                SELECT {ANALYSIS_LIST_COLUMNS} FROM ai_analysis 
                 WHERE analysis_type = %s
                 ORDER BY created_at DESC LIMIT %s
             """, (analysis_type, limit))
         else:
-            analyses = db.executeAll("""
-                SELECT * FROM ai_analysis 
+            analyses = db.executeAll(f"""
+                SELECT {ANALYSIS_LIST_COLUMNS} FROM ai_analysis 
                 ORDER BY created_at DESC LIMIT %s
             """, (limit,))
         
-        return jsonify({"status": "success", "analyses": analyses})
+        return jsonify({"status": "success", "full": True, "version": version, "analyses": analyses})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        db.close()
+
+
+@ex_app.route('/api/ai/analysis/<int:analysis_id>', methods=['GET'])
+@cached_json
+def get_ai_analysis_detail(analysis_id):
+    """AI 분석 상세 (본문 포함)"""
+    db = dbModule_ex.Database()
+    try:
+        analysis = db.executeOne(
+            f"SELECT {ANALYSIS_DETAIL_COLUMNS} FROM ai_analysis WHERE id = %s",
+            (analysis_id,)
+        )
+        if not analysis:
+            return jsonify({"status": "error", "message": "analysis not found"}), 404
+        return jsonify({"status": "success", "analysis": decode_content(analysis)})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
     finally:
@@ -528,11 +1093,7 @@ def add_ai_analysis():
         )
         session_id = session['id'] if session else None
         
-        db.execute("""
-            INSERT INTO ai_analysis 
-            (session_id, analysis_type, symbol, title, content, confidence_score, recommendation)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
+        analysis_id = _insert_analysis(db, analysis_values(
             session_id,
             data.get('analysis_type', 'daily_summary'),
             data.get('symbol'),
@@ -545,7 +1106,7 @@ def add_ai_analysis():
         
         return jsonify({
             "status": "success", 
-            "id": db.lid(),
+            "id": analysis_id,
             "message": "분석이 저장되었습니다."
         })
     except Exception as e:
@@ -555,6 +1116,12 @@ def add_ai_analysis():
         db.close()
 
 
+@ex_app.route('/api/ai/analysis/batch', methods=['POST'])
+def add_ai_analysis_batch():
+    """AI 분석 대량 저장 (NDJSON, Claude가 호출)"""
+    return _ingest_response('analysis')
+
+
 @ex_app.route('/api/ai/daily-summary', methods=['POST'])
 def add_daily_summary():
     """일일 시장 요약 저장 (Claude 전용)"""
@@ -569,12 +1136,10 @@ def add_daily_summary():
         )
         session_id = session['id'] if session else None
         
-        db.execute("""
-            INSERT INTO ai_analysis 
-            (session_id, analysis_type, title, content)
-            VALUES (%s, 'daily_summary', %s, %s)
-        """, (
+        _insert_analysis(db, analysis_values(
             session_id,
+            'daily_summary',
+            None,
             data.get('title', f'{today} 시장 분석'),
             data.get('content')
         ))
@@ -605,12 +1170,9 @@ def add_stock_pick():
         )
         session_id = session['id'] if session else None
         
-        db.execute("""
-            INSERT INTO ai_analysis 
-            (session_id, analysis_type, symbol, title, content, confidence_score, recommendation)
-            VALUES (%s, 'stock_pick', %s, %s, %s, %s, %s)
-        """, (
+        _insert_analysis(db, analysis_values(
             session_id,
+            'stock_pick',
             data.get('symbol', '').upper(),
             data.get('title'),
             data.get('content'),
@@ -630,73 +1192,58 @@ def add_stock_pick():
         db.close()
 
 
+@ex_app.route('/api/ai/stock-pick/batch', methods=['POST'])
+def add_stock_picks_batch():
+    """종목 추천 대량 저장 (NDJSON, Claude 전용)"""
+    return _ingest_response('stock-pick')
+
+
 # ============================================
 # AI 운용 전용 API (Claude/GPT가 호출)
 # ============================================
 
 @ex_app.route('/api/ai/dashboard', methods=['GET'])
+@cached_json
 def ai_dashboard():
     """
     AI 운용 전용 - 오늘의 종합 데이터 조회
     Claude가 이 API를 호출하여 분석에 필요한 모든 데이터를 한번에 가져옴
+    since=<버전|ISO 시각> 을 주면 그 이후 바뀐 행과 삭제 키(deleted)만 반환
+    (응답의 version 을 다음 요청의 since 로 사용)
     """
     db = dbModule_ex.Database()
     try:
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        # 오늘의 세션
-        session = db.executeOne(
-            "SELECT * FROM collection_sessions WHERE session_date = %s ORDER BY id DESC LIMIT 1",
-            (today,)
-        )
-        
-        # 오늘의 예측
-        picks = db.executeAll("""
-            SELECT 
-                dp.*,
-                s.name as stock_name,
-                s.sector,
-                s.market_cap
-            FROM daily_picks dp
-            LEFT JOIN stocks s ON dp.symbol = s.symbol
-            LEFT JOIN collection_sessions cs ON dp.session_id = cs.id
-            WHERE cs.session_date = %s
-            ORDER BY dp.pick_rank ASC
-        """, (today,))
-        
-        # 최근 고점수 뉴스 (importance_score >= 50)
-        high_impact_news = db.executeAll("""
-            SELECT * FROM news_events 
-            WHERE importance_score >= 50
-            AND DATE(collected_at) = %s
-            ORDER BY importance_score DESC
-            LIMIT 20
-        """, (today,))
+        try:
+            delta = _changes_since(db, DELTA_ENTITIES)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": f"invalid since: {e}"}), 400
+        if delta:
+            return jsonify({
+                "status": "success",
+                "full": False,
+                "since": delta['since'],
+                "version": delta['version'],
+                **build_delta(db, delta),
+                "message": "AI 분석용 변경 데이터 조회 완료"
+            })
         
-        # 최근 7일 성과 통계
-        recent_performance = db.executeAll("""
-            SELECT 
-                DATE(dp.created_at) as pick_date,
-                COUNT(*) as total_picks,
-                SUM(CASE WHEN pr.is_successful = 1 THEN 1 ELSE 0 END) as successful,
-                AVG(pr.gain_pct_eod) as avg_gain
-            FROM daily_picks dp
-            LEFT JOIN prediction_results pr ON dp.id = pr.pick_id
-            WHERE dp.created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-            GROUP BY DATE(dp.created_at)
-            ORDER BY pick_date DESC
-        """)
+        # 세션/오늘의 예측/고점수 뉴스/최근 7일 성과는 대시보드 스냅샷 한 행에서 읽음
+        version = current_version(db)
+        snapshot = get_snapshot(db)
         
         # 소셜 트렌드 (Reddit 멘션 기반 - 있다면)
         # 이 데이터는 collectors.py에서 수집 시 저장되어야 함
         
         return jsonify({
             "status": "success",
-            "date": today,
-            "session": session,
-            "picks": picks,
-            "high_impact_news": high_impact_news,
-            "recent_performance": recent_performance,
+            "date": snapshot['date'],
+            "session": snapshot['session'],
+            "picks": snapshot['today_picks'],
+            "high_impact_news": snapshot['high_impact_news'],
+            "recent_performance": snapshot['recent_performance'],
+            "snapshot_generated_at": snapshot['generated_at'],
+            "full": True,
+            "version": version,
             "message": "AI 분석용 데이터 조회 완료"
         })
     except Exception as e:
@@ -709,10 +1256,10 @@ def ai_dashboard():
 def ai_trigger_collection():
     """
     AI 운용 전용 - 데이터 수집 트리거
-    Claude가 이 API를 호출하여 즉시 수집 실행
-    주의: 서버 리소스를 고려하여 속도 제한 필요
+    Claude가 이 API를 호출하여 수집 작업을 등록 (202 + job_id 즉시 반환)
+    실제 수집/분석/저장은 워커 프로세스(python jobs.py worker)가 처리
     """
-    db = dbModule_ex.Database()
+    db = dbModule_ex.Database(use_primary=True)
     try:
         today = datetime.now().strftime('%Y-%m-%d')
         
@@ -730,107 +1277,27 @@ def ai_trigger_collection():
             })
         
         # 새 세션 생성 또는 기존 세션 조회
-        session = db.executeOne(
-            "SELECT * FROM collection_sessions WHERE session_date = %s",
-            (today,)
-        )
-        
-        if not session:
-            db.execute(
-                "INSERT INTO collection_sessions (session_date, status) VALUES (%s, 'collecting')",
-                (today,)
-            )
-            db.commit()
-            session_id = db.lid()
-        else:
-            session_id = session['id']
-            db.execute(
-                "UPDATE collection_sessions SET status = 'collecting' WHERE id = %s",
-                (session_id,)
-            )
-            db.commit()
+        session, _ = ensure_session(db, today)
+        session_id = session['id']
+        db.commit()
         
-        # 실제 수집은 비동기로 처리해야 하지만,
-        # 간단한 구현을 위해 동기 처리 (시간이 오래 걸릴 수 있음)
-        # 프로덕션에서는 Celery 등 비동기 작업 큐 사용 권장
+        # 수집/분석/저장은 워커(jobs.py)가 처리하고 작업 id 를 즉시 반환
+        # 같은 날짜 수집 작업이 이미 대기/실행 중이면 새로 등록하지 않고 그 작업에 합류
+        job_id, created = enqueue(
+            db, 'collect', {'session_id': session_id, 'session_date': today},
+            dedupe_key=f'collect:{today}'
+        )
+        db.commit()
         
-        try:
-            # collectors와 analyzer import
-            from collectors import collect_all_data
-            from analyzer import run_analysis, NewsAnalyzer
-            
-            # 데이터 수집
-            data = collect_all_data(session_id)
-            
-            # 분석 실행
-            result = run_analysis(data)
-            predictions = result.get('predictions', [])
-            
-            # 뉴스 저장
-            analyzer = NewsAnalyzer()
-            for news in data.get('finviz_news', [])[:30]:
-                try:
-                    analysis = analyzer.analyze_headline(news.get('headline', ''))
-                    db.execute('''
-                        INSERT INTO news_events (symbol, headline, source, url, importance_score, catalyst_type, sentiment_score)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ''', (
-                        news.get('symbol'),
-                        news.get('headline', '')[:500],
-                        news.get('source', 'finviz'),
-                        news.get('url', '')[:500],
-                        analysis['score'],
-                        analysis['catalyst_type'],
-                        analysis['sentiment']
-                    ))
-                except:
-                    pass
-            
-            # 예측 저장
-            for pred in predictions:
-                try:
-                    db.execute('''
-                        INSERT INTO daily_picks (session_id, symbol, pick_rank, category, confidence_score, reasoning)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    ''', (
-                        session_id,
-                        pred['symbol'],
-                        pred['pick_rank'],
-                        pred['category'],
-                        pred['confidence_score'],
-                        pred.get('reasoning', '')[:500]
-                    ))
-                except:
-                    pass
-            
-            # 세션 상태 업데이트
-            db.execute(
-                "UPDATE collection_sessions SET status = 'predicted' WHERE id = %s",
-                (session_id,)
-            )
-            db.commit()
-            
-            return jsonify({
-                "status": "success",
-                "session_id": session_id,
-                "predictions_count": len(predictions),
-                "news_count": len(data.get('finviz_news', [])),
-                "top_picks": [p['symbol'] for p in predictions[:5]],
-                "message": "수집 및 분석 완료"
-            })
-            
-        except ImportError as e:
-            # collectors/analyzer import 실패 시
-            db.execute(
-                "UPDATE collection_sessions SET status = 'error' WHERE id = %s",
-                (session_id,)
-            )
-            db.commit()
-            return jsonify({
-                "status": "error",
-                "message": f"수집 모듈 로드 실패: {str(e)}. GitHub Actions에서 실행하세요."
-            }), 500
-            
+        return jsonify({
+            "status": "queued" if created else "attached",
+            "attached": not created,
+            "job_id": job_id,
+            "session_id": session_id,
+            "status_url": f"/ex_app/api/jobs/{job_id}",
+            "message": "수집 작업이 등록되었습니다. status_url 에서 진행 상황을 확인하세요." if created
+                       else "오늘 수집이 이미 진행 중입니다. status_url 에서 진행 상황을 확인하세요."
+        }), 202
     except Exception as e:
         db.rollback()
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -838,6 +1305,21 @@ def ai_trigger_collection():
         db.close()
 
 
+@ex_app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """작업 상태/단계별 진행 상황/결과 조회"""
+    db = dbModule_ex.Database()
+    try:
+        job = get_job(db, job_id)
+        if not job:
+            return jsonify({"status": "error", "message": "job not found"}), 404
+        return jsonify({"status": "success", "job": job})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        db.close()
+
+
 @ex_app.route('/api/ai/report', methods=['POST'])
 def ai_save_report():
     """
@@ -855,11 +1337,7 @@ def ai_save_report():
         )
         session_id = session['id'] if session else None
         
-        db.execute("""
-            INSERT INTO ai_analysis 
-            (session_id, analysis_type, symbol, title, content, confidence_score, recommendation)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
+        report_id = _insert_analysis(db, analysis_values(
             session_id,
             data.get('analysis_type', 'daily_summary'),
             data.get('symbol'),
@@ -872,7 +1350,7 @@ def ai_save_report():
         
         return jsonify({
             "status": "success",
-            "id": db.lid(),
+            "id": report_id,
             "message": "분석 보고서가 저장되었습니다."
         })
     except Exception as e:
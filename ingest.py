@@ -0,0 +1,253 @@
+# file name : ingest.py
+# pwd : /dal9/app/ex_app/ingest.py
+# 미국 증시 급등주 예측 앱 - NDJSON 대량 적재 (뉴스/예측/AI 분석/AI 종목 추천)
+#
+# 외부 수집기와 AI 에이전트가 레코드를 한 건씩 POST 하는 대신, 한 줄에 JSON 객체
+# 하나(NDJSON)인 본문을 한 요청으로 보낸다. 본문은 스트림에서 한 줄씩 읽어 검증하고
+# INGEST_BATCH_SIZE 행마다 bulkInsert + change_log 기록 후 커밋한다. 잘못된 줄은
+# 그 줄만 실패로 남기고 나머지는 계속 저장하며, 줄 번호별 결과를 돌려준다.
+#
+#   POST /ex_app/api/news/batch            (Content-Type: application/x-ndjson)
+#   POST /ex_app/api/picks/batch
+#   POST /ex_app/api/ai/analysis/batch
+#   POST /ex_app/api/ai/stock-pick/batch
+#
+#   INGEST_BATCH_SIZE     커밋 단위 행 수 (기본 500)
+#   INGEST_MAX_RECORDS    요청당 최대 줄 수 (기본 50000, 초과분은 읽지 않음)
+
+import os
+import json
+import math
+from datetime import datetime
+
+try:
+    from app.ex_app.changes import record_changes
+    from app.ex_app.projections import ANALYSIS_COLUMNS, analysis_values
+except ImportError:
+    from changes import record_changes
+    from projections import ANALYSIS_COLUMNS, analysis_values
+
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 500))
+INGEST_MAX_RECORDS = int(os.environ.get('INGEST_MAX_RECORDS', 50000))
+MAX_LINE_BYTES = 1024 * 1024
+
+NEWS_COLUMNS = [
+    'symbol', 'headline', 'source', 'url', 'sentiment_score',
+    'catalyst_type', 'importance_score', 'published_at'
+]
+PICK_COLUMNS = [
+    'session_id', 'symbol', 'pick_rank', 'category', 'confidence_score',
+    'entry_price', 'predicted_target', 'reasoning'
+]
+
+
+# ============================================
+# NDJSON 파싱
+# ============================================
+
+def iter_ndjson(stream, max_records=INGEST_MAX_RECORDS, max_line_bytes=MAX_LINE_BYTES):
+    """
+    바이너리 스트림에서 한 줄씩 읽어 (줄 번호, dict) 생성 (빈 줄은 건너뜀)
+    형식이 틀린 줄은 dict 대신 ValueError 를 돌려준다.
+    """
+    line_no = 0
+    records = 0
+    while True:
+        raw = stream.readline(max_line_bytes + 1)
+        if not raw:
+            return
+        line_no += 1
+
+        if len(raw) > max_line_bytes and not raw.endswith(b'\n'):
+            # 줄의 나머지를 버리고 다음 줄로
+            while raw and not raw.endswith(b'\n'):
+                raw = stream.readline(max_line_bytes + 1)
+            yield line_no, ValueError(f"line longer than {max_line_bytes} bytes")
+            continue
+
+        text = raw.strip()
+        if not text:
+            continue
+        records += 1
+        if records > max_records:
+            yield line_no, ValueError(f"record limit ({max_records}) exceeded, remaining lines ignored")
+            return
+
+        try:
+            record = json.loads(text)
+        except ValueError as e:
+            yield line_no, ValueError(f"invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_no, ValueError("each line must be a JSON object")
+            continue
+        yield line_no, record
+
+
+# ============================================
+# 레코드 검증 -> INSERT 행
+# ============================================
+
+def _text(record, key, max_length, default=None, required=False):
+    value = record.get(key, default)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f"{key} is required")
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be a string")
+    return value[:max_length]
+
+
+def _number(record, key, default=None, integer=False):
+    value = record.get(key, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number")
+    # json.loads 는 NaN/Infinity 를 허용하므로 여기서 거른다
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number")
+    if integer:
+        if value != int(value):
+            raise ValueError(f"{key} must be an integer")
+        return int(value)
+    return value
+
+
+def _timestamp(record, key):
+    value = record.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be an ISO 8601 string")
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f"{key} must be an ISO 8601 string") from None
+
+
+def _symbol(record, required=False):
+    symbol = _text(record, 'symbol', 10, required=required)
+    return symbol.upper() if symbol else symbol
+
+
+def _news_row(record, session_id):
+    return (
+        _symbol(record),
+        _text(record, 'headline', 500, required=True),
+        _text(record, 'source', 50),
+        _text(record, 'url', 500),
+        _number(record, 'sentiment_score', 0),
+        _text(record, 'catalyst_type', 30, 'other'),
+        _number(record, 'importance_score', 0, integer=True),
+        _timestamp(record, 'published_at')
+    )
+
+
+def _pick_row(record, session_id):
+    return (
+        _number(record, 'session_id', session_id, integer=True),
+        _symbol(record, required=True),
+        _number(record, 'pick_rank', 1, integer=True),
+        _text(record, 'category', 30, 'news_catalyst'),
+        _number(record, 'confidence_score', 50),
+        _number(record, 'entry_price'),
+        _number(record, 'predicted_target'),
+        _text(record, 'reasoning', 65535)
+    )
+
+
+def _analysis_row(record, session_id):
+    return analysis_values(
+        session_id,
+        _text(record, 'analysis_type', 30, 'daily_summary'),
+        _symbol(record),
+        _text(record, 'title', 255),
+        _text(record, 'content', 16 * 1024 * 1024),
+        _number(record, 'confidence_score', 50),
+        _text(record, 'recommendation', 20, 'watch')
+    )
+
+
+def _stock_pick_row(record, session_id):
+    return analysis_values(
+        session_id,
+        'stock_pick',
+        _symbol(record, required=True),
+        _text(record, 'title', 255),
+        _text(record, 'content', 16 * 1024 * 1024),
+        _number(record, 'confidence_score', 50),
+        _text(record, 'recommendation', 20, 'watch')
+    )
+
+
+# 적재 종류 -> 대상 테이블(= change_log entity), 컬럼, 행 변환, JSON 배열 본문의 키
+KINDS = {
+    'news': {'table': 'news_events', 'columns': NEWS_COLUMNS, 'row': _news_row, 'key': 'news'},
+    'picks': {'table': 'daily_picks', 'columns': PICK_COLUMNS, 'row': _pick_row, 'key': 'picks'},
+    'analysis': {'table': 'ai_analysis', 'columns': ANALYSIS_COLUMNS, 'row': _analysis_row, 'key': 'analyses'},
+    'stock-pick': {'table': 'ai_analysis', 'columns': ANALYSIS_COLUMNS, 'row': _stock_pick_row, 'key': 'picks'},
+}
+
+
+# ============================================
+# 배치 저장
+# ============================================
+
+def _flush(db, spec, batch):
+    """검증된 (줄 번호, 행) 한 배치 저장 후 커밋, 줄별 결과 반환"""
+    try:
+        result = db.bulkInsert(spec['table'], spec['columns'], [row for _, row in batch], returning='id')
+        failed = {error['index']: error['error'] for error in result['errors']}
+        ids = iter(result['ids'])
+        results = []
+        for index, (line, _) in enumerate(batch):
+            if index in failed:
+                results.append({'line': line, 'error': failed[index]})
+            else:
+                results.append({'line': line, 'id': next(ids)})
+        record_changes(db, spec['table'], [r['id'] for r in results if 'id' in r])
+        db.commit()
+        return results
+    except Exception as e:
+        db.rollback()
+        print(f"[EX_APP] Ingest batch failed ({spec['table']}, {len(batch)} rows): {e}")
+        return [{'line': line, 'error': str(e)} for line, _ in batch]
+
+
+def ingest(db, records, kind, session_id=None, batch_size=INGEST_BATCH_SIZE):
+    """
+    레코드를 검증하여 batch_size 행마다 저장/커밋
+
+    Args:
+        records: (줄 번호, dict 또는 ValueError) 이터러블 (iter_ndjson() 결과 등)
+        kind: KINDS 키
+        session_id: session_id 가 없는 레코드에 쓸 오늘의 세션 id
+
+    Returns:
+        list: 줄 번호 순 결과 [{'line', 'id'} 또는 {'line', 'error'}]
+    """
+    spec = KINDS[kind]
+    results = []
+    batch = []
+    for line, record in records:
+        if isinstance(record, Exception):
+            results.append({'line': line, 'error': str(record)})
+            continue
+        if not isinstance(record, dict):
+            results.append({'line': line, 'error': "each record must be a JSON object"})
+            continue
+        try:
+            batch.append((line, spec['row'](record, session_id)))
+        except (ValueError, TypeError, OverflowError) as e:
+            results.append({'line': line, 'error': str(e)})
+            continue
+        if len(batch) >= batch_size:
+            results.extend(_flush(db, spec, batch))
+            batch = []
+    if batch:
+        results.extend(_flush(db, spec, batch))
+
+    results.sort(key=lambda r: r['line'])
+    return results
@@ -0,0 +1,353 @@
+# file name : jobs.py
+# pwd : /dal9/app/ex_app/jobs.py
+# 미국 증시 급등주 예측 앱 - DB 기반 작업 큐와 워커
+#
+# /api/ai/collect 처럼 오래 걸리는 작업은 HTTP 요청 안에서 실행하지 않고
+# jobs 테이블에 넣은 뒤 별도 워커 프로세스가 처리한다. 상태(queued/running/
+# succeeded/failed), 단계별 진행 상황, 결과가 모두 DB에 있으므로 웹/워커 재시작
+# 후에도 유지되며, 하트비트가 끊긴 running 작업은 워커가 재시작 시 복구한다.
+# 하트비트는 작업이 도는 동안 별도 스레드가 JOB_HEARTBEAT_SECONDS 마다 갱신하므로
+# 잠금 대기(최대 COLLECTION_LOCK_WAIT)나 긴 수집 단계 중에도 끊기지 않는다.
+#
+#   python jobs.py worker        작업 처리 루프 (Procfile worker)
+#   python jobs.py run-once      대기 작업 하나만 처리
+#
+#   JOB_POLL_SECONDS     대기 작업 확인 주기(초, 기본 2)
+#   JOB_HEARTBEAT_SECONDS  실행 중 하트비트 갱신 주기(초, 기본 30)
+#   JOB_STALE_SECONDS    하트비트가 이 시간(초) 이상 없으면 워커 중단으로 간주
+#                        (기본 600, COLLECTION_LOCK_WAIT + 하트비트 주기보다 짧게는 설정되지 않음)
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    from app.ex_app.profiling import StageTimer
+    from app.ex_app.pipeline import COLLECTION_LOCK_WAIT, run_collection_single_flight
+except ImportError:
+    from profiling import StageTimer
+    from pipeline import COLLECTION_LOCK_WAIT, run_collection_single_flight
+
+POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 2))
+HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', 30))
+# 잠금 대기 중인 작업을 다른 워커가 중단된 것으로 오인하지 않도록 잠금 대기보다 길게
+STALE_SECONDS = max(float(os.environ.get('JOB_STALE_SECONDS', 600)), COLLECTION_LOCK_WAIT + HEARTBEAT_SECONDS)
+RECOVERY_INTERVAL = 60
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+JOB_COLUMNS = [
+    'id', 'kind', 'status', 'dedupe_key', 'payload', 'progress', 'result', 'error', 'attempts',
+    'max_attempts', 'locked_by', 'created_at', 'started_at', 'heartbeat_at', 'finished_at'
+]
+_JSON_FIELDS = ('payload', 'progress', 'result')
+
+
+def _get_database():
+    """DB 모듈 import (PostgreSQL/MySQL 자동 선택)"""
+    if os.environ.get('DATABASE_URL'):
+        from module.dbModule_ex_pg import Database
+    else:
+        try:
+            from app.module.dbModule_ex import Database
+        except ImportError:
+            from module.dbModule_ex_pg import Database
+    return Database(use_primary=True)
+
+
+def _dumps(value):
+    return json.dumps(value, default=str, ensure_ascii=False) if value is not None else None
+
+
+def _decode(row):
+    if not row:
+        return None
+    for field in _JSON_FIELDS:
+        if isinstance(row.get(field), str):
+            row[field] = json.loads(row[field])
+    return row
+
+
+# ============================================
+# 큐 조작 (커밋은 호출자)
+# ============================================
+
+def enqueue(db, kind, payload=None, max_attempts=1, dedupe_key=None):
+    """
+    작업 등록
+
+    dedupe_key 를 주면 같은 키의 queued/running 작업이 있을 때 새로 만들지 않고
+    그 작업에 합류한다 (jobs.dedupe_key UNIQUE, 작업이 끝나면 NULL 로 비움).
+
+    Returns:
+        tuple: (작업 id, 새로 등록했으면 True)
+    """
+    if dedupe_key:
+        active = db.executeOne("SELECT id FROM jobs WHERE dedupe_key = %s", (dedupe_key,))
+        if active:
+            return active['id'], False
+
+    columns = ['kind', 'status', 'dedupe_key', 'payload', 'progress', 'attempts', 'max_attempts', 'created_at']
+    result = db.bulkInsert('jobs', columns, [(
+        kind, QUEUED, dedupe_key, _dumps(payload or {}), _dumps({'stages': []}), 0, max_attempts, datetime.now()
+    )], returning='id')
+    if result['errors']:
+        if dedupe_key:
+            # 동시에 다른 요청이 같은 키로 먼저 등록함 (UNIQUE 위반)
+            active = db.executeOne("SELECT id FROM jobs WHERE dedupe_key = %s", (dedupe_key,))
+            if active:
+                return active['id'], False
+        raise RuntimeError(result['errors'][0]['error'])
+    return result['ids'][0], True
+
+
+def get_job(db, job_id):
+    """작업 조회 (payload/progress/result 는 JSON 디코딩)"""
+    return _decode(db.executeOne(
+        f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = %s", (job_id,)
+    ))
+
+
+def claim_next(db, worker_id):
+    """대기 중인 가장 오래된 작업 하나를 running 으로 바꾸고 반환 (없으면 None, 커밋 포함)"""
+    row = db.executeOne(
+        "SELECT id FROM jobs WHERE status = %s ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED",
+        (QUEUED,)
+    )
+    if not row:
+        db.rollback()
+        return None
+
+    now = datetime.now()
+    db.execute("""
+        UPDATE jobs SET status = %s, attempts = attempts + 1, locked_by = %s,
+            started_at = %s, heartbeat_at = %s, error = NULL
+        WHERE id = %s
+    """, (RUNNING, worker_id, now, now, row['id']))
+    db.commit()
+    return get_job(db, row['id'])
+
+
+def recover_stale(db, stale_seconds=STALE_SECONDS):
+    """
+    하트비트가 끊긴 running 작업 복구 (재시도 가능하면 queued, 아니면 failed, 커밋 포함)
+
+    Returns:
+        int: 복구한 작업 수
+    """
+    cutoff = datetime.now() - timedelta(seconds=stale_seconds)
+    db.execute("""
+        UPDATE jobs SET status = %s, locked_by = NULL
+        WHERE status = %s AND heartbeat_at < %s AND attempts < max_attempts
+    """, (QUEUED, RUNNING, cutoff))
+    requeued = db.cursor.rowcount
+    db.execute("""
+        UPDATE jobs SET status = %s, error = %s, finished_at = %s, dedupe_key = NULL
+        WHERE status = %s AND heartbeat_at < %s
+    """, (FAILED, 'worker stopped responding', datetime.now(), RUNNING, cutoff))
+    failed = db.cursor.rowcount
+    db.commit()
+    return max(requeued, 0) + max(failed, 0)
+
+
+def _finish(db, job_id, status, result=None, error=None):
+    db.execute("""
+        UPDATE jobs SET status = %s, result = %s, error = %s, finished_at = %s, heartbeat_at = %s,
+            dedupe_key = NULL
+        WHERE id = %s
+    """, (status, _dumps(result), error, datetime.now(), datetime.now(), job_id))
+    db.commit()
+
+
+# ============================================
+# 진행 상황 기록
+# ============================================
+
+class JobProgress(StageTimer):
+    """
+    StageTimer 와 같은 인터페이스로 단계 시작/종료를 jobs.progress 에 즉시 기록
+    (작업 본문과 별도 연결을 쓰므로 작업 트랜잭션과 무관하게 바로 조회 가능)
+    heartbeat() 동안은 하트비트 스레드가 같은 연결로 heartbeat_at 을 갱신한다.
+    """
+
+    def __init__(self, db, job_id):
+        super().__init__()
+        self.db = db
+        self.job_id = job_id
+        self.progress = {'stages': [], 'current': None}
+        # 단계 기록과 하트비트 스레드가 연결을 번갈아 쓰도록
+        self._db_lock = threading.Lock()
+
+    def _save(self):
+        with self._db_lock:
+            self.db.execute(
+                "UPDATE jobs SET progress = %s, heartbeat_at = %s WHERE id = %s",
+                (_dumps(self.progress), datetime.now(), self.job_id)
+            )
+            self.db.commit()
+
+    def _beat(self):
+        with self._db_lock:
+            try:
+                self.db.execute("UPDATE jobs SET heartbeat_at = %s WHERE id = %s", (datetime.now(), self.job_id))
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                print(f"[EX_APP JOB] Heartbeat failed for #{self.job_id}: {e}")
+
+    @contextmanager
+    def heartbeat(self, interval=HEARTBEAT_SECONDS):
+        """블록 실행 동안 interval 초마다 heartbeat_at 갱신 (잠금 대기/긴 단계 중에도 stale 로 보이지 않도록)"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                self._beat()
+
+        thread = threading.Thread(target=beat, name=f'ex_app-job-{self.job_id}-heartbeat', daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+
+    @contextmanager
+    def stage(self, name):
+        entry = {'name': name, 'status': RUNNING, 'started_at': datetime.now().isoformat(timespec='seconds')}
+        self.progress['stages'].append(entry)
+        self.progress['current'] = name
+        self._save()
+
+        start = time.perf_counter()
+        try:
+            yield
+            entry['status'] = SUCCEEDED
+        except BaseException:
+            entry['status'] = FAILED
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            entry['ms'] = round(elapsed, 1)
+            entry['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            self.progress['current'] = None
+            self._save()
+
+
+# ============================================
+# 작업 핸들러
+# ============================================
+
+def _run_collect(job, progress):
+    """
+    /api/ai/collect: 수집 -> 분석 -> 저장 (같은 날짜를 다른 프로세스가 수집 중이면 그 결과에 합류)
+    세션의 'error' 표시는 잠금을 쥔 run_collection_single_flight 가 한다. 잠금 대기 시간
+    초과(TimeoutError)는 다른 프로세스가 아직 수집 중이라는 뜻이므로 세션을 건드리지 않는다.
+    """
+    session_id = job['payload']['session_id']
+    session_date = job['payload']['session_date']
+    db = _get_database()
+    try:
+        return run_collection_single_flight(db, session_id, session_date, timer=progress)
+    finally:
+        db.close()
+
+
+HANDLERS = {
+    'collect': _run_collect,
+}
+
+
+def run_job(db, job):
+    """작업 하나 실행 후 상태 기록"""
+    handler = HANDLERS.get(job['kind'])
+    if handler is None:
+        _finish(db, job['id'], FAILED, error=f"unknown job kind: {job['kind']}")
+        return
+
+    print(f"[EX_APP JOB] Running #{job['id']} {job['kind']} (attempt {job['attempts']})")
+    progress_db = _get_database()
+    try:
+        progress = JobProgress(progress_db, job['id'])
+        with progress.heartbeat():
+            result = handler(job, progress)
+    except Exception as e:
+        traceback.print_exc()
+        if job['attempts'] < job['max_attempts']:
+            db.execute(
+                "UPDATE jobs SET status = %s, locked_by = NULL, error = %s WHERE id = %s",
+                (QUEUED, str(e), job['id'])
+            )
+            db.commit()
+        else:
+            _finish(db, job['id'], FAILED, error=str(e))
+        return
+    finally:
+        progress_db.close()
+
+    _finish(db, job['id'], SUCCEEDED, result=result)
+    print(f"[EX_APP JOB] Finished #{job['id']} {job['kind']}")
+
+
+# ============================================
+# 워커
+# ============================================
+
+_stopping = False
+
+
+def _request_stop(signum, frame):
+    """SIGTERM/SIGINT: 현재 작업을 마친 뒤 종료"""
+    global _stopping
+    _stopping = True
+
+
+def work(once=False, poll_seconds=POLL_SECONDS):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    print(f"[EX_APP JOB] Worker {worker_id} started")
+
+    db = _get_database()
+    last_recovery = 0.0
+    try:
+        while not _stopping:
+            # 다른 워커가 죽으며 남긴 running 작업도 주기적으로 복구
+            if time.monotonic() - last_recovery >= RECOVERY_INTERVAL:
+                recovered = recover_stale(db)
+                if recovered:
+                    print(f"[EX_APP JOB] Recovered {recovered} stale jobs")
+                last_recovery = time.monotonic()
+
+            job = claim_next(db, worker_id)
+            if job:
+                run_job(db, job)
+            if once:
+                break
+            if not job:
+                time.sleep(poll_seconds)
+    finally:
+        db.close()
+    print(f"[EX_APP JOB] Worker {worker_id} stopped")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'worker'
+    if command == 'worker':
+        work()
+    elif command == 'run-once':
+        work(once=True)
+    else:
+        print("Usage: python jobs.py [worker|run-once]")
+        sys.exit(1)
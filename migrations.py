@@ -0,0 +1,974 @@
+# file name : migrations.py
+# pwd : /dal9/app/ex_app/migrations.py
+# 미국 증시 급등주 예측 앱 - 스키마/인덱스 마이그레이션 (PostgreSQL/MySQL 공용)
+#
+#   python migrations.py upgrade   미적용 마이그레이션 실행
+#   python migrations.py status    적용 현황 출력
+#   python migrations.py check     index.py 와 쿼리 모듈(snapshot/rollup/changes)의 모든
+#                                  쿼리를 EXPLAIN 하여 대형 테이블 순차 스캔이 있거나
+#                                  EXPLAIN 용 SQL 로 렌더링하지 못한 쿼리가 있으면 실패 (exit 1)
+#
+# 마이그레이션은 (버전, 이름, 함수) 목록이며 schema_migrations 테이블에 기록된다.
+# 기존 배포 DB(테이블이 이미 있는 경우)에서도 안전하도록 컬럼/인덱스는
+# 존재 여부를 확인한 뒤 추가한다.
+
+import os
+import re
+import ast
+import sys
+from datetime import datetime, date
+
+try:
+    from app.ex_app import projections
+    from app.ex_app import rollup
+    from app.ex_app.snapshot import refresh_snapshot
+except ImportError:
+    import projections
+    import rollup
+    from snapshot import refresh_snapshot
+
+# 순차 스캔을 허용하지 않는 대형 테이블
+LARGE_TABLES = {'news_events', 'daily_picks', 'prediction_results', 'ai_analysis'}
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+INDEX_PY = os.path.join(_HERE, 'index.py')
+# check 가 쿼리를 찾는 파일 (읽기 API 와 대시보드/롤업/델타의 핫 쿼리)
+QUERY_MODULES = [INDEX_PY] + [os.path.join(_HERE, name) for name in ('snapshot.py', 'rollup.py', 'changes.py')]
+
+# 방언별 DDL 타입
+TYPES = {
+    'postgresql': {
+        'pk': 'SERIAL PRIMARY KEY',
+        'bigpk': 'BIGSERIAL PRIMARY KEY',
+        'ts': 'TIMESTAMP',
+        'bool': 'BOOLEAN',
+        'text': 'TEXT',
+        'blob': 'BYTEA',
+        'options': '',
+    },
+    'mysql': {
+        'pk': 'INT AUTO_INCREMENT PRIMARY KEY',
+        'bigpk': 'BIGINT AUTO_INCREMENT PRIMARY KEY',
+        'ts': 'DATETIME',
+        'bool': 'TINYINT(1)',
+        'text': 'MEDIUMTEXT',
+        'blob': 'MEDIUMBLOB',
+        'options': ' ENGINE=InnoDB DEFAULT CHARSET=utf8mb4',
+    },
+}
+
+
+def _get_database():
+    """DB 모듈 import (PostgreSQL/MySQL 자동 선택)"""
+    if os.environ.get('DATABASE_URL'):
+        from module.dbModule_ex_pg import Database
+    else:
+        try:
+            from app.module.dbModule_ex import Database
+        except ImportError:
+            from module.dbModule_ex_pg import Database
+    return Database(use_primary=True)
+
+
+# ============================================
+# 스키마 조회 헬퍼
+# ============================================
+
+def _ddl(db, template):
+    """{pk}, {ts} 등 방언별 타입을 치환하여 실행"""
+    db.execute(template.format(**TYPES[db.db_type]))
+
+
+def _has_table(db, table):
+    if db.db_type == 'postgresql':
+        row = db.executeOne(
+            "SELECT 1 AS found FROM information_schema.tables "
+            "WHERE table_schema = current_schema() AND table_name = %s",
+            (table,)
+        )
+    else:
+        row = db.executeOne(
+            "SELECT 1 AS found FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            (table,)
+        )
+    return row is not None
+
+
+def _has_column(db, table, column):
+    schema = 'current_schema()' if db.db_type == 'postgresql' else 'DATABASE()'
+    row = db.executeOne(
+        "SELECT 1 AS found FROM information_schema.columns "
+        f"WHERE table_schema = {schema} AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return row is not None
+
+
+def _has_index(db, table, name):
+    if db.db_type == 'postgresql':
+        row = db.executeOne(
+            "SELECT 1 AS found FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s AND indexname = %s",
+            (table, name)
+        )
+    else:
+        row = db.executeOne(
+            "SELECT 1 AS found FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (table, name)
+        )
+    return row is not None
+
+
+def add_column(db, table, column, definition):
+    """컬럼이 없으면 추가 (definition 은 {ts} 등 타입 치환 가능)"""
+    if _has_column(db, table, column):
+        return False
+    _ddl(db, f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+def create_index(db, table, name, columns, unique=False):
+    """인덱스가 없으면 생성"""
+    if _has_index(db, table, name):
+        return False
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    db.execute(f"CREATE {kind} {name} ON {table} ({columns})")
+    return True
+
+
+def drop_index(db, table, name):
+    """인덱스가 있으면 삭제"""
+    if not _has_index(db, table, name):
+        return False
+    if db.db_type == 'postgresql':
+        db.execute(f"DROP INDEX {name}")
+    else:
+        db.execute(f"DROP INDEX {name} ON {table}")
+    return True
+
+
+def _duplicate_condition(key, keep):
+    """a 가 b 와 같은 키의 중복이고 지워야 할 행인 조건 (key 는 쉼표로 구분한 컬럼 목록)"""
+    columns = [column.strip() for column in key.split(',')]
+    older = '<' if keep == 'latest' else '>'
+    return ' AND '.join([f"a.{column} = b.{column}" for column in columns] + [f"a.id {older} b.id"])
+
+
+def delete_duplicates(db, table, key, keep='latest'):
+    """UNIQUE 인덱스 생성 전 중복 행 정리 (keep='latest' 면 가장 최근 id, 'earliest' 면 가장 오래된 id만 유지)"""
+    condition = _duplicate_condition(key, keep)
+    if db.db_type == 'postgresql':
+        db.execute(f"DELETE FROM {table} a USING {table} b WHERE {condition}")
+    else:
+        db.execute(f"DELETE a FROM {table} a JOIN {table} b ON {condition}")
+
+
+# ============================================
+# 마이그레이션 정의
+# ============================================
+
+def _m001_create_tables(db):
+    """ex_app 기본 테이블"""
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS collection_sessions (
+            id {pk},
+            session_date DATE NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'collecting',
+            created_at {ts} DEFAULT CURRENT_TIMESTAMP
+        ){options}
+    """)
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS stocks (
+            id {pk},
+            symbol VARCHAR(10) NOT NULL,
+            name VARCHAR(255),
+            sector VARCHAR(100),
+            market_cap BIGINT,
+            float_shares BIGINT,
+            is_smallcap {bool} DEFAULT FALSE,
+            is_penny {bool} DEFAULT FALSE,
+            created_at {ts} DEFAULT CURRENT_TIMESTAMP
+        ){options}
+    """)
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS news_events (
+            id {bigpk},
+            symbol VARCHAR(10),
+            headline VARCHAR(500) NOT NULL,
+            source VARCHAR(50),
+            url VARCHAR(500),
+            sentiment_score NUMERIC(4, 2) DEFAULT 0,
+            catalyst_type VARCHAR(30) DEFAULT 'other',
+            importance_score INT DEFAULT 0,
+            published_at {ts} NULL,
+            collected_at {ts} DEFAULT CURRENT_TIMESTAMP
+        ){options}
+    """)
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS daily_picks (
+            id {pk},
+            session_id INT,
+            symbol VARCHAR(10) NOT NULL,
+            pick_rank INT DEFAULT 1,
+            category VARCHAR(30) DEFAULT 'news_catalyst',
+            confidence_score NUMERIC(5, 2) DEFAULT 50,
+            entry_price NUMERIC(12, 4),
+            predicted_target NUMERIC(12, 4),
+            reasoning {text},
+            created_at {ts} DEFAULT CURRENT_TIMESTAMP
+        ){options}
+    """)
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS prediction_results (
+            id {pk},
+            pick_id INT NOT NULL,
+            price_at_open NUMERIC(12, 4),
+            price_1h NUMERIC(12, 4),
+            price_2h NUMERIC(12, 4),
+            price_eod NUMERIC(12, 4),
+            high_of_day NUMERIC(12, 4),
+            low_of_day NUMERIC(12, 4),
+            volume_day BIGINT,
+            gain_pct_1h NUMERIC(8, 2),
+            gain_pct_eod NUMERIC(8, 2),
+            is_successful SMALLINT,
+            created_at {ts} DEFAULT CURRENT_TIMESTAMP
+        ){options}
+    """)
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS performance_stats (
+            id {pk},
+            stat_date DATE NOT NULL,
+            total_picks INT DEFAULT 0,
+            successful_picks INT DEFAULT 0,
+            avg_gain_pct NUMERIC(8, 2),
+            best_pick_symbol VARCHAR(10),
+            best_pick_gain NUMERIC(8, 2)
+        ){options}
+    """)
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS ai_analysis (
+            id {pk},
+            session_id INT,
+            analysis_type VARCHAR(30) NOT NULL DEFAULT 'daily_summary',
+            symbol VARCHAR(10),
+            title VARCHAR(255),
+            content {text},
+            confidence_score NUMERIC(5, 2) DEFAULT 50,
+            recommendation VARCHAR(20) DEFAULT 'watch',
+            created_at {ts} DEFAULT CURRENT_TIMESTAMP
+        ){options}
+    """)
+
+
+def _m002_scoring_and_cluster_columns(db):
+    """학습 모델 피처(세부 점수)와 뉴스 클러스터 관련 종목 컬럼"""
+    add_column(db, 'daily_picks', 'news_score', 'INT DEFAULT 0')
+    add_column(db, 'daily_picks', 'momentum_score', 'INT DEFAULT 0')
+    add_column(db, 'daily_picks', 'social_score', 'INT DEFAULT 0')
+    add_column(db, 'news_events', 'related_symbols', 'VARCHAR(255)')
+
+
+def _m003_hot_query_indexes(db):
+    """핫 쿼리용 인덱스와 UPSERT 대상 UNIQUE 인덱스"""
+    create_index(db, 'news_events', 'idx_news_events_collected_at', 'collected_at')
+    create_index(db, 'news_events', 'idx_news_events_symbol_collected', 'symbol, collected_at')
+    create_index(db, 'news_events', 'idx_news_events_importance', 'importance_score, collected_at')
+
+    create_index(db, 'daily_picks', 'idx_daily_picks_created_at', 'created_at')
+    create_index(db, 'daily_picks', 'idx_daily_picks_session_rank', 'session_id, pick_rank')
+    create_index(db, 'daily_picks', 'idx_daily_picks_symbol', 'symbol')
+
+    delete_duplicates(db, 'prediction_results', 'pick_id')
+    create_index(db, 'prediction_results', 'uq_prediction_results_pick_id', 'pick_id', unique=True)
+
+    delete_duplicates(db, 'stocks', 'symbol')
+    create_index(db, 'stocks', 'uq_stocks_symbol', 'symbol', unique=True)
+
+    create_index(db, 'collection_sessions', 'idx_collection_sessions_date', 'session_date')
+
+    delete_duplicates(db, 'performance_stats', 'stat_date')
+    create_index(db, 'performance_stats', 'uq_performance_stats_date', 'stat_date', unique=True)
+
+    create_index(db, 'ai_analysis', 'idx_ai_analysis_created_at', 'created_at')
+    create_index(db, 'ai_analysis', 'idx_ai_analysis_type_created', 'analysis_type, created_at')
+
+
+def _m004_performance_rollup(db):
+    """성과 롤업(rollup.py) 컬럼과 분류별 집계 테이블"""
+    add_column(db, 'daily_picks', 'catalyst_type', "VARCHAR(30) DEFAULT 'other'")
+
+    add_column(db, 'performance_stats', 'gain_sum', 'NUMERIC(14, 2) DEFAULT 0')
+    add_column(db, 'performance_stats', 'gain_count', 'INT DEFAULT 0')
+    add_column(db, 'performance_stats', 'worst_pick_gain', 'NUMERIC(8, 2)')
+    add_column(db, 'performance_stats', 'updated_at', '{ts} NULL')
+
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS performance_breakdown (
+            id {pk},
+            stat_date DATE NOT NULL,
+            dimension VARCHAR(20) NOT NULL,
+            dim_value VARCHAR(30) NOT NULL,
+            total_picks INT DEFAULT 0,
+            successful_picks INT DEFAULT 0,
+            gain_sum NUMERIC(14, 2) DEFAULT 0,
+            gain_count INT DEFAULT 0,
+            avg_gain_pct NUMERIC(8, 2)
+        ){options}
+    """)
+    create_index(db, 'performance_breakdown', 'uq_performance_breakdown_key',
+                 'stat_date, dimension, dim_value', unique=True)
+    create_index(db, 'performance_breakdown', 'idx_performance_breakdown_dimension',
+                 'dimension, stat_date')
+
+
+def _m005_partition_news_events(db):
+    """
+    news_events 를 collected_at 월별 RANGE 파티션으로 전환 (archive.py 가 관리)
+    PostgreSQL: 파티션 테이블을 새로 만들어 복사 후 교체, MySQL: ALTER TABLE ... PARTITION BY
+    파티션 키가 PK에 포함되어야 하므로 PK는 (id, collected_at) 이 된다.
+    """
+    try:
+        from app.ex_app.archive import add_months, month_start, mysql_partition_clause, ensure_partitions
+    except ImportError:
+        from archive import add_months, month_start, mysql_partition_clause, ensure_partitions
+
+    row = db.executeOne("SELECT MIN(collected_at) AS first_collected FROM news_events")
+    first_month = month_start((row or {}).get('first_collected') or date.today())
+    db.execute(
+        "UPDATE news_events SET collected_at = COALESCE(published_at, CURRENT_TIMESTAMP) "
+        "WHERE collected_at IS NULL"
+    )
+
+    if db.db_type == 'postgresql':
+        partitioned = db.executeOne("""
+            SELECT 1 AS found FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = 'news_events' AND c.relnamespace = current_schema()::regnamespace
+        """)
+        if partitioned:
+            return
+
+        # 기존 테이블 삭제 시 id 시퀀스가 같이 지워지지 않도록 소유 관계 해제
+        db.execute("ALTER SEQUENCE news_events_id_seq OWNED BY NONE")
+        db.execute(
+            "CREATE TABLE news_events_partitioned (LIKE news_events INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (collected_at)"
+        )
+        db.execute("ALTER TABLE news_events_partitioned ADD PRIMARY KEY (id, collected_at)")
+        db.execute("CREATE TABLE news_events_default PARTITION OF news_events_partitioned DEFAULT")
+        db.execute("ALTER TABLE news_events RENAME TO news_events_unpartitioned")
+        db.execute("ALTER TABLE news_events_partitioned RENAME TO news_events")
+        ensure_partitions(db, first_month=first_month)
+
+        db.execute("INSERT INTO news_events SELECT * FROM news_events_unpartitioned")
+        db.execute("DROP TABLE news_events_unpartitioned")
+        db.execute("ALTER SEQUENCE news_events_id_seq OWNED BY news_events.id")
+    else:
+        partitioned = db.executeOne("""
+            SELECT 1 AS found FROM information_schema.partitions
+            WHERE table_schema = DATABASE() AND table_name = 'news_events'
+            AND partition_name IS NOT NULL
+            LIMIT 1
+        """)
+        if partitioned:
+            return
+
+        months = []
+        month = first_month
+        while month <= add_months(month_start(), 2):
+            months.append(month)
+            month = add_months(month, 1)
+        db.execute(
+            "ALTER TABLE news_events "
+            "MODIFY collected_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+            "DROP PRIMARY KEY, ADD PRIMARY KEY (id, collected_at)"
+        )
+        db.execute(
+            "ALTER TABLE news_events PARTITION BY RANGE (TO_DAYS(collected_at)) "
+            f"({mysql_partition_clause(months)})"
+        )
+
+    # PostgreSQL은 새 부모 테이블에 인덱스 재생성 (파티션마다 자동 생성됨)
+    create_index(db, 'news_events', 'idx_news_events_collected_at', 'collected_at')
+    create_index(db, 'news_events', 'idx_news_events_symbol_collected', 'symbol, collected_at')
+    create_index(db, 'news_events', 'idx_news_events_importance', 'importance_score, collected_at')
+
+
+def _m006_jobs(db):
+    """비동기 작업 큐 (jobs.py)"""
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id {pk},
+            kind VARCHAR(30) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            payload {text},
+            progress {text},
+            result {text},
+            error {text},
+            attempts INT NOT NULL DEFAULT 0,
+            max_attempts INT NOT NULL DEFAULT 1,
+            locked_by VARCHAR(100),
+            created_at {ts} DEFAULT CURRENT_TIMESTAMP,
+            started_at {ts} NULL,
+            heartbeat_at {ts} NULL,
+            finished_at {ts} NULL
+        ){options}
+    """)
+    create_index(db, 'jobs', 'idx_jobs_status', 'status, id')
+
+
+def _m007_single_flight_collection(db):
+    """날짜당 수집 세션 하나 (UNIQUE) + 활성 작업 중복 방지 키"""
+    # 중복 세션은 가장 최근 id 로 합치고 예측/분석의 session_id 를 옮긴 뒤 삭제
+    duplicates = db.executeAll("""
+        SELECT session_date, MAX(id) AS keep_id
+        FROM collection_sessions
+        GROUP BY session_date
+        HAVING COUNT(*) > 1
+    """)
+    for row in duplicates:
+        for table in ('daily_picks', 'ai_analysis'):
+            db.execute(f"""
+                UPDATE {table} SET session_id = %s
+                WHERE session_id IN (
+                    SELECT id FROM collection_sessions WHERE session_date = %s AND id <> %s
+                )
+            """, (row['keep_id'], row['session_date'], row['keep_id']))
+    delete_duplicates(db, 'collection_sessions', 'session_date')
+    create_index(db, 'collection_sessions', 'uq_collection_sessions_date', 'session_date', unique=True)
+    drop_index(db, 'collection_sessions', 'idx_collection_sessions_date')
+
+    # queued/running 동안만 값이 있고 끝나면 NULL (NULL 은 UNIQUE 충돌 없음)
+    add_column(db, 'jobs', 'dedupe_key', 'VARCHAR(100) NULL')
+    create_index(db, 'jobs', 'uq_jobs_dedupe_key', 'dedupe_key', unique=True)
+
+
+def _m008_dashboard_snapshot(db):
+    """대시보드 스냅샷 (snapshot.py, 이름당 JSON 한 행)"""
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS dashboard_snapshot (
+            name VARCHAR(30) PRIMARY KEY,
+            payload {text},
+            generated_at {ts} NULL
+        ){options}
+    """)
+
+
+def _m009_keyset_indexes(db):
+    """키셋 페이지네이션용 (시간, id) 복합 인덱스 (기존 단일 컬럼 인덱스 대체)"""
+    create_index(db, 'news_events', 'idx_news_events_collected_id', 'collected_at, id')
+    create_index(db, 'news_events', 'idx_news_events_symbol_collected_id', 'symbol, collected_at, id')
+    drop_index(db, 'news_events', 'idx_news_events_collected_at')
+    drop_index(db, 'news_events', 'idx_news_events_symbol_collected')
+
+    create_index(db, 'daily_picks', 'idx_daily_picks_created_id', 'created_at, id')
+    drop_index(db, 'daily_picks', 'idx_daily_picks_created_at')
+
+
+def _m010_change_log(db):
+    """델타 조회용 변경 로그 (changes.py, id 가 버전)"""
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS change_log (
+            id {bigpk},
+            entity VARCHAR(40) NOT NULL,
+            entity_id VARCHAR(64) NOT NULL,
+            op VARCHAR(10) NOT NULL DEFAULT 'upsert',
+            changed_at {ts} DEFAULT CURRENT_TIMESTAMP
+        ){options}
+    """)
+    create_index(db, 'change_log', 'idx_change_log_changed_at', 'changed_at')
+
+
+def _m011_analysis_lazy_content(db):
+    """ai_analysis 목록용 미리보기/길이 컬럼과 압축 본문 컬럼 (projections.py)"""
+    add_column(db, 'ai_analysis', 'preview', f'VARCHAR({projections.PREVIEW_CHARS}) NULL')
+    add_column(db, 'ai_analysis', 'content_length', 'INT NULL')
+    add_column(db, 'ai_analysis', 'content_encoding', 'VARCHAR(10) NULL')
+    add_column(db, 'ai_analysis', 'content_blob', '{blob} NULL')
+    db.execute(f"""
+        UPDATE ai_analysis
+        SET preview = SUBSTRING(content, 1, {projections.PREVIEW_CHARS}), content_length = CHAR_LENGTH(content)
+        WHERE content IS NOT NULL AND content_length IS NULL
+    """)
+
+
+def _m012_unique_pick_rank(db):
+    """세션당 순위 하나 (UNIQUE): 같은 세션을 두 번 수집해도 예측이 두 벌 쌓이지 않도록"""
+    # 중복 실행으로 생긴 나중 예측과 그 결과를 지우고 처음 저장한 예측만 남긴다
+    # (지운 날짜의 성과 롤업은 013 에서 다시 계산)
+    condition = _duplicate_condition('session_id, pick_rank', 'earliest')
+    db.execute(f"""
+        DELETE FROM prediction_results
+        WHERE pick_id IN (SELECT a.id FROM daily_picks a JOIN daily_picks b ON {condition})
+    """)
+    delete_duplicates(db, 'daily_picks', 'session_id, pick_rank', keep='earliest')
+    create_index(db, 'daily_picks', 'uq_daily_picks_session_rank', 'session_id, pick_rank', unique=True)
+    drop_index(db, 'daily_picks', 'idx_daily_picks_session_rank')
+
+
+def _m013_backfill_performance_rollup(db):
+    """
+    기존 예측 전체 기간의 성과 롤업 재생성 (rollup.py rebuild, 데이터 마이그레이션)
+    롤업 도입 전 날짜와 012 에서 중복 예측을 지운 날짜의 통계/이력 API 가 비거나 어긋나지 않도록
+    """
+    days = rollup.rebuild(db)
+    refresh_snapshot(db)
+    print(f"[EX_APP MIGRATE] Rebuilt performance rollup for {days} days")
+
+
+MIGRATIONS = [
+    (1, 'create_core_tables', _m001_create_tables),
+    (2, 'scoring_and_cluster_columns', _m002_scoring_and_cluster_columns),
+    (3, 'hot_query_indexes', _m003_hot_query_indexes),
+    (4, 'performance_rollup', _m004_performance_rollup),
+    (5, 'partition_news_events', _m005_partition_news_events),
+    (6, 'jobs', _m006_jobs),
+    (7, 'single_flight_collection', _m007_single_flight_collection),
+    (8, 'dashboard_snapshot', _m008_dashboard_snapshot),
+    (9, 'keyset_indexes', _m009_keyset_indexes),
+    (10, 'change_log', _m010_change_log),
+    (11, 'analysis_lazy_content', _m011_analysis_lazy_content),
+    (12, 'unique_pick_rank', _m012_unique_pick_rank),
+    (13, 'backfill_performance_rollup', _m013_backfill_performance_rollup),
+]
+
+
+# ============================================
+# 실행기
+# ============================================
+
+def _ensure_migrations_table(db):
+    _ddl(db, """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at {ts} DEFAULT CURRENT_TIMESTAMP
+        ){options}
+    """)
+    db.commit()
+
+
+def _lock(db):
+    """동시에 두 프로세스가 마이그레이션하지 않도록 잠금"""
+    if db.db_type == 'postgresql':
+        db.executeOne("SELECT pg_advisory_lock(hashtext('ex_app_migrations')) AS locked")
+    else:
+        db.executeOne("SELECT GET_LOCK('ex_app_migrations', 300) AS locked")
+
+
+def _unlock(db):
+    if db.db_type == 'postgresql':
+        db.executeOne("SELECT pg_advisory_unlock(hashtext('ex_app_migrations')) AS unlocked")
+    else:
+        db.executeOne("SELECT RELEASE_LOCK('ex_app_migrations') AS unlocked")
+
+
+def applied_versions(db):
+    _ensure_migrations_table(db)
+    rows = db.executeAll("SELECT version FROM schema_migrations ORDER BY version")
+    return {row['version'] for row in rows}
+
+
+def upgrade(db=None):
+    """미적용 마이그레이션을 버전 순으로 실행. 적용한 버전 리스트 반환"""
+    own = db is None
+    db = db or _get_database()
+    applied_now = []
+    try:
+        _lock(db)
+        try:
+            applied = applied_versions(db)
+            for version, name, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+                print(f"[EX_APP MIGRATE] Applying {version:03d}_{name} ({db.db_type})")
+                try:
+                    migrate(db)
+                    db.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (version, name)
+                    )
+                    db.commit()
+                except Exception as e:
+                    # PostgreSQL DDL은 롤백됨 (MySQL DDL은 자동 커밋이므로 재실행 시 존재 확인으로 이어감)
+                    db.rollback()
+                    print(f"[EX_APP MIGRATE] Failed {version:03d}_{name}: {e}")
+                    raise
+                applied_now.append(version)
+        finally:
+            _unlock(db)
+            db.commit()
+    finally:
+        if own:
+            db.close()
+    return applied_now
+
+
+def status(db=None):
+    own = db is None
+    db = db or _get_database()
+    try:
+        applied = applied_versions(db)
+        return [
+            {'version': version, 'name': name, 'applied': version in applied}
+            for version, name, _ in MIGRATIONS
+        ]
+    finally:
+        if own:
+            db.close()
+
+
+# ============================================
+# EXPLAIN 검사
+# ============================================
+
+QUERY_METHODS = {'execute', 'executeOne', 'executeAll'}
+
+# WHERE 절 컬럼명으로 EXPLAIN 용 예시 값 추정
+_PLACEHOLDER_PATTERN = re.compile(r'([\w.]+)\)?\s*(?:=|>=|<=|<|>)\s*%s', re.IGNORECASE)
+_ROW_PLACEHOLDER_PATTERN = re.compile(
+    r'\(\s*([\w.]+)\s*,\s*([\w.]+)\s*\)\s*(?:>=|<=|<|>)\s*\(\s*%s\s*,\s*%s\s*\)'
+)
+
+
+# f-string SQL 안에서 허용하는 Database 쿼리 빌더 메서드
+SQL_BUILDERS = {'rangeCondition', 'dateBucket', 'keysetCondition'}
+
+# f-string SQL 안에서 허용하는 컬럼 목록 상수 (projections.py)
+SQL_CONSTANTS = {
+    name: getattr(projections, name)
+    for name in ('NEWS_LIST_COLUMNS', 'ANALYSIS_LIST_COLUMNS', 'ANALYSIS_DETAIL_COLUMNS')
+}
+
+# 조건 조각을 만드는 모듈 함수의 EXPLAIN 용 예시 SQL (첫 인자가 상수일 때, 반환 튜플의 첫 값)
+SQL_SAMPLE_HELPERS = {
+    '_in_keys': lambda column, *_: f"AND {column} IN (%s)",
+}
+
+
+class _Unrenderable(Exception):
+    """EXPLAIN 용 SQL 로 바꿀 수 없는 식"""
+
+
+class _SqlRenderer:
+    """
+    쿼리 인자(AST)를 EXPLAIN 할 SQL 로 렌더링
+
+    SQL 리터럴, f-string 안의 db 쿼리 빌더(rangeCondition 등, 상수 인자)와 컬럼 목록 상수,
+    모듈 상수, 같은 함수의 지역 변수(조건에 따라 달라지면 가장 긴 = 조건이 가장 많은 형태),
+    ' AND '.join(조건 리스트), ', '.join(['%s'] * n), for 루프의 dict.items() 값(첫 항목)을 따라간다.
+    """
+
+    def __init__(self, tree, db):
+        self.db = db
+        self.module_values = {}
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                self.module_values[node.targets[0].id] = node.value
+
+    def render(self, node, func, depth=0):
+        if depth > 8:
+            raise _Unrenderable('expression nested too deeply')
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.JoinedStr):
+            return ''.join(
+                value.value if isinstance(value, ast.Constant) else self.render(value.value, func, depth + 1)
+                for value in node.values
+            )
+        if isinstance(node, ast.IfExp):
+            return max((self._try(branch, func, depth) for branch in (node.body, node.orelse)), key=len)
+        if isinstance(node, ast.Name):
+            return self._name(node.id, func, depth)
+        if isinstance(node, ast.Call):
+            return self._call(node, func, depth)
+        raise _Unrenderable(ast.unparse(node))
+
+    def _try(self, node, func, depth):
+        try:
+            return self.render(node, func, depth + 1)
+        except _Unrenderable:
+            return ''
+
+    def _name(self, name, func, depth):
+        candidates = [value for value in self._local_values(name, func)]
+        if candidates:
+            rendered = [self._try(value, func, depth) for value in candidates]
+            if any(rendered) or all(self._is_empty(value) for value in candidates):
+                return max(rendered, key=len)
+        if name in SQL_CONSTANTS:
+            return SQL_CONSTANTS[name]
+        if name in self.module_values:
+            return self.render(self.module_values[name], None, depth + 1)
+        raise _Unrenderable(name)
+
+    @staticmethod
+    def _is_empty(node):
+        return isinstance(node, ast.Constant) and node.value == ''
+
+    def _local_values(self, name, func):
+        """함수 안에서 name 에 대입되는 식들 (튜플 언패킹, for ... in CONST.items() 포함)"""
+        if func is None:
+            return
+        for node in ast.walk(func):
+            if isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and target.id == name:
+                        yield node.value
+                    elif isinstance(target, ast.Tuple):
+                        yield from self._unpack(target, node.value, name)
+            elif isinstance(node, ast.For) and isinstance(node.target, ast.Tuple):
+                iterator = node.iter
+                if (
+                    isinstance(iterator, ast.Call) and isinstance(iterator.func, ast.Attribute)
+                    and iterator.func.attr == 'items' and isinstance(iterator.func.value, ast.Name)
+                    and isinstance(self.module_values.get(iterator.func.value.id), ast.Dict)
+                ):
+                    mapping = self.module_values[iterator.func.value.id]
+                    if mapping.keys:
+                        yield from self._unpack(node.target, ast.Tuple([mapping.keys[0], mapping.values[0]]), name)
+
+    def _unpack(self, target, value, name):
+        for index, element in enumerate(target.elts):
+            if not (isinstance(element, ast.Name) and element.id == name):
+                continue
+            if isinstance(value, ast.Tuple) and index < len(value.elts):
+                yield value.elts[index]
+            elif index == 0 and isinstance(value, ast.Call):
+                # 조건 조각 helper 의 (SQL, 인자) 반환값
+                yield value
+
+    def _call(self, node, func, depth):
+        callee = node.func
+        constant_args = all(isinstance(arg, ast.Constant) for arg in node.args)
+        if isinstance(callee, ast.Attribute) and callee.attr in SQL_BUILDERS and constant_args:
+            if self.db is None:
+                raise _Unrenderable(ast.unparse(node))
+            return getattr(self.db, callee.attr)(*[arg.value for arg in node.args])
+        if isinstance(callee, ast.Name) and callee.id in SQL_SAMPLE_HELPERS and node.args \
+                and isinstance(node.args[0], ast.Constant):
+            return SQL_SAMPLE_HELPERS[callee.id](*[getattr(arg, 'value', None) for arg in node.args])
+        if (
+            isinstance(callee, ast.Attribute) and callee.attr == 'join'
+            and isinstance(callee.value, ast.Constant) and len(node.args) == 1
+        ):
+            return callee.value.value.join(self._join_items(node.args[0], func, depth))
+        raise _Unrenderable(ast.unparse(node))
+
+    def _join_items(self, node, func, depth):
+        # ['%s'] * len(ids) -> IN 목록 자리표시자 하나
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult) and isinstance(node.left, ast.List):
+            return [self.render(element, func, depth + 1) for element in node.left.elts]
+        # 지역 리스트 + .append() 로 모은 조건 (렌더링되는 것 모두)
+        if isinstance(node, ast.Name) and func is not None:
+            items = []
+            for child in ast.walk(func):
+                if (
+                    isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute)
+                    and child.func.attr == 'append' and isinstance(child.func.value, ast.Name)
+                    and child.func.value.id == node.id and len(child.args) == 1
+                ):
+                    items.append(self.render(child.args[0], func, depth + 1))
+            if items:
+                return items
+        raise _Unrenderable(ast.unparse(node))
+
+
+EXPLAIN_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+
+def _leading_keyword(node):
+    """SQL 인자의 첫 리터럴 단어 (INSERT 등 검사 대상이 아닌 문장을 거르는 용도, 모르면 None)"""
+    if isinstance(node, ast.JoinedStr) and node.values and isinstance(node.values[0], ast.Constant):
+        node = node.values[0]
+    if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.split():
+        return node.value.split()[0].upper()
+    return None
+
+
+def extract_queries(path=INDEX_PY, db=None, skipped=None):
+    """
+    파일에서 db.execute*/executeOne/executeAll 에 전달된 SQL 추출
+    (db 를 주면 쿼리 빌더를 쓴 f-string 도 해당 DB 방언으로 렌더링)
+
+    Args:
+        skipped: 렌더링하지 못한 쿼리를 (함수명, 줄번호, 원인) 으로 모을 리스트 (선택)
+
+    Returns:
+        list: (함수명, 줄번호, SQL) 튜플
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    renderer = _SqlRenderer(tree, db)
+
+    queries = []
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        for node in ast.walk(func):
+            if (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr in QUERY_METHODS
+                and node.args
+            ):
+                try:
+                    sql = renderer.render(node.args[0], func)
+                except _Unrenderable as e:
+                    keyword = _leading_keyword(node.args[0])
+                    if skipped is not None and (keyword is None or keyword in EXPLAIN_STATEMENTS):
+                        skipped.append((func.name, node.lineno, f"cannot render SQL for EXPLAIN: {{{e}}}"))
+                    continue
+                sql = ' '.join(sql.split())
+                if sql.split(' ', 1)[0].upper() in EXPLAIN_STATEMENTS:
+                    queries.append((func.name, node.lineno, sql))
+    return queries
+
+
+def _sample_value(column):
+    column = column.split('.')[-1].lower()
+    if column.endswith('_date') or column == 'date':
+        return date.today()
+    if column.endswith('_at'):
+        return datetime.now()
+    if column == 'id' or column.endswith('_id'):
+        return 1
+    if column == 'symbol':
+        return 'AAPL'
+    if column in ('status', 'analysis_type', 'category', 'catalyst_type', 'dimension'):
+        return 'x'
+    return 1
+
+
+def _explain_args(sql):
+    """LIMIT %s 는 리터럴로 치환하고 나머지 %s 에 컬럼별 예시 값 생성"""
+    sql = re.sub(r'LIMIT\s+%s', 'LIMIT 20', sql, flags=re.IGNORECASE)
+    # (ts, id) < (%s, %s) 같은 행 비교는 위치별로 컬럼 매칭
+    row_columns = {}
+    for row_match in _ROW_PLACEHOLDER_PATTERN.finditer(sql):
+        first, second = [m.end() for m in re.finditer(r'%s', row_match.group(0))]
+        row_columns[row_match.start() + first] = row_match.group(1)
+        row_columns[row_match.start() + second] = row_match.group(2)
+    args = []
+    for match in re.finditer(r'%s', sql):
+        found = row_columns.get(match.end())
+        for column_match in _PLACEHOLDER_PATTERN.finditer(sql[:match.end()]):
+            if column_match.end() == match.end():
+                found = column_match.group(1)
+        args.append(_sample_value(found or ''))
+    return sql, tuple(args)
+
+
+def _walk_pg_plan(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _walk_pg_plan(child)
+
+
+# 파티션 이름 (news_events_p2024_01, news_events_default) -> 부모 테이블
+_PARTITION_SUFFIX = re.compile(r'_(?:p\d{4}_\d{2}|default)$')
+
+
+def explain_query(db, sql):
+    """쿼리 한 개를 EXPLAIN 하여 대형 테이블 순차 스캔 목록 반환"""
+    sql, args = _explain_args(sql)
+
+    if db.db_type == 'postgresql':
+        row = db.executeOne(f"EXPLAIN (FORMAT JSON) {sql}", args)
+        plan = row['QUERY PLAN'][0]['Plan']
+        return [
+            node.get('Relation Name')
+            for node in _walk_pg_plan(plan)
+            if node.get('Node Type') == 'Seq Scan'
+            and _PARTITION_SUFFIX.sub('', node.get('Relation Name') or '') in LARGE_TABLES
+        ]
+
+    rows = db.executeAll(f"EXPLAIN {sql}", args)
+    return [
+        row.get('table')
+        for row in rows
+        if row.get('type') == 'ALL' and not row.get('possible_keys')
+        and _base_table(sql, row.get('table')) in LARGE_TABLES
+    ]
+
+
+def _base_table(sql, name):
+    """EXPLAIN 결과의 별칭(dp 등)을 실제 테이블명으로 변환"""
+    match = re.search(r'(\w+)\s+(?:AS\s+)?' + re.escape(name or '') + r'\b', sql, re.IGNORECASE)
+    if match and match.group(1).lower() in LARGE_TABLES:
+        return match.group(1).lower()
+    return name
+
+
+def check_explain(db=None, paths=None):
+    """
+    QUERY_MODULES 의 모든 쿼리를 EXPLAIN. PostgreSQL은 enable_seqscan=off 로 계획하여
+    사용할 수 있는 인덱스가 없을 때만 Seq Scan 이 남도록 한다.
+    EXPLAIN 용 SQL 로 렌더링하지 못한 쿼리도 실패로 보고한다 (검사 없이 통과하지 않도록).
+
+    Returns:
+        tuple: (검사한 쿼리 수, 실패 항목 [{'file', 'function', 'line', 'sql', 'problem'}])
+    """
+    own = db is None
+    db = db or _get_database()
+    checked = 0
+    failures = []
+    try:
+        if db.db_type == 'postgresql':
+            db.execute("SET enable_seqscan = off")
+
+        for path in paths or QUERY_MODULES:
+            file = os.path.basename(path)
+            skipped = []
+            queries = extract_queries(path, db, skipped)
+            checked += len(queries)
+            for function, line, problem in skipped:
+                failures.append({'file': file, 'function': function, 'line': line, 'sql': '', 'problem': problem})
+
+            for function, line, sql in queries:
+                try:
+                    scans = explain_query(db, sql)
+                except Exception as e:
+                    db.rollback()
+                    if db.db_type == 'postgresql':
+                        db.execute("SET enable_seqscan = off")
+                    failures.append({'file': file, 'function': function, 'line': line, 'sql': sql,
+                                     'problem': f'error: {e}'})
+                    continue
+                if scans:
+                    failures.append({
+                        'file': file, 'function': function, 'line': line, 'sql': sql,
+                        'problem': f"sequential scan on {', '.join(sorted(set(scans)))}"
+                    })
+    finally:
+        db.rollback()
+        if own:
+            db.close()
+    return checked, failures
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+
+    if command == 'upgrade':
+        applied = upgrade()
+        print(f"Applied: {applied or 'nothing (up to date)'}")
+    elif command == 'check':
+        db = _get_database()
+        try:
+            checked, failures = check_explain(db)
+        finally:
+            db.close()
+        for failure in failures:
+            print(f"FAIL {failure['function']} ({failure['file']}:{failure['line']}): {failure['problem']}")
+            if failure['sql']:
+                print(f"     {failure['sql'][:160]}")
+        print(f"{checked} queries checked, {len(failures)} failed")
+        sys.exit(1 if failures else 0)
+    else:
+        for row in status():
+            mark = 'x' if row['applied'] else ' '
+            print(f"[{mark}] {row['version']:03d}_{row['name']}")
@@ -0,0 +1,247 @@
+# file name : pipeline.py
+# pwd : /dal9/app/ex_app/pipeline.py
+# 미국 증시 급등주 예측 앱 - 수집 결과 저장 단계
+#
+# run_collection.py (cron/GitHub Actions) 와 /api/ai/collect 작업(jobs.py)이 공유하는
+# DB 저장 로직. 뉴스/예측을 각각 한 번(또는 몇 번)의 배치 INSERT로 저장한다.
+
+import os
+from datetime import date
+
+try:
+    from app.ex_app.analyzer import NewsAnalyzer
+    from app.ex_app.rollup import refresh_days
+    from app.ex_app.profiling import NULL_TIMER
+    from app.ex_app import cache
+    from app.ex_app.snapshot import refresh_snapshot
+    from app.ex_app.changes import record_changes
+except ImportError:
+    from analyzer import NewsAnalyzer
+    from rollup import refresh_days
+    from profiling import NULL_TIMER
+    import cache
+    from snapshot import refresh_snapshot
+    from changes import record_changes
+
+NEWS_COLUMNS = [
+    'symbol', 'headline', 'source', 'url', 'importance_score',
+    'catalyst_type', 'sentiment_score', 'related_symbols'
+]
+
+# 다른 프로세스가 같은 날짜 수집을 진행 중일 때 완료를 기다리는 최대 시간(초)
+COLLECTION_LOCK_WAIT = float(os.environ.get('COLLECTION_LOCK_WAIT', 900))
+
+PICK_COLUMNS = [
+    'session_id', 'symbol', 'pick_rank', 'category', 'confidence_score', 'reasoning',
+    'news_score', 'momentum_score', 'social_score', 'catalyst_type'
+]
+
+
+def save_news_events(db, news_items, limit=30):
+    """
+    분석된 뉴스를 news_events 에 배치 저장 (커밋은 호출자)
+
+    Returns:
+        dict: Database.bulkInsert 결과 ({'inserted', 'errors', 'ids'})
+    """
+    analyzer = NewsAnalyzer()
+    rows = []
+    for news in news_items[:limit]:
+        analysis = analyzer.annotate(news)
+        rows.append((
+            news.get('symbol'),
+            (news.get('headline') or '')[:500],
+            news.get('source') or 'finviz',
+            (news.get('url') or '')[:500],
+            analysis['score'],
+            analysis['catalyst_type'],
+            analysis['sentiment'],
+            ','.join(news.get('symbols') or [])[:255]
+        ))
+    result = db.bulkInsert('news_events', NEWS_COLUMNS, rows, returning='id')
+    record_changes(db, 'news_events', result['ids'])
+    return result
+
+
+def save_daily_picks(db, session_id, predictions):
+    """
+    예측 결과를 daily_picks 에 배치 저장하고 오늘 성과 롤업 갱신 (커밋은 호출자)
+
+    Returns:
+        dict: Database.bulkInsert 결과 ({'inserted', 'errors', 'ids'})
+    """
+    rows = [
+        (
+            session_id,
+            pred['symbol'],
+            pred['pick_rank'],
+            pred['category'],
+            pred['confidence_score'],
+            (pred.get('reasoning') or '')[:500],
+            pred.get('news_score', 0),
+            pred.get('momentum_score', 0),
+            pred.get('social_score', 0),
+            pred.get('catalyst_type') or 'other'
+        )
+        for pred in predictions
+    ]
+    result = db.bulkInsert('daily_picks', PICK_COLUMNS, rows, returning='id')
+    record_changes(db, 'daily_picks', result['ids'])
+    if result['inserted']:
+        refresh_days(db, [date.today()])
+    return result
+
+
+def ensure_session(db, session_date):
+    """
+    날짜별 수집 세션 조회 또는 생성 (collection_sessions.session_date UNIQUE, 커밋은 호출자)
+    새로 만들면 변경 로그와 대시보드 스냅샷도 같은 트랜잭션에서 갱신한다.
+
+    Returns:
+        tuple: (세션 dict {'id', 'status'}, 새로 만들었으면 True)
+    """
+    query = "SELECT id, status FROM collection_sessions WHERE session_date = %s"
+    session = db.executeOne(query, (session_date,))
+    if session:
+        return session, False
+
+    result = db.bulkInsert('collection_sessions', ['session_date', 'status'],
+                           [(session_date, 'collecting')], returning='id')
+    if result['errors']:
+        # 동시에 다른 프로세스가 먼저 생성함 (UNIQUE 위반)
+        return db.executeOne(query, (session_date,)), False
+    record_changes(db, 'collection_sessions', result['ids'])
+    refresh_snapshot(db)
+    return {'id': result['ids'][0], 'status': 'collecting'}, True
+
+
+def collection_lock_name(session_date):
+    return f'ex_app_collect:{session_date}'
+
+
+def session_summary(db, session_id):
+    """이미 끝난(또는 다른 프로세스가 끝낸) 수집 세션의 결과 요약"""
+    session = db.executeOne(
+        "SELECT id, session_date, status FROM collection_sessions WHERE id = %s", (session_id,)
+    )
+    picks = db.executeAll(
+        "SELECT symbol, pick_rank, category, confidence_score FROM daily_picks "
+        "WHERE session_id = %s ORDER BY pick_rank ASC",
+        (session_id,)
+    )
+    return {
+        "session_id": session_id,
+        "session_status": session['status'] if session else None,
+        "predictions_count": len(picks),
+        "top_picks": [p['symbol'] for p in picks[:5]],
+        "picks": picks
+    }
+
+
+def run_collection_single_flight(db, session_id, session_date, timer=None, wait_timeout=COLLECTION_LOCK_WAIT):
+    """
+    날짜별 잠금을 잡고 수집 실행. 다른 워커/cron 이 같은 날짜를 수집 중이면
+    끝날 때까지 기다린다. 잠금을 잡은 뒤 세션이 이미 predicted 면(기다린 수집이
+    끝났거나, 잠금이 비어 있었지만 앞선 실행이 이미 끝낸 경우) 다시 수집하지 않고
+    그 결과를 반환하며 ('attached': True), 아니면 잠금을 쥔 채 직접 수집한다.
+    """
+    lock_name = collection_lock_name(session_date)
+    if not db.acquireLock(lock_name):
+        print(f"[EX_APP] Collection for {session_date} in progress elsewhere, waiting")
+        if not db.acquireLock(lock_name, timeout=wait_timeout):
+            raise TimeoutError(f"collection for {session_date} still running after {wait_timeout}s")
+
+    try:
+        # 잠금을 잡기 전 트랜잭션의 스냅샷을 버리고 세션 상태를 다시 읽는다 (세션 잠금은 유지됨)
+        db.rollback()
+        summary = session_summary(db, session_id)
+        if summary['session_status'] == 'predicted':
+            print(f"[EX_APP] Collection for {session_date} already finished, attaching")
+            return dict(summary, attached=True)
+
+        db.execute("UPDATE collection_sessions SET status = 'collecting' WHERE id = %s", (session_id,))
+        record_changes(db, 'collection_sessions', [session_id])
+        refresh_snapshot(db)
+        db.commit()
+        return dict(run_collection_pipeline(db, session_id, timer), attached=False)
+    except Exception:
+        db.rollback()
+        # 잠금을 쥔 동안 표시해야 다음 수집(잠금을 이어받은 쪽)의 상태를 덮어쓰지 않는다
+        mark_session_error(db, session_id)
+        raise
+    finally:
+        db.releaseLock(lock_name)
+
+
+def mark_session_error(db, session_id):
+    """수집 실패 표시 (잠금을 쥔 쪽만 호출, 커밋 포함. 표시 실패는 원래 오류를 가리지 않도록 로그만)"""
+    try:
+        db.execute("UPDATE collection_sessions SET status = 'error' WHERE id = %s", (session_id,))
+        record_changes(db, 'collection_sessions', [session_id])
+        refresh_snapshot(db)
+        db.commit()
+        cache.invalidate()
+    except Exception as e:
+        db.rollback()
+        print(f"[EX_APP] Failed to mark collection session #{session_id} as error: {e}")
+
+
+def run_collection_pipeline(db, session_id, timer=None):
+    """
+    수집 -> 중복 제거 -> 분석 -> 저장 전체 실행 (저장 후 커밋)
+
+    Args:
+        timer: 단계(collect/dedup/analyze/save)별 진행 기록용 StageTimer (선택)
+
+    Returns:
+        dict: 저장 건수/오류, 상위 종목 등 실행 결과 요약
+    """
+    # 수집기는 requests/bs4/yfinance 가 필요하므로 실행 시점에 import
+    try:
+        from app.ex_app.collectors import collect_all_data
+        from app.ex_app.analyzer import run_analysis
+        from app.ex_app.dedup import dedupe_collected_data
+    except ImportError:
+        from collectors import collect_all_data
+        from analyzer import run_analysis
+        from dedup import dedupe_collected_data
+
+    timer = timer or NULL_TIMER
+
+    with timer.stage('collect'):
+        data = collect_all_data(session_id)
+
+    with timer.stage('dedup'):
+        dedup_summary = dedupe_collected_data(data)
+
+    with timer.stage('analyze'):
+        result = run_analysis(data)
+        predictions = result.get('predictions', [])
+
+    # 뉴스/예측 배치 저장 (행 단위 오류는 건너뜀)
+    with timer.stage('save'):
+        news_result = save_news_events(db, data.get('finviz_news', []))
+        pick_result = save_daily_picks(db, session_id, predictions)
+        db.execute(
+            "UPDATE collection_sessions SET status = 'predicted' WHERE id = %s",
+            (session_id,)
+        )
+        record_changes(db, 'collection_sessions', [session_id])
+        refresh_snapshot(db)
+        db.commit()
+        cache.invalidate()
+
+    return {
+        "session_id": session_id,
+        "predictions_count": len(predictions),
+        "news_count": len(data.get('finviz_news', [])),
+        "dedup": {key: {"before": before, "after": after} for key, (before, after) in dedup_summary.items()},
+        "saved": {
+            "news": news_result['inserted'],
+            "picks": pick_result['inserted'],
+            "news_errors": news_result['errors'],
+            "pick_errors": pick_result['errors']
+        },
+        "top_picks": [p['symbol'] for p in predictions[:5]],
+        "analysis_metrics": result.get('metrics', {})
+    }
@@ -0,0 +1,114 @@
+# file name : profiling.py
+# pwd : /dal9/app/ex_app/profiling.py
+# 미국 증시 급등주 예측 앱 - 단계별 타이밍 및 프로파일링 유틸리티
+#
+# StageTimer  : 단계별 monotonic 타이머 + 항목 카운터 (항상 켜져 있는 경량 계측)
+# profile_run : EX_APP_PROFILE=cprofile|pyinstrument 일 때 실행당 프로파일 파일 저장
+
+import os
+import time
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+
+# pyinstrument는 선택적
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+    HAS_PYINSTRUMENT = True
+except ImportError:
+    HAS_PYINSTRUMENT = False
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+
+
+class StageTimer:
+    """단계별 소요 시간(ms)과 카운터 수집"""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """같은 이름으로 여러 번 들어가면 누적된다 (루프 내부 계측용)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        return {
+            'stages_ms': {k: round(v, 3) for k, v in self.stages.items()},
+            'counters': dict(self.counters),
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 3)
+        }
+
+
+class _NullTimer(StageTimer):
+    """계측이 필요 없을 때 사용하는 빈 타이머"""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def count(self, name, value=1):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+@contextmanager
+def profile_run(label='analysis', mode=None, profile_dir=None):
+    """
+    실행 단위 프로파일 캡처 (opt-in)
+
+    Args:
+        mode: 'cprofile' 또는 'pyinstrument' (기본값: EX_APP_PROFILE 환경 변수)
+        profile_dir: 저장 디렉터리 (기본값: EX_APP_PROFILE_DIR 또는 ./profiles)
+
+    Yields:
+        dict: 종료 후 'path' 키에 저장된 프로파일 파일 경로가 채워짐
+    """
+    mode = (mode or os.environ.get('EX_APP_PROFILE', '')).lower()
+    info = {'mode': mode or None, 'path': None}
+
+    if mode not in ('cprofile', 'pyinstrument'):
+        yield info
+        return
+
+    if mode == 'pyinstrument' and not HAS_PYINSTRUMENT:
+        print("[EX_APP] pyinstrument not installed. Falling back to cProfile.")
+        mode = info['mode'] = 'cprofile'
+
+    profile_dir = profile_dir or os.environ.get('EX_APP_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+    os.makedirs(profile_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+
+    if mode == 'pyinstrument':
+        profiler = PyinstrumentProfiler()
+        profiler.start()
+        try:
+            yield info
+        finally:
+            profiler.stop()
+            path = os.path.join(profile_dir, f'{label}_{stamp}.html')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+            info['path'] = path
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield info
+        finally:
+            profiler.disable()
+            path = os.path.join(profile_dir, f'{label}_{stamp}.prof')
+            profiler.dump_stats(path)
+            info['path'] = path
@@ -0,0 +1,155 @@
+# file name : projections.py
+# pwd : /dal9/app/ex_app/projections.py
+# 미국 증시 급등주 예측 앱 - 목록 조회용 컬럼 목록과 ai_analysis 본문 저장 형식
+#
+# 목록 API/페이지(/ai, /api/ai/analysis, /api/news, 대시보드)는 SELECT * 대신 아래 컬럼
+# 목록만 읽는다. ai_analysis.content(보고서 본문)는 목록에서 빼고 저장 시 만든
+# preview(앞부분)와 content_length 만 돌려주며, 본문은 상세 API
+# (/api/ai/analysis/<id>) 에서 필요할 때 읽는다.
+#
+# AI_CONTENT_COMPRESSION 을 켜면 긴 본문은 content 대신 content_blob 에 압축 저장한다
+# (content_encoding = 'zstd' 또는 'gzip'). 읽을 때는 decode_content() 로 복원한다.
+#
+#   AI_CONTENT_COMPRESSION   none(기본) | gzip | zstd | auto (zstandard 설치 시 zstd, 없으면 gzip)
+#
+#   python projections.py compress   기존 본문을 현재 설정으로 압축 저장 (migrations 011 이후)
+
+import os
+import sys
+import gzip
+
+# zstd 압축 (선택, 없으면 gzip)
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# 목록용 컬럼 (SQL 조각, migrations.py check 가 EXPLAIN 시 치환)
+NEWS_LIST_COLUMNS = (
+    "id, symbol, headline, source, url, sentiment_score, catalyst_type, "
+    "importance_score, published_at, collected_at"
+)
+ANALYSIS_LIST_COLUMNS = (
+    "id, session_id, analysis_type, symbol, title, preview, content_length, "
+    "confidence_score, recommendation, created_at"
+)
+ANALYSIS_DETAIL_COLUMNS = ANALYSIS_LIST_COLUMNS + ", content, content_encoding, content_blob"
+
+# ai_analysis INSERT 컬럼 (analysis_values() 순서)
+ANALYSIS_COLUMNS = [
+    'session_id', 'analysis_type', 'symbol', 'title', 'content', 'content_blob',
+    'content_encoding', 'preview', 'content_length', 'confidence_score', 'recommendation'
+]
+
+PREVIEW_CHARS = 200
+# 이보다 짧은 본문은 압축하지 않음 (문자 수)
+COMPRESS_MIN_CHARS = 1024
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+_setting = os.environ.get('AI_CONTENT_COMPRESSION', 'none').lower()
+if _setting == 'auto':
+    _setting = 'zstd' if HAS_ZSTD else 'gzip'
+if _setting == 'zstd' and not HAS_ZSTD:
+    print("[EX_APP] AI_CONTENT_COMPRESSION=zstd but zstandard is not installed, using gzip")
+    _setting = 'gzip'
+CONTENT_COMPRESSION = _setting if _setting in ('gzip', 'zstd') else None
+
+
+def compress_content(text, encoding=CONTENT_COMPRESSION):
+    """본문 -> (content, content_blob, content_encoding) (짧거나 압축 꺼짐이면 원문 그대로)"""
+    if text is None or encoding is None or len(text) < COMPRESS_MIN_CHARS:
+        return text, None, None
+    raw = text.encode('utf-8')
+    if encoding == 'zstd':
+        return None, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), 'zstd'
+    return None, gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+
+
+def decode_content(row):
+    """상세 조회 행의 content_blob 을 content 로 복원 (content_blob/content_encoding 키는 제거)"""
+    if row is None:
+        return None
+    blob = row.pop('content_blob', None)
+    encoding = row.pop('content_encoding', None)
+    if blob is not None and encoding:
+        raw = bytes(blob)
+        if encoding == 'zstd':
+            if not HAS_ZSTD:
+                raise ImportError("zstandard is required to read zstd-compressed analysis content")
+            raw = zstandard.ZstdDecompressor().decompress(raw)
+        else:
+            raw = gzip.decompress(raw)
+        row['content'] = raw.decode('utf-8')
+    return row
+
+
+def analysis_values(session_id, analysis_type, symbol, title, content,
+                    confidence_score=50, recommendation='watch'):
+    """ai_analysis 한 행 (ANALYSIS_COLUMNS 순서, 미리보기/길이 계산 + 압축)"""
+    stored, blob, encoding = compress_content(content)
+    return (
+        session_id, analysis_type, symbol, title, stored, blob, encoding,
+        content[:PREVIEW_CHARS] if content else None,
+        len(content) if content is not None else None,
+        confidence_score, recommendation
+    )
+
+
+def compress_existing(db, batch_size=200):
+    """
+    content 가 평문으로 남아 있는 긴 본문을 현재 설정으로 압축 (배치마다 커밋)
+
+    Returns:
+        int: 압축한 행 수
+    """
+    if CONTENT_COMPRESSION is None:
+        return 0
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.executeAll("""
+            SELECT id, content FROM ai_analysis
+            WHERE id > %s AND content_encoding IS NULL AND content_length >= %s
+            ORDER BY id LIMIT %s
+        """, (last_id, COMPRESS_MIN_CHARS, batch_size))
+        if not rows:
+            return total
+        for row in rows:
+            stored, blob, encoding = compress_content(row['content'])
+            if encoding:
+                db.execute(
+                    "UPDATE ai_analysis SET content = %s, content_blob = %s, content_encoding = %s WHERE id = %s",
+                    (stored, blob, encoding, row['id'])
+                )
+                total += 1
+        db.commit()
+        last_id = rows[-1]['id']
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'compress':
+        print("Usage: python projections.py compress")
+        sys.exit(1)
+    if CONTENT_COMPRESSION is None:
+        print("Set AI_CONTENT_COMPRESSION=gzip|zstd|auto to compress stored analysis content")
+        sys.exit(1)
+
+    if os.environ.get('DATABASE_URL'):
+        from module.dbModule_ex_pg import Database
+    else:
+        try:
+            from app.module.dbModule_ex import Database
+        except ImportError:
+            from module.dbModule_ex_pg import Database
+
+    db = Database(use_primary=True)
+    try:
+        count = compress_existing(db)
+        print(f"[EX_APP] Compressed {count} analysis bodies ({CONTENT_COMPRESSION})")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
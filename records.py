@@ -0,0 +1,110 @@
+# file name : records.py
+# pwd : /dal9/app/ex_app/records.py
+# 미국 증시 급등주 예측 앱 - 수집/분석/저장 단계에서 공유하는 레코드 타입
+#
+# 수천 건 단위의 헤드라인이 collectors -> analyzer -> DB 로 흘러가는 동안
+# dict 생성/복사 비용을 줄이기 위해 __slots__ 데이터클래스를 사용한다.
+# 기존 dict 기반 코드와 호환되도록 get()/[]/keys() 를 지원하며,
+# JSON API 에는 to_dict() 로 변환하여 전달한다.
+
+from dataclasses import dataclass, field
+
+
+class _Record:
+    """dict 스타일 접근을 지원하는 __slots__ 레코드 베이스"""
+
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return self.__slots__
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def to_dict(self):
+        """JSON 응답용 dict 변환"""
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+@dataclass(slots=True)
+class NewsItem(_Record):
+    """뉴스 헤드라인 (Finviz 등)"""
+    symbol: str = ''
+    headline: str = ''
+    url: str = ''
+    source: str = 'finviz'
+    published_at: str = None
+    # 분석 결과 (NewsAnalyzer가 채움)
+    importance_score: int = 0
+    catalyst_type: str = 'other'
+    sentiment_score: float = 0
+    # 중복 클러스터링 결과 (dedup.cluster_headlines가 채움)
+    symbols: list = field(default_factory=list)
+    sources: list = field(default_factory=list)
+    duplicate_count: int = 1
+
+
+@dataclass(slots=True)
+class Filing(_Record):
+    """SEC 공시"""
+    headline: str = ''
+    url: str = ''
+    published_at: str = None
+    source: str = 'sec'
+    catalyst_type: str = '8k_filing'
+    symbol: str = ''
+    importance_score: int = 0
+    sentiment_score: float = 0
+    symbols: list = field(default_factory=list)
+    sources: list = field(default_factory=list)
+    duplicate_count: int = 1
+
+
+@dataclass(slots=True)
+class Gainer(_Record):
+    """급등주"""
+    symbol: str = ''
+    change_pct: str = '0%'
+    source: str = 'finviz'
+
+
+@dataclass(slots=True)
+class Mention(_Record):
+    """소셜 멘션 집계"""
+    symbol: str = ''
+    mentions: int = 0
+    source: str = 'reddit'
+
+
+@dataclass(slots=True)
+class Prediction(_Record):
+    """PredictionEngine 예측 결과"""
+    symbol: str = ''
+    confidence_score: float = 0
+    category: str = 'volume_explosion'
+    catalyst_type: str = 'other'
+    news_score: int = 0
+    momentum_score: int = 0
+    social_score: int = 0
+    reasoning: str = ''
+    top_news: str = None
+    pick_rank: int = None
+
+
+def to_dicts(records):
+    """레코드 리스트 -> dict 리스트 (JSON 응답용)"""
+    return [r.to_dict() if isinstance(r, _Record) else dict(r) for r in records]
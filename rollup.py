@@ -0,0 +1,214 @@
+# file name : rollup.py
+# pwd : /dal9/app/ex_app/rollup.py
+# 미국 증시 급등주 예측 앱 - 성과 통계 롤업 (performance_stats / performance_breakdown)
+#
+# 예측(daily_picks)이나 결과(prediction_results)가 저장될 때 해당 예측일의
+# 집계만 다시 계산하여 저장한다. 통계 API/페이지는 전체 이력을 조인하지 않고
+# 일별 롤업 몇 행만 읽는다. 하루 단위로 통째로 재계산하므로 결과 수정/재전송에도
+# 값이 어긋나지 않는다 (멱등).
+#
+#   python rollup.py rebuild [days]   최근 days 일(기본 전체) 롤업 재생성
+#                                     (기존 데이터 백필은 migrations.py 013 이 release 때 한 번 실행)
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+try:
+    from app.ex_app.changes import record_changes, DELETE
+except ImportError:
+    from changes import record_changes, DELETE
+
+STATS_COLUMNS = [
+    'stat_date', 'total_picks', 'successful_picks', 'avg_gain_pct', 'gain_sum', 'gain_count',
+    'best_pick_symbol', 'best_pick_gain', 'worst_pick_gain', 'updated_at'
+]
+
+BREAKDOWN_COLUMNS = [
+    'stat_date', 'dimension', 'dim_value', 'total_picks', 'successful_picks',
+    'gain_sum', 'gain_count', 'avg_gain_pct'
+]
+
+# 분류 기준 (performance_breakdown.dimension -> daily_picks 컬럼)
+DIMENSIONS = {
+    'category': 'dp.category',
+    'catalyst': 'dp.catalyst_type',
+}
+
+_AGGREGATES = """
+    COUNT(*) AS total_picks,
+    SUM(CASE WHEN pr.is_successful = 1 THEN 1 ELSE 0 END) AS successful_picks,
+    SUM(pr.gain_pct_eod) AS gain_sum,
+    COUNT(pr.gain_pct_eod) AS gain_count
+"""
+
+
+def _avg(gain_sum, gain_count):
+    return round(float(gain_sum) / gain_count, 2) if gain_count else None
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    return value
+
+
+def refresh_days(db, days):
+    """
+    예측일별 롤업 재계산 (커밋은 호출자)
+
+    Args:
+        days: date / 'YYYY-MM-DD' 목록
+
+    Returns:
+        int: 갱신한 날짜 수
+    """
+    days = sorted({_as_date(day) for day in days if day})
+    for day in days:
+        _refresh_day(db, day)
+    return len(days)
+
+
+def _refresh_day(db, day):
+    start, end = db.dayRange(day)
+    where = db.rangeCondition('dp.created_at')
+
+    summary = db.executeOne(f"""
+        SELECT {_AGGREGATES},
+            MAX(pr.gain_pct_eod) AS best_gain,
+            MIN(pr.gain_pct_eod) AS worst_gain
+        FROM daily_picks dp
+        LEFT JOIN prediction_results pr ON pr.pick_id = dp.id
+        WHERE {where}
+    """, (start, end))
+
+    db.execute("DELETE FROM performance_breakdown WHERE stat_date = %s", (day,))
+
+    if not summary or not summary['total_picks']:
+        db.execute("DELETE FROM performance_stats WHERE stat_date = %s", (day,))
+        if db.cursor.rowcount > 0:
+            record_changes(db, 'performance_stats', [day.isoformat()], DELETE)
+        return
+
+    best = db.executeOne(f"""
+        SELECT dp.symbol, pr.gain_pct_eod
+        FROM daily_picks dp
+        JOIN prediction_results pr ON pr.pick_id = dp.id
+        WHERE {where} AND pr.gain_pct_eod IS NOT NULL
+        ORDER BY pr.gain_pct_eod DESC
+        LIMIT 1
+    """, (start, end))
+
+    gain_sum = summary['gain_sum'] or 0
+    gain_count = summary['gain_count'] or 0
+    db.upsertMany('performance_stats', STATS_COLUMNS, [(
+        day,
+        summary['total_picks'],
+        summary['successful_picks'] or 0,
+        _avg(gain_sum, gain_count),
+        gain_sum,
+        gain_count,
+        best['symbol'] if best else None,
+        best['gain_pct_eod'] if best else None,
+        summary['worst_gain'],
+        datetime.now()
+    )], ['stat_date'], returning=None)
+    record_changes(db, 'performance_stats', [day.isoformat()])
+
+    rows = []
+    for dimension, column in DIMENSIONS.items():
+        groups = db.executeAll(f"""
+            SELECT {column} AS dim_value, {_AGGREGATES}
+            FROM daily_picks dp
+            LEFT JOIN prediction_results pr ON pr.pick_id = dp.id
+            WHERE {where}
+            GROUP BY {column}
+        """, (start, end))
+        for group in groups:
+            group_sum = group['gain_sum'] or 0
+            group_count = group['gain_count'] or 0
+            rows.append((
+                day, dimension, group['dim_value'] or 'other',
+                group['total_picks'], group['successful_picks'] or 0,
+                group_sum, group_count, _avg(group_sum, group_count)
+            ))
+    if rows:
+        db.bulkInsert('performance_breakdown', BREAKDOWN_COLUMNS, rows)
+
+
+def refresh_for_picks(db, pick_ids):
+    """
+    저장/수정된 예측(pick_id)들이 속한 날짜의 롤업 재계산 (커밋은 호출자)
+    예측일(created_at)과 세션 날짜가 다르면(다른 날 세션으로 적재된 예측 등) 둘 다 갱신한다.
+    """
+    pick_ids = sorted({int(pick_id) for pick_id in pick_ids})
+    if not pick_ids:
+        return 0
+
+    days = set()
+    for offset in range(0, len(pick_ids), 500):
+        chunk = pick_ids[offset:offset + 500]
+        rows = db.executeAll(f"""
+            SELECT {db.dateBucket('dp.created_at')} AS pick_date, cs.session_date
+            FROM daily_picks dp
+            LEFT JOIN collection_sessions cs ON cs.id = dp.session_id
+            WHERE dp.id IN ({', '.join(['%s'] * len(chunk))})
+            GROUP BY pick_date, cs.session_date
+        """, tuple(chunk))
+        for row in rows:
+            days.add(row['pick_date'])
+            days.add(row['session_date'])
+    return refresh_days(db, days)
+
+
+def rebuild(db, days=None):
+    """최근 days 일(None이면 전체 기간) 롤업 재생성 (커밋은 호출자)"""
+    if days:
+        first = date.today() - timedelta(days=days - 1)
+    else:
+        row = db.executeOne("SELECT MIN(created_at) AS first_pick FROM daily_picks")
+        if not row or not row['first_pick']:
+            return 0
+        first = _as_date(row['first_pick'])
+
+    day_list = []
+    day = first
+    while day <= date.today():
+        day_list.append(day)
+        day += timedelta(days=1)
+    return refresh_days(db, day_list)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'rebuild':
+        print("Usage: python rollup.py rebuild [days]")
+        sys.exit(1)
+
+    if os.environ.get('DATABASE_URL'):
+        from module.dbModule_ex_pg import Database
+    else:
+        try:
+            from app.module.dbModule_ex import Database
+        except ImportError:
+            from module.dbModule_ex_pg import Database
+    try:
+        from app.ex_app import cache
+        from app.ex_app.snapshot import refresh_snapshot
+    except ImportError:
+        import cache
+        from snapshot import refresh_snapshot
+
+    db = Database(use_primary=True)
+    try:
+        count = rebuild(db, int(sys.argv[2]) if len(sys.argv) > 2 else None)
+        refresh_snapshot(db)
+        db.commit()
+        cache.invalidate()
+        print(f"[EX_APP] Rebuilt performance rollup for {count} days")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
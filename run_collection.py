@@ -32,9 +32,25 @@ else:
 try:
     from app.ex_app.collectors import collect_all_data, FinvizCollector, RedditCollector
     from app.ex_app.analyzer import run_analysis, NewsAnalyzer
+    from app.ex_app.dedup import dedupe_collected_data
+    from app.ex_app import cache
+    from app.ex_app.snapshot import refresh_snapshot
+    from app.ex_app.changes import record_changes
+    from app.ex_app.pipeline import (
+        save_news_events, save_daily_picks, ensure_session, collection_lock_name,
+        session_summary, COLLECTION_LOCK_WAIT
+    )
 except ImportError:
     from collectors import collect_all_data, FinvizCollector, RedditCollector
     from analyzer import run_analysis, NewsAnalyzer
+    from dedup import dedupe_collected_data
+    import cache
+    from snapshot import refresh_snapshot
+    from changes import record_changes
+    from pipeline import (
+        save_news_events, save_daily_picks, ensure_session, collection_lock_name,
+        session_summary, COLLECTION_LOCK_WAIT
+    )
 
 from datetime import datetime
 
@@ -46,20 +62,46 @@ def run_full_collection():
 
     # 1. 세션 생성
     print('\n📋 Step 1: 세션 생성...')
-    db = Database()
+    # 잠금용 연결은 수집이 끝날 때까지 유지 (/api/ai/collect 워커와 동시 실행 방지)
+    lock_db = Database(use_primary=True)
     today = datetime.now().strftime('%Y-%m-%d')
+    lock_name = collection_lock_name(today)
 
-    existing = db.executeOne('SELECT * FROM collection_sessions WHERE session_date = %s', (today,))
-    if existing:
-        session_id = existing['id']
-        print(f'   기존 세션 사용: #{session_id}')
-    else:
-        db.execute('INSERT INTO collection_sessions (session_date, status) VALUES (%s, %s)', (today, 'collecting'))
-        db.commit()
-        session_id = db.lid()
-        print(f'   새 세션 생성: #{session_id}')
-    db.close()
+    session, created = ensure_session(lock_db, today)
+    lock_db.commit()
+    session_id = session['id']
+    print(f'   {"새 세션 생성" if created else "기존 세션 사용"}: #{session_id}')
 
+    if not lock_db.acquireLock(lock_name):
+        # 다른 프로세스가 오늘 수집 중 -> 끝날 때까지 기다렸다가 그 결과 사용
+        print(f'   다른 프로세스가 수집 중, 최대 {COLLECTION_LOCK_WAIT:.0f}초 대기...')
+        try:
+            acquired = lock_db.acquireLock(lock_name, timeout=COLLECTION_LOCK_WAIT)
+        except Exception:
+            lock_db.close()
+            raise
+        if not acquired:
+            print('   ⚠ 대기 시간 초과, 종료')
+            lock_db.close()
+            return []
+
+    try:
+        # 잠금이 비어 있었더라도 앞선 실행(/api/ai/collect 작업 등)이 이미 끝냈을 수 있음
+        lock_db.rollback()
+        summary = session_summary(lock_db, session_id)
+        if summary['session_status'] == 'predicted':
+            print(f'   ✓ 기존 수집 결과 사용: {summary["predictions_count"]}건 {summary["top_picks"]}')
+            return summary['picks']
+        if summary['session_status'] == 'error':
+            # 앞선 수집이 실패함 -> 잠금을 쥔 채 직접 다시 수집
+            print(f'   ⚠ 앞선 수집 상태: {summary["session_status"]}, 다시 수집합니다')
+        return _collect_and_save(session_id)
+    finally:
+        lock_db.releaseLock(lock_name)
+        lock_db.close()
+
+
+def _collect_and_save(session_id):
     # 2. 데이터 수집
     print('\n📊 Step 2: 데이터 수집 중...')
     data = collect_all_data(session_id)
@@ -72,6 +114,11 @@ def run_full_collection():
     if data.get('errors'):
         print(f'   ⚠ 에러: {data["errors"]}')
 
+    # 유사 헤드라인 클러스터링 (중복 기사 제거, 종목 귀속은 유지)
+    dedup_summary = dedupe_collected_data(data)
+    for key, (before, after) in dedup_summary.items():
+        print(f'   ✓ {key} 중복 제거: {before}건 → {after}건')
+
     # 3. 분석 및 예측
     print('\n🎯 Step 3: 분석 및 예측 생성...')
     result = run_analysis(data)
@@ -79,61 +126,33 @@ def run_full_collection():
 
     print(f'   분석된 심볼 수: {result.get("total_symbols_analyzed", 0)}')
     print(f'   생성된 예측 수: {len(predictions)}')
+    metrics = result.get('metrics', {})
+    print(f'   분석 소요 시간: {metrics.get("total_ms", 0):.1f}ms {metrics.get("stages_ms", {})}')
+    if metrics.get('profile_path'):
+        print(f'   프로파일 저장: {metrics["profile_path"]}')
 
     # 4. DB에 저장
     print('\n💾 Step 4: DB에 저장...')
     db = Database()
 
     # 뉴스 저장
-    news_count = 0
-    analyzer = NewsAnalyzer()
-    for news in data.get('finviz_news', [])[:30]:
-        try:
-            analysis = analyzer.analyze_headline(news.get('headline', ''))
-            
-            db.execute('''
-                INSERT INTO news_events (symbol, headline, source, url, importance_score, catalyst_type, sentiment_score)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ''', (
-                news.get('symbol'),
-                news.get('headline', '')[:500],
-                news.get('source', 'finviz'),
-                news.get('url', '')[:500],
-                analysis['score'],
-                analysis['catalyst_type'],
-                analysis['sentiment']
-            ))
-            news_count += 1
-        except Exception as e:
-            pass
-
+    news_result = save_news_events(db, data.get('finviz_news', []))
     db.commit()
-    print(f'   ✓ 뉴스 저장: {news_count}건')
+    print(f'   ✓ 뉴스 저장: {news_result["inserted"]}건')
 
     # 예측 저장
-    pick_count = 0
-    for pred in predictions:
-        try:
-            db.execute('''
-                INSERT INTO daily_picks (session_id, symbol, pick_rank, category, confidence_score, reasoning)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            ''', (
-                session_id,
-                pred['symbol'],
-                pred['pick_rank'],
-                pred['category'],
-                pred['confidence_score'],
-                pred.get('reasoning', '')[:500]
-            ))
-            pick_count += 1
-        except Exception as e:
-            print(f'   에러: {e}')
+    pick_result = save_daily_picks(db, session_id, predictions)
+    for error in pick_result['errors']:
+        print(f'   에러: {error["error"]}')
 
     # 세션 상태 업데이트
     db.execute('UPDATE collection_sessions SET status = %s WHERE id = %s', ('predicted', session_id))
+    record_changes(db, 'collection_sessions', [session_id])
+    refresh_snapshot(db)
     db.commit()
     db.close()
-    print(f'   ✓ 예측 저장: {pick_count}건')
+    cache.invalidate()
+    print(f'   ✓ 예측 저장: {pick_result["inserted"]}건')
 
     # 5. 결과 출력
     print('\n' + '=' * 60)
@@ -0,0 +1,205 @@
+# file name : scoring_model.py
+# pwd : /dal9/app/ex_app/scoring_model.py
+# 미국 증시 급등주 예측 앱 - 학습형 점수 모델 (로지스틱 회귀)
+#
+# StockScorer의 고정 임계값/가중치 대신 prediction_results.is_successful 로
+# 오프라인 학습한 로지스틱 모델을 사용할 수 있도록 하는 선택적 백엔드.
+#
+#   학습:  python scoring_model.py train [--out models/scoring_model.json]
+#   확인:  python scoring_model.py show
+#
+# PredictionEngine은 EX_APP_SCORING_BACKEND=model 일 때 이 모델을 사용한다.
+
+import os
+import sys
+import json
+from datetime import datetime
+
+# numpy는 선택적 (모델 백엔드 사용 시에만 필요)
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# 모델 입력 피처 (PredictionEngine이 계산하는 세부 점수, 0-100)
+FEATURE_NAMES = ['news_score', 'momentum_score', 'social_score']
+
+DEFAULT_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'models', 'scoring_model.json'
+)
+
+# 학습 데이터 조회 쿼리 (결과가 기록된 예측만)
+TRAINING_QUERY = """
+    SELECT
+        dp.news_score,
+        dp.momentum_score,
+        dp.social_score,
+        pr.is_successful
+    FROM daily_picks dp
+    JOIN prediction_results pr ON dp.id = pr.pick_id
+    WHERE pr.is_successful IS NOT NULL
+"""
+
+
+class LinearScoringModel:
+    """
+    로지스틱/선형 점수 모델.
+    가중치는 작은 JSON 아티팩트로 저장되며, 추론은 전체 후보 종목에 대해
+    한 번의 행렬 곱으로 수행한다.
+    """
+
+    def __init__(self, weights, bias=0.0, kind='logistic', feature_names=None, meta=None):
+        if not HAS_NUMPY:
+            raise ImportError("numpy is required for LinearScoringModel")
+
+        self.feature_names = list(feature_names or FEATURE_NAMES)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.kind = kind
+        self.meta = meta or {}
+
+        if self.weights.shape != (len(self.feature_names),):
+            raise ValueError(
+                f"weights shape {self.weights.shape} does not match features {self.feature_names}"
+            )
+
+    def score_batch(self, features):
+        """
+        피처 행렬(N x F, 0-100 스케일)을 받아 0-100 점수 배열 반환.
+        모든 후보 종목을 한 번의 행렬 곱으로 계산한다.
+        """
+        X = np.asarray(features, dtype=np.float64).reshape(-1, len(self.feature_names)) / 100.0
+        z = X @ self.weights + self.bias
+
+        if self.kind == 'logistic':
+            scores = 1.0 / (1.0 + np.exp(-z))
+        else:
+            scores = np.clip(z, 0.0, 1.0)
+
+        return np.round(scores * 100.0, 2)
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'feature_names': self.feature_names,
+            'weights': [float(w) for w in self.weights],
+            'bias': self.bias,
+            'meta': self.meta
+        }
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        """모델 아티팩트 저장 (JSON)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        """모델 아티팩트 로드"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            weights=data['weights'],
+            bias=data.get('bias', 0.0),
+            kind=data.get('kind', 'logistic'),
+            feature_names=data.get('feature_names'),
+            meta=data.get('meta')
+        )
+
+
+def train_model(rows, kind='logistic', epochs=2000, learning_rate=0.5, l2=0.01):
+    """
+    학습 데이터로 모델 학습 (배치 경사하강법)
+
+    Args:
+        rows: FEATURE_NAMES 와 is_successful 키를 가진 dict 리스트
+        kind: 'logistic' 또는 'linear'
+    """
+    if not HAS_NUMPY:
+        raise ImportError("numpy is required for train_model")
+
+    X = np.array(
+        [[float(row.get(name) or 0) for name in FEATURE_NAMES] for row in rows],
+        dtype=np.float64
+    ) / 100.0
+    y = np.array([1.0 if row.get('is_successful') else 0.0 for row in rows], dtype=np.float64)
+
+    if len(y) == 0:
+        raise ValueError("No training rows (prediction_results.is_successful is empty)")
+
+    n = len(y)
+    w = np.zeros(X.shape[1])
+    b = 0.0
+
+    for _ in range(epochs):
+        z = X @ w + b
+        pred = 1.0 / (1.0 + np.exp(-z)) if kind == 'logistic' else z
+        error = pred - y
+        w -= learning_rate * ((X.T @ error) / n + l2 * w)
+        b -= learning_rate * float(error.mean())
+
+    z = X @ w + b
+    pred = 1.0 / (1.0 + np.exp(-z)) if kind == 'logistic' else z
+    accuracy = float(((pred >= 0.5) == (y >= 0.5)).mean())
+
+    return LinearScoringModel(
+        weights=w,
+        bias=b,
+        kind=kind,
+        meta={
+            'trained_at': datetime.now().isoformat(),
+            'n_samples': n,
+            'positive_rate': round(float(y.mean()), 4),
+            'train_accuracy': round(accuracy, 4)
+        }
+    )
+
+
+# 프로세스당 1회 로드
+_model_cache = {}
+
+
+def get_scoring_model(path=None):
+    """설정된 경로의 모델을 프로세스당 한 번만 로드하여 반환"""
+    path = path or os.environ.get('EX_APP_SCORING_MODEL_PATH', DEFAULT_MODEL_PATH)
+    if path not in _model_cache:
+        _model_cache[path] = LinearScoringModel.load(path)
+        print(f"[EX_APP] Scoring model loaded: {path}")
+    return _model_cache[path]
+
+
+def _load_training_rows():
+    """DB에서 학습 데이터 조회"""
+    if os.environ.get('DATABASE_URL'):
+        from module.dbModule_ex_pg import Database
+    else:
+        try:
+            from app.module.dbModule_ex import Database
+        except ImportError:
+            from module.dbModule_ex_pg import Database
+
+    db = Database()
+    try:
+        return db.executeAll(TRAINING_QUERY)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'show'
+    out_path = DEFAULT_MODEL_PATH
+    if '--out' in sys.argv:
+        out_path = sys.argv[sys.argv.index('--out') + 1]
+
+    if command == 'train':
+        rows = _load_training_rows()
+        model = train_model(rows, kind=os.environ.get('EX_APP_SCORING_MODEL_KIND', 'logistic'))
+        model.save(out_path)
+        print(f"Model saved: {out_path}")
+        print(json.dumps(model.to_dict(), indent=2))
+    else:
+        model = LinearScoringModel.load(out_path)
+        print(json.dumps(model.to_dict(), indent=2))
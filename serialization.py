@@ -0,0 +1,171 @@
+# file name : serialization.py
+# pwd : /dal9/app/ex_app/serialization.py
+# 미국 증시 급등주 예측 앱 - JSON 직렬화 (orjson) 와 응답 압축 (gzip/brotli)
+#
+# FastJSONProvider 는 Flask 기본 JSON 공급자와 같은 출력 규칙(키 정렬, datetime/date ->
+# HTTP 날짜 문자열, Decimal -> 문자열)을 유지하면서 orjson 이 있으면 orjson 으로
+# 직렬화한다. ex_app 블루프린트가 등록될 때 앱의 JSON 공급자로 설치된다.
+#
+# compress_response() 는 Accept-Encoding 협상 후 일정 크기 이상 응답을 brotli(설치 시)
+# 또는 gzip 으로 압축한다. 압축 본문은 표현이 다르므로 ETag 에 인코딩 접미사를 붙인다.
+#
+#   EX_APP_JSON              'std' 면 orjson 을 쓰지 않음 (기본 orjson 사용 가능 시 사용)
+#   RESPONSE_COMPRESS_MIN    압축 최소 크기(바이트, 기본 1024, 0 이면 압축 안 함)
+
+import os
+import gzip
+import json
+import uuid
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+
+# orjson (선택, 없으면 표준 json)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# brotli (선택, 없으면 gzip 만)
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# Flask JSON 공급자 (Flask 2.2+)
+try:
+    from flask.json.provider import DefaultJSONProvider
+    HAS_FLASK_PROVIDER = True
+except ImportError:
+    DefaultJSONProvider = object
+    HAS_FLASK_PROVIDER = False
+
+USE_ORJSON = HAS_ORJSON and os.environ.get('EX_APP_JSON', 'orjson') != 'std'
+COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'text/html', 'text/csv', 'text/plain'
+}
+# 인코딩별 ETag 접미사
+ETAG_SUFFIXES = {'br': '-br', 'gzip': '-gzip'}
+
+
+_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _http_date(value):
+    """werkzeug.http.http_date 와 같은 형식 (naive 값은 UTC 로 간주, 로캘 무관)"""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time())
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return (f"{_DAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} "
+            f"{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT")
+
+
+def _default(value):
+    """Flask DefaultJSONProvider 와 같은 변환 규칙"""
+    if isinstance(value, date):
+        return _http_date(value)
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if USE_ORJSON:
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps_bytes(obj):
+    """JSON 직렬화 (UTF-8 바이트)"""
+    if USE_ORJSON:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, sort_keys=True, ensure_ascii=False).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify()/app.json 을 orjson 으로 처리 (orjson 이 없거나 indent 등 옵션이 있으면 기본 동작)"""
+
+    def dumps(self, obj, **kwargs):
+        if USE_ORJSON and not kwargs:
+            return dumps_bytes(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not USE_ORJSON or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+# ============================================
+# 응답 압축
+# ============================================
+
+def choose_encoding(accept_encodings):
+    """
+    클라이언트가 받는 인코딩 중 br > gzip 순으로 선택
+
+    Args:
+        accept_encodings: request.accept_encodings (werkzeug Accept)
+    """
+    if HAS_BROTLI and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compressible(response):
+    """압축 대상: 200, 스트리밍 아님, 아직 인코딩 없음, 텍스트 계열, 최소 크기 이상"""
+    return (
+        COMPRESS_MIN_BYTES > 0
+        and response.status_code == 200
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and response.content_length is not None
+        and response.content_length >= COMPRESS_MIN_BYTES
+    )
+
+
+def compress_response(response, accept_encodings, encoded=None):
+    """
+    협상된 인코딩으로 응답 본문 압축 (대상이 아니면 그대로 반환)
+
+    Args:
+        encoded: 인코딩별 압축 결과를 보관할 dict (캐시 항목에 붙여 재압축 방지, 선택)
+    """
+    response.vary.add('Accept-Encoding')
+    if not compressible(response):
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    if encoded is not None and encoding in encoded:
+        body = encoded[encoding]
+    else:
+        body = compress(response.get_data(), encoding)
+        if encoded is not None:
+            encoded[encoding] = body
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + ETAG_SUFFIXES[encoding], weak=weak)
+    return response
@@ -0,0 +1,243 @@
+# file name : snapshot.py
+# pwd : /dal9/app/ex_app/snapshot.py
+# 미국 증시 급등주 예측 앱 - 대시보드 스냅샷 (dashboard_snapshot)
+#
+# 메인 대시보드(/)와 /api/ai/dashboard 가 매번 실행하던 세션/예측/통계/뉴스 쿼리를
+# 수집 실행이 끝날 때와 예측/결과/뉴스가 저장될 때 한 번 계산해 한 행(JSON)으로
+# 저장한다. 페이지/API 는 PK 조회 한 번으로 응답하므로 테이블 크기와 무관하다.
+# 날짜가 바뀌었거나 스냅샷이 없으면 조회 시점에 다시 만든다.
+#
+#   python snapshot.py refresh   스냅샷 재생성
+
+import os
+import sys
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    from app.ex_app.projections import NEWS_LIST_COLUMNS
+except ImportError:
+    from projections import NEWS_LIST_COLUMNS
+
+SNAPSHOT_NAME = 'dashboard'
+SNAPSHOT_COLUMNS = ['name', 'payload', 'generated_at']
+
+
+# ============================================
+# 직렬화 (datetime/date/Decimal 타입 유지)
+# ============================================
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, date):
+        return {'$date': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'$decimal': str(value)}
+    return str(value)
+
+
+def _decode(obj):
+    if len(obj) == 1:
+        if '$datetime' in obj:
+            return datetime.fromisoformat(obj['$datetime'])
+        if '$date' in obj:
+            return date.fromisoformat(obj['$date'])
+        if '$decimal' in obj:
+            return Decimal(obj['$decimal'])
+    return obj
+
+
+def dumps(snapshot):
+    return json.dumps(snapshot, default=_encode, ensure_ascii=False)
+
+
+def loads(payload):
+    return json.loads(payload, object_hook=_decode)
+
+
+# ============================================
+# 스냅샷 생성/조회
+# ============================================
+
+# 델타 응답에 포함하는 엔티티 (change_log.entity)
+DELTA_ENTITIES = ('collection_sessions', 'daily_picks', 'news_events', 'performance_stats')
+
+
+def _in_keys(column, keys):
+    """델타 조회용 추가 조건 (keys 가 None 이면 조건 없음)"""
+    if keys is None:
+        return '', ()
+    return f"AND {column} IN ({', '.join(['%s'] * len(keys))})", tuple(keys)
+
+
+def _session(db, today_str):
+    return db.executeOne(
+        "SELECT * FROM collection_sessions WHERE session_date = %s ORDER BY id DESC LIMIT 1",
+        (today_str,)
+    )
+
+
+def _today_picks(db, today_str, ids=None):
+    extra, args = _in_keys('dp.id', ids)
+    return db.executeAll(f"""
+        SELECT
+            dp.*,
+            s.name as stock_name,
+            s.sector,
+            s.market_cap
+        FROM daily_picks dp
+        LEFT JOIN stocks s ON dp.symbol = s.symbol
+        LEFT JOIN collection_sessions cs ON dp.session_id = cs.id
+        WHERE cs.session_date = %s {extra}
+        ORDER BY dp.pick_rank ASC
+    """, (today_str, *args))
+
+
+def _recent_performance(db, today, stat_dates=None):
+    extra, args = _in_keys('stat_date', stat_dates)
+    start, end = db.recentRange(7, now=datetime.combine(today, datetime.min.time()))
+    return db.executeAll(f"""
+        SELECT
+            stat_date as pick_date,
+            total_picks,
+            successful_picks as successful,
+            avg_gain_pct as avg_gain
+        FROM performance_stats
+        WHERE {db.rangeCondition('stat_date')} {extra}
+        ORDER BY stat_date DESC
+    """, (start.date(), end.date(), *args))
+
+
+def _high_impact_news(db, today, ids=None):
+    extra, args = _in_keys('id', ids)
+    return db.executeAll(f"""
+        SELECT {NEWS_LIST_COLUMNS} FROM news_events
+        WHERE importance_score >= 50
+        AND {db.rangeCondition('collected_at')} {extra}
+        ORDER BY importance_score DESC
+        LIMIT 20
+    """, (*db.dayRange(today), *args))
+
+
+def build_snapshot(db, today=None):
+    """대시보드 각 섹션 계산 (페이지/AI API 가 쓰던 쿼리와 동일)"""
+    today = today or date.today()
+    today_str = today.isoformat()
+
+    # 최근 Picks
+    recent_picks = db.executeAll("""
+        SELECT dp.*, s.name as stock_name
+        FROM daily_picks dp
+        LEFT JOIN stocks s ON dp.symbol = s.symbol
+        ORDER BY dp.created_at DESC LIMIT 10
+    """)
+
+    # 성과 통계 (최근 30일, 일별 롤업 합산)
+    start, end = db.recentRange(30, now=datetime.combine(today, datetime.min.time()))
+    stats = db.executeOne(f"""
+        SELECT
+            SUM(total_picks) as total_picks,
+            SUM(successful_picks) as successful,
+            ROUND(SUM(gain_sum) / NULLIF(SUM(gain_count), 0), 2) as avg_gain
+        FROM performance_stats
+        WHERE {db.rangeCondition('stat_date')}
+    """, (start.date(), end.date()))
+
+    # 최근 뉴스
+    recent_news = db.executeAll(f"""
+        SELECT {NEWS_LIST_COLUMNS} FROM news_events
+        ORDER BY collected_at DESC LIMIT 20
+    """)
+
+    return {
+        'date': today_str,
+        'generated_at': datetime.now(),
+        'session': _session(db, today_str),
+        'today_picks': _today_picks(db, today_str),
+        'recent_picks': recent_picks,
+        'stats': stats,
+        'recent_performance': _recent_performance(db, today),
+        'recent_news': recent_news,
+        'high_impact_news': _high_impact_news(db, today)
+    }
+
+
+def build_delta(db, delta, today=None):
+    """
+    changes.changes_since() 결과 중 AI 대시보드 섹션에 해당하는 행만 조회
+
+    Returns:
+        dict: session(바뀌었을 때만), picks/high_impact_news/recent_performance(바뀐 행),
+              deleted(엔티티별 삭제 키)
+    """
+    today = today or date.today()
+    upserts = delta['upserts']
+    pick_ids = [int(key) for key in upserts.get('daily_picks', [])]
+    news_ids = [int(key) for key in upserts.get('news_events', [])]
+    stat_dates = upserts.get('performance_stats', [])
+
+    return {
+        'date': today.isoformat(),
+        'session': _session(db, today.isoformat()) if upserts.get('collection_sessions') else None,
+        'picks': _today_picks(db, today.isoformat(), pick_ids) if pick_ids else [],
+        'high_impact_news': _high_impact_news(db, today, news_ids) if news_ids else [],
+        'recent_performance': _recent_performance(db, today, stat_dates) if stat_dates else [],
+        'deleted': {entity: keys for entity, keys in delta['deletes'].items() if entity in DELTA_ENTITIES}
+    }
+
+
+def refresh_snapshot(db, today=None):
+    """스냅샷 재계산 후 저장 (커밋은 호출자)"""
+    snapshot = build_snapshot(db, today)
+    db.upsertMany('dashboard_snapshot', SNAPSHOT_COLUMNS, [
+        (SNAPSHOT_NAME, dumps(snapshot), snapshot['generated_at'])
+    ], ['name'], returning=None)
+    return snapshot
+
+
+def get_snapshot(db):
+    """
+    저장된 스냅샷 조회 (오늘 것이 없으면 새로 만들어 저장 후 커밋)
+
+    Returns:
+        dict: build_snapshot() 과 같은 구조
+    """
+    row = db.executeOne(
+        "SELECT payload FROM dashboard_snapshot WHERE name = %s", (SNAPSHOT_NAME,)
+    )
+    if row and row['payload']:
+        snapshot = loads(row['payload'])
+        if snapshot.get('date') == date.today().isoformat():
+            return snapshot
+
+    snapshot = refresh_snapshot(db)
+    db.commit()
+    return snapshot
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'refresh':
+        print("Usage: python snapshot.py refresh")
+        sys.exit(1)
+
+    if os.environ.get('DATABASE_URL'):
+        from module.dbModule_ex_pg import Database
+    else:
+        try:
+            from app.module.dbModule_ex import Database
+        except ImportError:
+            from module.dbModule_ex_pg import Database
+
+    db = Database(use_primary=True)
+    try:
+        snapshot = refresh_snapshot(db)
+        db.commit()
+        print(f"[EX_APP] Dashboard snapshot refreshed ({len(snapshot['today_picks'])} picks, "
+              f"{len(snapshot['recent_news'])} news)")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,200 @@
+# file name : social_velocity.py
+# pwd : /dal9/app/ex_app/social_velocity.py
+# 미국 증시 급등주 예측 앱 - 소셜 멘션 슬라이딩 윈도우 카운터
+#
+# 종목별로 분 단위 버킷 링버퍼(24시간)를 유지하고, 15m/1h/24h 윈도우 합계를
+# 시간이 흐를 때마다 증분 갱신하여 멘션 수와 급증률(velocity)을 O(1)로 조회한다.
+# velocity = 현재 윈도우 멘션 수 / 직전 구간 평균으로 기대되는 멘션 수
+# 직전 구간 멘션이 하나도 없으면(저장소를 유지하지 않는 첫 실행 등) 비교할 기준이
+# 없으므로 velocity 는 None 이다.
+#
+# EX_APP_MENTION_STORE_PATH 를 지정하면 수집 실행 간 JSON 파일로 유지된다.
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+BUCKET_SECONDS = 60
+CAPACITY = 24 * 60  # 24시간 (분 단위 버킷)
+
+WINDOWS = {
+    '15m': 15,
+    '1h': 60,
+    '24h': CAPACITY,
+}
+
+# 직전 구간 멘션이 적을 때 기대값 하한 (멘션 1건이 과대 배율이 되지 않도록)
+MIN_BASELINE = 1.0
+
+# 이미 집계한 포스트 ID 보관 개수 (핫 포스트가 여러 실행에 걸쳐 반복 수집되므로)
+MAX_SEEN_POSTS = 5000
+
+
+class _SymbolCounter:
+    """종목 하나의 분 단위 링버퍼와 윈도우별 누적 합계"""
+
+    __slots__ = ('counts', 'head', 'sums')
+
+    def __init__(self, head):
+        self.counts = [0] * CAPACITY
+        self.head = head
+        self.sums = {name: 0 for name in WINDOWS}
+
+    def advance(self, minute):
+        """현재 시각을 minute 으로 이동하며 윈도우를 벗어난 버킷을 차감"""
+        if minute <= self.head:
+            return
+
+        if minute - self.head >= CAPACITY:
+            self.counts = [0] * CAPACITY
+            self.sums = {name: 0 for name in WINDOWS}
+            self.head = minute
+            return
+
+        for m in range(self.head + 1, minute + 1):
+            for name, size in WINDOWS.items():
+                self.sums[name] -= self.counts[(m - size) % CAPACITY]
+            self.counts[m % CAPACITY] = 0
+        self.head = minute
+
+    def add(self, minute, count):
+        self.advance(minute)
+        age = self.head - minute
+        if age >= CAPACITY:
+            return  # 24시간보다 오래된 멘션은 무시
+
+        self.counts[minute % CAPACITY] += count
+        for name, size in WINDOWS.items():
+            if age < size:
+                self.sums[name] += count
+
+
+class MentionVelocityStore:
+    """종목별 멘션 시계열 저장소 (스레드 안전)"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._counters = {}
+        self._seen_posts = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def _minute(timestamp=None):
+        return int((timestamp if timestamp is not None else time.time()) // BUCKET_SECONDS)
+
+    def record(self, symbol, count=1, timestamp=None):
+        """멘션 기록 (timestamp: epoch 초, 기본값 현재 시각)"""
+        symbol = symbol.upper()
+        minute = self._minute(timestamp)
+        with self._lock:
+            counter = self._counters.get(symbol)
+            if counter is None:
+                counter = self._counters[symbol] = _SymbolCounter(minute)
+            counter.add(minute, count)
+
+    def mark_seen(self, post_id):
+        """처음 보는 포스트면 True (중복 집계 방지)"""
+        if not post_id:
+            return True
+        with self._lock:
+            if post_id in self._seen_posts:
+                return False
+            self._seen_posts[post_id] = True
+            if len(self._seen_posts) > MAX_SEEN_POSTS:
+                self._seen_posts.popitem(last=False)
+            return True
+
+    def count(self, symbol, window='1h', now=None):
+        """윈도우 내 멘션 수"""
+        with self._lock:
+            counter = self._counters.get(symbol.upper())
+            if counter is None:
+                return 0
+            counter.advance(self._minute(now))
+            return counter.sums[window]
+
+    def velocity(self, symbol, window='1h', now=None):
+        """
+        현재 윈도우 멘션 수 / 직전(24h 중 나머지) 구간 평균 기준 기대 멘션 수
+        직전 구간 멘션이 없으면 기준이 없으므로 None
+        """
+        size = WINDOWS[window]
+        with self._lock:
+            counter = self._counters.get(symbol.upper())
+            if counter is None:
+                return None
+            counter.advance(self._minute(now))
+            current = counter.sums[window]
+            trailing = counter.sums['24h'] - current
+
+        if trailing <= 0:
+            return None
+        expected = trailing / (CAPACITY - size) * size if size < CAPACITY else 0
+        return round(current / max(expected, MIN_BASELINE), 2)
+
+    def stats(self, symbol, now=None):
+        """윈도우별 멘션 수와 1h/15m velocity"""
+        stats = {name: self.count(symbol, name, now) for name in WINDOWS}
+        stats['velocity_15m'] = self.velocity(symbol, '15m', now)
+        stats['velocity_1h'] = self.velocity(symbol, '1h', now)
+        return stats
+
+    def symbols(self):
+        with self._lock:
+            return list(self._counters.keys())
+
+    def save(self, path=None):
+        """0이 아닌 버킷만 JSON으로 저장"""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            counters = {
+                symbol: {
+                    'head': counter.head,
+                    'buckets': {
+                        str(m): counter.counts[m % CAPACITY]
+                        for m in range(counter.head - CAPACITY + 1, counter.head + 1)
+                        if counter.counts[m % CAPACITY]
+                    }
+                }
+                for symbol, counter in self._counters.items()
+            }
+            data = {'counters': counters, 'seen_posts': list(self._seen_posts)}
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[EX_APP] Mention store load failed: {e}")
+            return
+
+        with self._lock:
+            self._seen_posts = OrderedDict((post_id, True) for post_id in data.get('seen_posts', []))
+            for symbol, entry in data.get('counters', {}).items():
+                counter = _SymbolCounter(entry['head'])
+                for minute, count in entry.get('buckets', {}).items():
+                    counter.add(int(minute), count)
+                self._counters[symbol] = counter
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_mention_store():
+    """프로세스 전역 멘션 저장소"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MentionVelocityStore(os.environ.get('EX_APP_MENTION_STORE_PATH'))
+        return _store
@@ -0,0 +1,265 @@
+# file name : stream.py
+# pwd : /dal9/app/ex_app/stream.py
+# 미국 증시 급등주 예측 앱 - 실시간 피드 (/api/stream, Server-Sent Events)
+#
+# 웹 프로세스마다 브로드캐스터 스레드 하나가 change_log 를 구독하고, 새 예측/뉴스/
+# 세션 상태 변경을 연결된 모든 뷰어의 큐로 나눠 준다. 뷰어가 N 명이어도 DB 구독은
+# 프로세스당 하나다.
+#   PostgreSQL: LISTEN ex_app_changes (changes.record_changes 가 NOTIFY), 알림이 올 때만 조회
+#   MySQL:      STREAM_POLL_SECONDS 마다 change_log 조회
+# 구독자가 없으면 스레드와 LISTEN 연결을 닫는다. LISTEN 연결이 끊기면 폴링으로 바꾸고
+# STREAM_LISTEN_RETRY_SECONDS 마다 다시 연결한다.
+#
+# 웹 프로세스는 gunicorn gthread 워커(Procfile, --threads $WEB_THREADS)로 실행되며
+# SSE 연결 하나가 스레드 하나를 계속 점유한다. 그래서 동시 연결 수는 스레드 수에서
+# 일반 요청용 여유분(STREAM_RESERVED_THREADS)을 뺀 값으로 제한하고, 넘으면 503 을 준다.
+# 뷰어가 많으면 WEB_THREADS 를 늘린다.
+#
+#   STREAM_POLL_SECONDS       MySQL 폴링 주기 / LISTEN 대기 단위(초, 기본 2)
+#   STREAM_LISTEN_RETRY_SECONDS  LISTEN 연결 실패/끊김 후 재연결 간격(초, 기본 30)
+#   WEB_THREADS               워커당 스레드 수 (Procfile 과 같은 값, 기본 8)
+#   STREAM_RESERVED_THREADS   SSE 에 쓰지 않고 남겨 둘 스레드 수 (기본 2)
+#   STREAM_MAX_SUBSCRIBERS    프로세스당 최대 동시 연결 수 (기본 WEB_THREADS - 여유분, 그 이상은 불가)
+
+import os
+import json
+import time
+import queue
+import select
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    from app.ex_app.changes import NOTIFY_CHANNEL, current_version, log_entries
+    from app.ex_app.projections import NEWS_LIST_COLUMNS
+except ImportError:
+    from changes import NOTIFY_CHANNEL, current_version, log_entries
+    from projections import NEWS_LIST_COLUMNS
+
+POLL_SECONDS = float(os.environ.get('STREAM_POLL_SECONDS', 2))
+LISTEN_RETRY_SECONDS = float(os.environ.get('STREAM_LISTEN_RETRY_SECONDS', 30))
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+RESERVED_THREADS = int(os.environ.get('STREAM_RESERVED_THREADS', 2))
+_THREAD_LIMIT = max(WEB_THREADS - RESERVED_THREADS, 0)
+MAX_SUBSCRIBERS = min(int(os.environ.get('STREAM_MAX_SUBSCRIBERS', _THREAD_LIMIT)), _THREAD_LIMIT)
+HEARTBEAT_SECONDS = 15
+# LISTEN 중에도 놓친 알림(연결 재시작 등)에 대비해 이 주기로 한 번씩 조회
+SAFETY_POLL_SECONDS = 30
+QUEUE_SIZE = 200
+BATCH_LIMIT = 1000
+
+# change_log.entity -> SSE event 이름
+EVENTS = {
+    'daily_picks': 'pick',
+    'news_events': 'news',
+    'collection_sessions': 'session',
+}
+
+_ROW_QUERIES = {
+    'daily_picks': """
+        SELECT dp.*, s.name as stock_name
+        FROM daily_picks dp
+        LEFT JOIN stocks s ON dp.symbol = s.symbol
+        WHERE dp.id IN ({keys})
+    """,
+    'news_events': f"SELECT {NEWS_LIST_COLUMNS} FROM news_events WHERE id IN ({{keys}})",
+    'collection_sessions': "SELECT id, session_date, status FROM collection_sessions WHERE id IN ({keys})",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def format_event(event, data, event_id=None):
+    """SSE 메시지 한 건"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=_json_default, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """뷰어 한 명의 이벤트 큐 (느려서 큐가 차면 closed 로 끊고 재연결을 유도)"""
+
+    def __init__(self):
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.closed = False
+
+    def push(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.closed = True
+
+    def events(self, heartbeat=HEARTBEAT_SECONDS):
+        """SSE 응답 본문 제너레이터 (주기적 heartbeat 주석으로 연결 유지)"""
+        yield "retry: 5000\n\n"
+        while not self.closed:
+            try:
+                yield self.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": ping\n\n"
+
+
+class ChangeBroadcaster:
+    """change_log 구독 스레드 하나 -> 여러 Subscriber"""
+
+    def __init__(self, database_module):
+        self.database_module = database_module
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        # 확정 버전과, 그 이후 이미 보낸 change_log id (늦게 커밋된 행도 빠짐없이 보내기 위함)
+        self._version = None
+        self._sent = set()
+
+    def subscribe(self):
+        """새 뷰어 등록 (최대 연결 수를 넘으면 None)"""
+        with self._lock:
+            if len(self._subscribers) >= MAX_SUBSCRIBERS:
+                return None
+            subscriber = Subscriber()
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._version = None
+                self._sent = set()
+                self._thread = threading.Thread(target=self._run, name='ex_app-stream', daemon=True)
+                self._thread.start()
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        """뷰어 해제 (응답 종료 시 호출, 여러 번 호출해도 됨)"""
+        subscriber.closed = True
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'max_subscribers': MAX_SUBSCRIBERS,
+                'running': self._thread is not None,
+                'version': self._version
+            }
+
+    def _active(self):
+        with self._lock:
+            if self._subscribers:
+                return True
+            self._thread = None
+            return False
+
+    def _listen(self):
+        """LISTEN 연결 (MySQL 이면 None). 실패하면 (None, 재시도 시각)"""
+        try:
+            return self.database_module.listen(NOTIFY_CHANNEL), None
+        except Exception as e:
+            print(f"[EX_APP] Stream LISTEN failed, polling instead: {e}")
+            return None, time.monotonic() + LISTEN_RETRY_SECONDS
+
+    @staticmethod
+    def _close_listener(listener):
+        try:
+            listener.close()
+        except Exception:
+            pass
+
+    def _run(self):
+        listener = None
+        try:
+            listener, retry_at = self._listen()
+            last_poll = 0.0
+            while self._active():
+                if listener is None and retry_at is not None and time.monotonic() >= retry_at:
+                    listener, retry_at = self._listen()
+
+                if listener is not None:
+                    notified = False
+                    try:
+                        ready, _, _ = select.select([listener], [], [], POLL_SECONDS)
+                        if ready:
+                            listener.poll()
+                            notified = bool(listener.notifies)
+                            listener.notifies.clear()
+                    except Exception as e:
+                        # 끊긴 사이의 알림을 놓쳤을 수 있으므로 바로 한 번 조회하고 폴링으로 전환
+                        print(f"[EX_APP] Stream LISTEN connection lost, polling until reconnect: {e}")
+                        self._close_listener(listener)
+                        listener = None
+                        retry_at = time.monotonic() + LISTEN_RETRY_SECONDS
+                        notified = True
+                    if not notified and time.monotonic() - last_poll < SAFETY_POLL_SECONDS:
+                        continue
+                elif time.monotonic() - last_poll < POLL_SECONDS:
+                    time.sleep(POLL_SECONDS / 4)
+                    continue
+
+                last_poll = time.monotonic()
+                try:
+                    self._dispatch()
+                except Exception as e:
+                    print(f"[EX_APP] Stream dispatch error: {e}")
+        finally:
+            if listener is not None:
+                self._close_listener(listener)
+            # 예기치 않은 오류로 끝나도 다음 subscribe() 가 스레드를 다시 시작하도록
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
+    def _dispatch(self):
+        db = self.database_module.Database(use_primary=True)
+        try:
+            if self._version is None:
+                # 시작 시점까지의 변경은 보내지 않음 (페이지가 이미 렌더링한 상태)
+                self._version = current_version(db)
+                self._sent = {row['id'] for row in log_entries(db, self._version, BATCH_LIMIT)}
+                return
+
+            entries = log_entries(db, self._version, BATCH_LIMIT)
+            new_entries = [row for row in entries if row['id'] not in self._sent]
+            self._sent.update(row['id'] for row in entries)
+
+            # 확정 버전 전진 (한도까지만 읽었으면 읽은 곳까지만)
+            settled = current_version(db)
+            if len(entries) >= BATCH_LIMIT:
+                settled = min(settled, entries[-1]['id'])
+            if settled > self._version:
+                self._version = settled
+                self._sent = {entry_id for entry_id in self._sent if entry_id > settled}
+
+            messages = self._messages(db, new_entries)
+        finally:
+            db.close()
+
+        if messages:
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for subscriber in subscribers:
+                for message in messages:
+                    subscriber.push(message)
+
+    def _messages(self, db, entries):
+        """새 change_log 항목 -> SSE 메시지 (엔티티별 IN 조회 한 번씩)"""
+        latest = {}
+        for row in entries:
+            if row['entity'] in EVENTS and row['op'] != 'delete':
+                latest[(row['entity'], int(row['entity_id']))] = row['id']
+
+        messages = []
+        for entity, query in _ROW_QUERIES.items():
+            keys = {key: change_id for (name, key), change_id in latest.items() if name == entity}
+            if not keys:
+                continue
+            rows = db.executeAll(query.format(keys=', '.join(['%s'] * len(keys))), tuple(keys))
+            for row in sorted(rows, key=lambda r: keys[r['id']]):
+                messages.append(format_event(EVENTS[entity], row, keys[row['id']]))
+        return messages